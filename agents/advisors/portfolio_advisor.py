@@ -1,15 +1,10 @@
-import os
+from typing import Optional
 from infrence_provider.infrence_provider import InferenceProvider
-import logging
-import logging.config
 from agents.advisors.report_summarizer import ReportSummarizer
-
-# Load the logging configuration
-logging.config.fileConfig(os.path.abspath(os.path.join(
-    os.path.dirname(__file__), '../../config/logging.config')))
+from tools.app_logging import get_logger
 
 # Get the logger specified in the configuration file
-log = logging.getLogger('sampleLogger')
+log = get_logger()
 
 
 class PortfolioAdvisor:
@@ -19,7 +14,7 @@ class PortfolioAdvisor:
         self.dry_run = dry_run
         self.report_summarizer = report_summarizer
 
-    def provide_advice(self, report_files: list[str]) -> str:
+    def provide_advice(self, report_files: list[str], risk_tables: Optional[str] = None) -> str:
         if self.dry_run:
             return "This is a report containing advice on the portfolio."
 
@@ -29,8 +24,27 @@ class PortfolioAdvisor:
 
         # Summarize the reports or else our prompt will be huge
         summaries = self.report_summarizer.summarize_reports(report_files)
+        return self.advice_from_summaries(summaries, risk_tables)
+
+    def advice_from_summaries(self, summaries: list[str], risk_tables: Optional[str] = None) -> str:
+        if self.dry_run:
+            return "This is a report containing advice on the portfolio."
+
+        log.info(
+            f"Advisor analysis of {len(summaries)} stock summaries. LLM: {self.llm_provider.get_provider_llm}. Temperature: {self.llm_temperature}")
+
         reports = '\n\n'.join(summaries)
 
+        # Numbers computed from the price history of all holdings, so the advice on the portfolio isn't only from the summaries
+        risk_section = f"""
+                    Use the 'Portfolio Risk' tables (volatility, beta, correlation, concentration and value at risk) when you judge diversification and risk.
+
+                    Portfolio Risk:
+                    ---
+                    {risk_tables}
+                    ---
+                """ if risk_tables else ""
+
         user_prompt = f"""
                     You are a world class financial advisor.
                     Remember: 
@@ -50,6 +64,7 @@ class PortfolioAdvisor:
                     ---
                     {reports}
                     ---
+                    {risk_section}
                 """
         log.info(f"LLM analysing query. Prompt {len(user_prompt)} chars.")
         ollama_completion = self.llm_provider.infer(user_prompt)
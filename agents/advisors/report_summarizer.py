@@ -1,14 +1,12 @@
-import os
+import queue
+import threading
+from typing import Dict, Optional, Tuple
+from components.checkpoint_store import STAGE_SUMMARY, CheckpointStore
 from infrence_provider.infrence_provider import InferenceProvider
-import logging
-import logging.config
-
-# Load the logging configuration
-logging.config.fileConfig(os.path.abspath(os.path.join(
-    os.path.dirname(__file__), './config/logging.config')))
+from tools.app_logging import get_logger
 
 # Get the logger specified in the configuration file
-log = logging.getLogger('sampleLogger')
+log = get_logger()
 
 
 class ReportSummarizer:
@@ -29,6 +27,9 @@ class ReportSummarizer:
         text = ""
         with open(report_file) as f:
             text = ''.join(f.readlines())
+        return self.summarize_text(text)
+
+    def summarize_text(self, text: str) -> str:
         if text == "":
             return ""
 
@@ -45,3 +46,51 @@ class ReportSummarizer:
         log.info(f"Summarizing report. Prompt {len(user_prompt)} chars.")
         ollama_completion = self.llm_provider.infer(user_prompt)
         return ollama_completion.strip()
+
+
+class SummaryQueue:
+    """
+    Summarizes stock reports while the rest of the portfolio is still being analysed.
+    Each finished report is put on the queue, and consumer threads summarize it straight away.
+    """
+
+    def __init__(self, summarizer: ReportSummarizer, workers: int = 1, checkpoints: Optional[CheckpointStore] = None) -> None:
+        self.summarizer = summarizer
+        self.checkpoints = checkpoints
+        self.queue: "queue.Queue[Optional[Tuple[str, str]]]" = queue.Queue()
+        self.summaries: Dict[str, str] = {}
+        self.lock = threading.Lock()
+        self.consumers = [threading.Thread(target=self.consume, name=f"summarizer-{i}", daemon=True)
+                          for i in range(max(1, workers))]
+
+    def start(self) -> None:
+        for consumer in self.consumers:
+            consumer.start()
+
+    def put(self, ticker_symbol: str, report_text: str) -> None:
+        self.queue.put((ticker_symbol, report_text))
+
+    def close(self) -> Dict[str, str]:
+        # Wait for the queued reports, then return the summaries by ticker
+        for _ in self.consumers:
+            self.queue.put(None)
+        for consumer in self.consumers:
+            consumer.join()
+        return self.summaries
+
+    def consume(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            ticker_symbol, report_text = item
+            try:
+                if self.checkpoints is None:
+                    summary = self.summarizer.summarize_text(report_text)
+                else:
+                    summary = self.checkpoints.get_or_run(
+                        ticker_symbol, STAGE_SUMMARY, lambda: self.summarizer.summarize_text(report_text))
+                with self.lock:
+                    self.summaries[ticker_symbol] = summary
+            except Exception as e:
+                log.error(f"Error summarizing report for {ticker_symbol}: {e}")
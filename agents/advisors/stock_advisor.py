@@ -11,23 +11,13 @@
 # - Buy or sell?
 """
 
-import os
 from typing import Dict
 
-import logging
-import logging.config
-
 from infrence_provider.infrence_provider import InferenceProvider
+from tools.app_logging import get_logger
 
-try:
-    # Load the logging configuration
-    logging.config.fileConfig(os.path.abspath(os.path.join(
-        os.path.dirname(__file__), '../../config/logging.config')))
-
-    # Get the logger specified in the configuration file
-    log = logging.getLogger('sampleLogger')
-except FileNotFoundError:
-    error = "#ignore"
+# Get the logger specified in the configuration file
+log = get_logger()
 
 
 class StockAdvisor:
@@ -13,23 +13,14 @@
 """
 
 
-import os
 from typing import Dict
 from components.data_acq_layer import StockDataFin
 from infrence_provider.infrence_provider import InferenceProvider
 from portfolio_item import PortfolioItem
-import logging
-import logging.config
-
-try:
-    # Load the logging configuration
-    logging.config.fileConfig(os.path.abspath(os.path.join(
-        os.path.dirname(__file__), '../../config/logging.config')))
-
-    # Get the logger specified in the configuration file
-    log = logging.getLogger('sampleLogger')
-except FileNotFoundError:
-    error = "#ignore"
+from tools.app_logging import get_logger
+
+# Get the logger specified in the configuration file
+log = get_logger()
 
 
 class FinancialAnalyst:
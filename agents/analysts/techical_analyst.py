@@ -11,20 +11,14 @@
     - Stock ytd growth.
     - Techical indicators (P/E, EPS, RSI etc.).
 """
-import os
 from typing import Dict
 from components.data_acq_layer import StockDataTech
 from infrence_provider.infrence_provider import InferenceProvider
 from portfolio_item import PortfolioItem
-import logging
-import logging.config
-
-# Load the logging configuration
-logging.config.fileConfig(os.path.abspath(os.path.join(
-    os.path.dirname(__file__), '../../config/logging.config')))
+from tools.app_logging import get_logger
 
 # Get the logger specified in the configuration file
-log = logging.getLogger('sampleLogger')
+log = get_logger()
 
 
 class TechnicalAnalyst:
@@ -71,6 +65,7 @@ class TechnicalAnalyst:
                         - Stock performance numbers.
                         - Stock ytd growth.
                         - Techical indicators (MACD, ADX, RSI, SMA etc.).
+                        - Recent signal events (crossovers, RSI bands, ADX trends) from the event table, if there is one.
     
                     Techical Data:
                     ---
@@ -1,16 +1,11 @@
 import os
 import time
 from infrence_provider.infrence_provider import InferenceProvider
-import logging
-import logging.config
 from agents.critics.prompts import Prompts
-
-# Load the logging configuration
-logging.config.fileConfig(os.path.abspath(os.path.join(
-    os.path.dirname(__file__), '../../config/logging.config')))
+from tools.app_logging import get_logger
 
 # Get the logger specified in the configuration file
-log = logging.getLogger('sampleLogger')
+log = get_logger()
 
 
 class StockReportAgent:
@@ -0,0 +1,78 @@
+"""
+Backtest of the signal rules over all tickers and years at once.
+By default it times synthetic daily bars for 500 tickers over 5 years.
+With --store it backtests the stocks in config/portfolio.json on the local price store instead, and prints the results per ticker.
+
+Run from the repository root:
+    python benchmarks/backtest.py
+    python benchmarks/backtest.py --tickers 100 500 2000 --years 10
+    python benchmarks/backtest.py --store ./data/ohlcv
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.indicator_engine import synthetic_histories  # noqa: E402
+from tools.backtester import backtest, summarize  # noqa: E402
+
+portfolio_file = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '../config/portfolio.json'))
+
+
+def store_histories(folder: str, interval: str) -> dict[str, pd.DataFrame]:
+    from tools.ohlcv_store import OhlcvStore
+
+    store = OhlcvStore(folder)
+    with open(portfolio_file) as f:
+        tickers = [stock["ticker_symbol"]
+                   for stock in json.load(f)["portfolio"]]
+    histories = {ticker_symbol: store.read(ticker_symbol, interval)
+                 for ticker_symbol in tickers}
+    return {ticker_symbol: df for ticker_symbol, df in histories.items() if df is not None}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Backtest the signal rules on many tickers.")
+    parser.add_argument("--tickers", type=int, nargs="+", default=[500],
+                        help="Numbers of synthetic tickers to time")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--store", default=None,
+                        help="Price store folder, backtests the portfolio instead of synthetic bars")
+    parser.add_argument("--interval", default="1d")
+    args = parser.parse_args()
+
+    pd.set_option("display.width", 200)
+    pd.set_option("display.max_columns", 20)
+    if args.store is not None:
+        histories = store_histories(args.store, args.interval)
+        if not histories:
+            print(f"No price history for the portfolio in {args.store}")
+            return 1
+        results = backtest(histories)
+        print(results.round(3))
+        print()
+        print(summarize(results).round(3))
+        return 0
+
+    bars = args.years * 252
+    for tickers in args.tickers:
+        histories = synthetic_histories(tickers, bars)
+        start = time.perf_counter()
+        results = backtest(histories)
+        elapsed = time.perf_counter() - start
+        print(f"{tickers} tickers x {bars} bars: {elapsed:.2f}s")
+        print(summarize(results).round(3))
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Streaming filing text extraction against the BeautifulSoup path it replaced, time and peak memory per filing.
+By default it writes a synthetic full-submission.txt of about 30 MB: the SEC header, an 8-K, a press release exhibit,
+uuencoded images and an archive, and XBRL documents, like a real 8-K with exhibits.
+With --filings it runs on the full-submission.txt files under a folder instead, i.e. ./data/sec-edgar-filings.
+The BeautifulSoup path tokenizes with nltk, which needs the nltk data (nltk.download("stopwords"), nltk.download("punkt_tab")).
+Without it only its reading and parsing is timed.
+
+Run from the repository root:
+    python benchmarks/filing_text.py
+    python benchmarks/filing_text.py --size-mb 80
+    python benchmarks/filing_text.py --filings ./data/sec-edgar-filings
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.filing_text import filing_text, normalize  # noqa: E402
+
+
+def legacy_text(filepath: str) -> str:
+    # SecEdgarDataFetcher.strip_html before the streaming extractor, up to the tokenizing
+    from bs4 import BeautifulSoup
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        contents = f.read()
+    soup = BeautifulSoup(contents, "html.parser")
+    for data in soup(['style', 'script', 'code', 'a']):
+        data.decompose()
+    return ' '.join(soup.stripped_strings)[:2500]
+
+
+def legacy_normalize(text: str) -> str:
+    from nltk.corpus import stopwords
+    from nltk.tokenize import word_tokenize
+
+    tokens = [w.lower() for w in word_tokenize(text)]
+    table = str.maketrans('', '', string.punctuation)
+    stripped = [w.translate(table) for w in tokens]
+    words = [word for word in stripped if word.isalpha() or word.isalnum()]
+    stop_words = set(stopwords.words('english'))
+    return ''.join([w for w in words if not w in stop_words])
+
+
+def nltk_ready() -> bool:
+    try:
+        legacy_normalize("The filing")
+        return True
+    except LookupError:
+        return False
+
+
+def uuencoded(name: str, size: int, rng: random.Random) -> str:
+    # 45 bytes per line, 61 characters per line
+    lines = ["begin 644 " + name]
+    chars = "".join(chr(c) for c in range(33, 96))
+    lines += ["M" + "".join(rng.choices(chars, k=60)) for _ in range(size // 45)]
+    lines += ["`", "end"]
+    return "\n".join(lines)
+
+
+def paragraphs(count: int, rng: random.Random) -> str:
+    words = ["company", "revenue", "quarter", "results", "the", "of", "and", "agreement", "board", "directors",
+             "shares", "million", "fiscal", "operating", "income", "per", "diluted", "guidance", "2024", "net"]
+    return "\n".join(
+        f'<p style="font-family:Times New Roman;font-size:10pt">{" ".join(rng.choices(words, k=80))}.</p>'
+        f'<table><tr><td>Net sales</td><td>$&#160;{rng.randint(100, 99999):,}</td></tr></table>'
+        for _ in range(count))
+
+
+def document(doc_type: str, sequence: int, filename: str, body: str) -> str:
+    return (f"<DOCUMENT>\n<TYPE>{doc_type}\n<SEQUENCE>{sequence}\n<FILENAME>{filename}\n"
+            f"<DESCRIPTION>{doc_type}\n<TEXT>\n{body}\n</TEXT>\n</DOCUMENT>")
+
+
+def synthetic_filing(path: str, size_mb: float, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    header = ("<SEC-DOCUMENT>0000320193-24-000069.txt : 20240502\n<SEC-HEADER>0000320193-24-000069.hdr.sgml : 20240502\n"
+              "ACCESSION NUMBER:\t\t0000320193-24-000069\nCONFORMED SUBMISSION TYPE:\t8-K\nPUBLIC DOCUMENT COUNT:\t\t14\n"
+              "CONFORMED PERIOD OF REPORT:\t20240502\nITEM INFORMATION:\t\tResults of Operations and Financial Condition\n"
+              "FILED AS OF DATE:\t\t20240502\nFILER:\n\tCOMPANY DATA:\n\t\tCOMPANY CONFORMED NAME:\t\t\tApple Inc.\n"
+              "\t\tCENTRAL INDEX KEY:\t\t\t0000320193\n</SEC-HEADER>")
+    style = "<style>" + " ".join(f".c{i}{{font-size:{i}pt}}" for i in range(2000)) + "</style>"
+    form = f"<html><head>{style}</head><body>{paragraphs(400, rng)}</body></html>"
+    release = f"<html><body>{paragraphs(2000, rng)}</body></html>"
+    xbrl = "<xbrl>" + "\n".join(f"<us-gaap:Revenues contextRef=\"c{i}\">{i}</us-gaap:Revenues>"
+                                 for i in range(20000)) + "</xbrl>"
+    binary_bytes = int(size_mb * 1024 * 1024 * 0.6)
+    documents = [document("8-K", 1, "aapl-20240502.htm", form),
+                 document("EX-99.1", 2, "a8-kex991q2202403302024.htm", release),
+                 document("GRAPHIC", 3, "logo.jpg", uuencoded("logo.jpg", binary_bytes // 3, rng)),
+                 document("ZIP", 4, "0000320193-24-000069-xbrl.zip", uuencoded("xbrl.zip", 2 * binary_bytes // 3, rng)),
+                 document("EX-101.SCH", 5, "aapl-20240502.xsd", xbrl),
+                 document("XML", 6, "aapl-20240502_htm.xml", xbrl)]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(header + "\n" + "\n".join(documents) + "\n</SEC-DOCUMENT>\n")
+    # Pad with more of the release until the requested size
+    while os.path.getsize(path) < size_mb * 1024 * 1024:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(document("EX-99.2", 7, "ex992.htm", release) + "\n")
+
+
+def measure(run, filepath: str) -> tuple[float, float, str]:
+    # Time without tracing, then peak memory (MB) with tracemalloc in a second run
+    start = time.perf_counter()
+    result = run(filepath)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    run(filepath)
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Time the streaming filing text extractor against the BeautifulSoup path.")
+    parser.add_argument("--size-mb", type=float, default=30,
+                        help="Size of the synthetic filing")
+    parser.add_argument("--filings", default=None,
+                        help="Folder with full-submission.txt files, used instead of a synthetic filing")
+    args = parser.parse_args()
+
+    if args.filings is not None:
+        filepaths = [os.path.join(folder, filename) for folder, _, filenames in os.walk(args.filings)
+                     for filename in filenames if filename == "full-submission.txt"]
+        if not filepaths:
+            print(f"No full-submission.txt under {args.filings}")
+            return 1
+    else:
+        filepaths = [os.path.join(tempfile.mkdtemp(), "full-submission.txt")]
+        synthetic_filing(filepaths[0], args.size_mb)
+
+    with_nltk = nltk_ready()
+    if not with_nltk:
+        print("nltk data not found, the BeautifulSoup path is timed without tokenizing")
+    paths = {"streaming": lambda filepath: normalize(filing_text(filepath)),
+             "beautifulsoup": (lambda filepath: legacy_normalize(legacy_text(filepath))) if with_nltk else legacy_text}
+
+    print(f"{'filing':>40} {'MB':>6} {'path':>14} {'seconds':>9} {'peak MB':>8} {'chars':>6}")
+    for filepath in filepaths:
+        size = os.path.getsize(filepath) / 1024 / 1024
+        name = os.path.relpath(filepath, args.filings) if args.filings else "synthetic"
+        for path, run in paths.items():
+            elapsed, peak, text = measure(run, filepath)
+            print(f"{name[-40:]:>40} {size:>6.1f} {path:>14} {elapsed:>8.3f}s {peak:>8.1f} {len(text):>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Indicator engine against the pandas_ta path it replaced.
+Both compute SMA 10/50, golden cross, MACD, ADX and RSI on synthetic daily bars, for 10, 1,000 and 10,000 tickers.
+"arrays" is the engine on aligned arrays, "frames" includes making a DataFrame per ticker, which is what the fetcher gets.
+The pandas_ta path runs one ticker at a time, like techical_analysis used to. It is skipped when pandas_ta isn't installed.
+
+Run from the repository root:
+    python benchmarks/indicator_engine.py
+    python benchmarks/indicator_engine.py --tickers 10 100 --bars 250
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.indicator_engine import align, compute_indicators, indicator_arrays  # noqa: E402
+
+
+def synthetic_histories(tickers: int, bars: int, seed: int = 0) -> dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end="2026-01-02", periods=bars, name="Date")
+    frames = {}
+    for i in range(tickers):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+        frames[f"T{i}"] = pd.DataFrame({
+            "Open": close * (1 + rng.normal(0, 0.005, bars)),
+            "High": close * (1 + rng.uniform(0, 0.02, bars)),
+            "Low": close * (1 - rng.uniform(0, 0.02, bars)),
+            "Close": close,
+            "Volume": rng.integers(1_000, 1_000_000, bars),
+        }, index=index)
+    return frames
+
+
+def pandas_ta_analysis(df: pd.DataFrame, ta) -> pd.DataFrame:
+    # The indicator part of techical_analysis before the engine
+    df = df.copy()
+    sma_short = ta.sma(df['Close'], length=10)
+    df['SMA_10'] = sma_short
+    sma_long = ta.sma(df['Close'], length=50)
+    df['SMA_50'] = sma_long
+    df['Golden Cross'] = sma_short > sma_long
+    df = df.join(ta.macd(df['Close']))
+    df = df.join(ta.adx(df['High'], df['Low'], df['Close']))
+    df['RSI'] = ta.rsi(df['Close'])
+    return df
+
+
+def timed(run) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = run()
+    return time.perf_counter() - start, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Time the indicator engine against pandas_ta.")
+    parser.add_argument("--tickers", type=int, nargs="+", default=[10, 1_000, 10_000],
+                        help="Portfolio sizes to time")
+    parser.add_argument("--bars", type=int, default=63,
+                        help="Daily bars per ticker (63 is 3 months, the fetcher uses FetchWindow.bars())")
+    args = parser.parse_args()
+
+    try:
+        import pandas_ta as ta
+    except ImportError:
+        ta = None
+        print("pandas_ta is not installed, only timing the engine")
+
+    print(f"{'tickers':>8} {'arrays':>10} {'frames':>10} {'pandas_ta':>10} {'speedup':>8} {'max diff':>10}")
+    for tickers in args.tickers:
+        frames = synthetic_histories(tickers, args.bars)
+        prices = [align(frames, column, args.bars)
+                  for column in ["Close", "High", "Low"]]
+        arrays_time, _ = timed(lambda: indicator_arrays(*prices))
+        engine_time, engine_results = timed(lambda: compute_indicators(frames))
+
+        if ta is None:
+            print(f"{tickers:>8} {arrays_time:>9.3f}s {engine_time:>9.3f}s {'-':>10} {'-':>8} {'-':>10}")
+            continue
+
+        ta_time, ta_results = timed(
+            lambda: {ticker_symbol: pandas_ta_analysis(df, ta) for ticker_symbol, df in frames.items()})
+        # Same columns, same numbers
+        max_diff = 0.0
+        for ticker_symbol, expected in ta_results.items():
+            actual = engine_results[ticker_symbol][expected.columns]
+            numeric = expected.columns.drop("Golden Cross")
+            max_diff = max(max_diff, float(
+                (expected[numeric] - actual[numeric]).abs().max().max()))
+        print(f"{tickers:>8} {arrays_time:>9.3f}s {engine_time:>9.3f}s {ta_time:>9.3f}s {ta_time / engine_time:>7.1f}x {max_diff:>10.2e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Startup time budget for the entry points.
+Imports each entry point in a fresh interpreter (cold start, like the host application spawning a script)
+and fails when the best of a few runs is over budget. For entry points over budget, the slowest imports are listed.
+
+Run from the repository root:
+    python benchmarks/startup_budget.py
+    python benchmarks/startup_budget.py --budget 0.5 --repeat 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Entry points and their import budget in seconds
+ENTRY_POINTS = {
+    "main": 1.0,
+    "single_advice": 1.0,
+    "single_advice_technical": 1.0,
+    "single_advice_fincancial": 1.0,
+    "single_stock_analysis_agent": 1.0,
+    "worker_server": 1.0,
+}
+
+
+def cold_start(module: str) -> float:
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", f"import {module}"],
+                            cwd=repo_root, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+    return elapsed
+
+
+def slowest_imports(module: str, count: int = 10) -> list[tuple[int, str]]:
+    # -X importtime writes "import time: self [us] | cumulative | name" to stderr
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=repo_root, capture_output=True, text=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            imports.append((int(parts[1]), parts[2].strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Fail when cold start of an entry point is over budget.")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Budget in seconds for all entry points (overrides the defaults)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per entry point, the best one counts")
+    args = parser.parse_args()
+
+    failed = []
+    for module, budget in ENTRY_POINTS.items():
+        budget = args.budget if args.budget is not None else budget
+        best = min(cold_start(module) for _ in range(args.repeat))
+        status = "ok" if best <= budget else "OVER BUDGET"
+        print(f"{module:<30} {best:6.2f}s  (budget {budget:.2f}s)  {status}")
+        if best > budget:
+            failed.append(module)
+            for cumulative_us, name in slowest_imports(module):
+                print(f"    {cumulative_us / 1e6:6.2f}s  {name}")
+
+    if failed:
+        print(f"{len(failed)} entry points over budget: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,14 @@
-import os
 from typing import Dict
 from agents.analysts.fin_statement_analyst import FinancialAnalyst
 from agents.analysts.techical_analyst import TechnicalAnalyst
-import logging
-import logging.config
 
 from components.data_acq_layer import StockDataFin, StockDataTech
 from infrence_provider.infrence_provider import InferenceProvider
 from portfolio_item import PortfolioItem
-
-# Load the logging configuration
-logging.config.fileConfig(os.path.abspath(os.path.join(
-    os.path.dirname(__file__), '../config/logging.config')))
+from tools.app_logging import get_logger
 
 # Get the logger specified in the configuration file
-log = logging.getLogger('sampleLogger')
+log = get_logger()
 
 
 class TechnicalDataAnalyst:
@@ -0,0 +1,58 @@
+import os
+import pickle
+import tempfile
+from typing import Any, Callable
+from tools.app_logging import get_logger
+
+# Get the logger specified in the configuration file
+log = get_logger()
+
+# Stages of the analysis pipeline, in the order they are produced
+STAGE_FETCH = "fetch"
+STAGE_INDICATORS = "indicators"
+STAGE_TECHNICAL = "technical_analysis"
+STAGE_FINANCIAL = "financial_analysis"
+STAGE_ADVICE = "advice"
+STAGE_SUMMARY = "summary"
+
+
+class CheckpointStore:
+    """
+    Keeps the output of every pipeline stage for a run, by ticker and stage.
+    A restarted run loads the stages that are already done, and continues at the first missing one.
+    """
+
+    def __init__(self, run_folder: str) -> None:
+        self.run_folder = run_folder
+        self.folder = os.path.join(run_folder, "checkpoints")
+
+    def path(self, ticker_symbol: str, stage: str) -> str:
+        return os.path.join(self.folder, ticker_symbol, f"{stage}.pkl")
+
+    def has(self, ticker_symbol: str, stage: str) -> bool:
+        return os.path.exists(self.path(ticker_symbol, stage))
+
+    def load(self, ticker_symbol: str, stage: str) -> Any:
+        log.info(f"Resuming {ticker_symbol} from checkpoint: {stage}")
+        with open(self.path(ticker_symbol, stage), "rb") as f:
+            return pickle.load(f)
+
+    def save(self, ticker_symbol: str, stage: str, value: Any) -> Any:
+        path = self.path(ticker_symbol, stage)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and move it in place, so a crash never leaves half a checkpoint
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return value
+
+    def get_or_run(self, ticker_symbol: str, stage: str, task: Callable[[], Any]) -> Any:
+        if self.has(ticker_symbol, stage):
+            return self.load(ticker_symbol, stage)
+        return self.save(ticker_symbol, stage, task())
@@ -1,17 +1,20 @@
 from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
 
-import pandas as pd
+# pandas is only needed for the type hints here, so it isn't imported until a fetcher needs it
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class StockDataTech:
-    def __init__(self, fetcher_name: str, info: dict, techical_indicators: list[pd.DataFrame]) -> None:
+    def __init__(self, fetcher_name: str, info: dict, techical_indicators: "list[pd.DataFrame]") -> None:
         self.fetcher_name = fetcher_name
         self.info = info
         self.techical_indicators = techical_indicators
 
 
 class StockDataFin:
-    def __init__(self, fetcher_name: str, info: dict, financial_indicators: list[pd.DataFrame]) -> None:
+    def __init__(self, fetcher_name: str, info: dict, financial_indicators: "list[pd.DataFrame]") -> None:
         self.fetcher_name = fetcher_name
         self.info = info
         self.financial_indicators = financial_indicators
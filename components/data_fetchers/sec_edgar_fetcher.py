@@ -1,13 +1,17 @@
-import json
 import os
-import pandas as pd
-from bs4 import BeautifulSoup
-from sec_cik_mapper import StockMapper
+import threading
+from typing import List, Optional, Set
 from components.data_acq_layer import DataFetcher, StockDataFin
-from sec_edgar_downloader import Downloader
-from nltk.corpus import stopwords
-import string
-from nltk.tokenize import word_tokenize
+from tools.app_logging import get_logger
+from tools.cik_index import CikIndex
+from tools.edgar_prefetcher import EdgarPrefetcher, edgar_config
+from tools.filing_manifest import FilingManifest
+from tools.filing_text import filing_text, normalize, submission_header
+
+# pandas is slow to import, so it is loaded when it is used
+
+# Get the logger specified in the configuration file
+log = get_logger()
 
 # https://www.sec.gov/include/ticker.txt
 
@@ -16,92 +20,83 @@ class SecEdgarDataFetcher(DataFetcher):
 
     def __init__(self):
 
+        # The fetcher is shared between workers
+        self.lock = threading.Lock()
+
         if not os.path.exists("./data/"):
             os.mkdir("./data/")
-        if not os.path.exists("./data/sec_cik_tickers.json"):
-
-            # Initialize a stock mapper instance
-            mapper = StockMapper()
-
-            # Get mapping from ticker to CIK
-            tickers_dict = mapper.ticker_to_cik
-
-            with open("./data/sec_cik_tickers.json", "w", encoding="utf8") as f:
-                json.dump(tickers_dict, f, ensure_ascii=False, indent=4)
-            self.edgar_tickers = tickers_dict
-        else:
-            with open("./data/sec_cik_tickers.json", "r", encoding="utf8") as f:
-                self.edgar_tickers = json.load(f)
+        # Ticker to CIK lookup, opened on the first lookup instead of loading the whole SEC map here
+        self.cik_index = CikIndex(
+            "./data/sec_cik.sqlite", edgar_config()["cik_max_age_days"])
+        # Text of the filings processed on earlier runs
+        self.filing_manifest = FilingManifest("./data/sec_filings.sqlite")
+        # Downloads of the forms and dates in "sec_edgar" in app_config.json, made on first use
+        self.prefetcher: Optional[EdgarPrefetcher] = None
+        # Tickers whose folder has been checked against the manifest by this process
+        self.reconciled: Set[str] = set()
+
+    def get_prefetcher(self) -> EdgarPrefetcher:
+        with self.lock:
+            if self.prefetcher is None:
+                self.prefetcher = EdgarPrefetcher(
+                    self.cik_index, "./data/", edgar_config())
+            return self.prefetcher
+
+    def prefetch(self, ticker_symbols: List[str]) -> None:
+        # Starts downloading the filings of all tickers in the background
+        self.get_prefetcher().start(ticker_symbols)
+
+    def cik(self, ticker_symbol: str):
+        return self.cik_index.cik(ticker_symbol)
 
     def strip_html(self, filepath):
-        with open(filepath, 'r', encoding='utf-8') as f:
-            contents = f.read()
-
-        # Parse the HTML content
-        soup = BeautifulSoup(contents, "html.parser")
-        for data in soup(['style', 'script', 'code', 'a']):
-            # Remove tags
-            data.decompose()
-
-        # return data by retrieving the tag content
-        strs = soup.stripped_strings
-        text = ' '.join(strs)[:2500]
-        # Extract all text and return
-        # text = soup.get_text()
-
-        # split into words
-        tokens = word_tokenize(text)
-        # convert to lower case
-        tokens = [w.lower() for w in tokens]
-        # remove punctuation from each word
-        table = str.maketrans('', '', string.punctuation)
-        stripped = [w.translate(table) for w in tokens]
-        # remove remaining tokens that are not alphabetic
-        words = [word for word in stripped if word.isalpha()
-                 or word.isalnum()]
-        # filter out stop words
-        stop_words = set(stopwords.words('english'))
-        words = [w for w in words if not w in stop_words]
-
-        return ''.join(words)
+        # The start of the filing's text, read without loading the whole submission
+        return normalize(filing_text(filepath))
 
     def fetch_data(self, ticker_symbol: str) -> StockDataFin:
+        import pandas as pd
 
         info = {}
         info["SEC data for ticker"] = ticker_symbol
+        info["CIK"] = self.cik(ticker_symbol)
 
         # Directory containing all folders within ticker directory
         base_dir = f'./data/sec-edgar-filings/{ticker_symbol}/'
 
-        # Avoid overuse of edgar api, since its rate limit to 10 req/min
-        filings = self.load_filings(base_dir)
-        if len(filings) != 0:
-
-            return StockDataFin(SecEdgarDataFetcher.__name__, info, [pd.DataFrame(filings)])
-
-        dl = Downloader("MyCompanyName", "my.email@domain.com", "./data/")
-        # 10-K anual reoport
-        # 10-Q, 10-Q/A Quarterly report
-        # 8-K, 8-K/A Current report filing
-        # Note: after and before strings must be in the form "YYYY-MM-DD"
-        try:
-            nbr_filings = dl.get("8-K", ticker_symbol,
-                                 after="2024-05-01", before="2024-06-25")
-            filings = self.load_filings(base_dir)
-        except:
+        # Usually prefetched at the start of the run, otherwise the ticker is downloaded first
+        prefetcher = self.get_prefetcher()
+        if not prefetcher.wait(ticker_symbol, prefetcher.config["wait_seconds"]):
+            log.warning(
+                f"SEC filings of {ticker_symbol} are still downloading, using the ones on disk")
+        filings = self.load_filings(base_dir, prefetcher)
+        if len(filings) == 0:
             return StockDataFin(SecEdgarDataFetcher.__name__, info, [])
         # filepath = '.\\sec-edgar-filings\\NVO\\6-K\\0001171843-24-002400\\full-submission.txt'
         return StockDataFin(SecEdgarDataFetcher.__name__, info, [pd.DataFrame(filings)])
 
-    def load_filings(self, base_dir):
+    def load_filings(self, base_dir, prefetcher):
+        # Filings already in the manifest are read from it, only the downloaded ones not parsed yet are parsed.
+        # The first fetch of a ticker in a process checks its whole folder against the manifest (size and modification
+        # time), so filings downloaded by an earlier process that stopped before parsing them are picked up.
+        # A download stays in new_filings() until it is in the manifest, so a failed parse is tried again on the next fetch.
+        ticker_symbol = os.path.basename(os.path.normpath(base_dir))
+        new_paths = prefetcher.new_filings(ticker_symbol)
+        with self.lock:
+            reconciled = ticker_symbol in self.reconciled
+        if reconciled:
+            for path in new_paths:
+                if os.path.exists(path):
+                    self.filing_manifest.processed(
+                        ticker_symbol, path, self.strip_html, submission_header)
+                prefetcher.parsed(ticker_symbol, [path])
+        else:
+            self.filing_manifest.update(
+                ticker_symbol, base_dir, self.strip_html, submission_header)
+            prefetcher.parsed(ticker_symbol, new_paths)
+            with self.lock:
+                self.reconciled.add(ticker_symbol)
         filings = {}
-
-        # Iterate through all directories and files under base_dir
-        for foldername, subfolders, filenames in os.walk(base_dir):
-            for filename in filenames:
-                if filename == 'full-submission.txt':
-                    # Get the full path to the file
-                    filepath = os.path.join(foldername, filename)
-                    filings[foldername] = {
-                        foldername: self.strip_html(filepath)}
+        for filing in self.filing_manifest.filings(ticker_symbol):
+            foldername = os.path.dirname(filing["path"])
+            filings[foldername] = {foldername: filing["text"]}
         return filings
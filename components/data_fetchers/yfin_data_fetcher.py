@@ -1,16 +1,120 @@
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional
 from components.data_acq_layer import DataFetcher, StockDataFin, StockDataTech
-from tools.tecnical_data_tools import get_financial_numbers, hum_stock_analyzer_tool
+from tools.app_logging import get_logger
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from tools.fundamentals_store import FundamentalsStore
+    from tools.indicator_state import IndicatorStateStore
+    from tools.ohlcv_store import OhlcvStore
+    from tools.ticker_session import TickerSessionRegistry
+
+# Get the logger specified in the configuration file
+log = get_logger()
 
 
 class YFinanceTechicalDataFetcher(DataFetcher):
+    def __init__(self, price_store_folder: Optional[str] = "./data/ohlcv", sessions: "Optional[TickerSessionRegistry]" = None,
+                 indicator_state_folder: Optional[str] = None):
+        # Price history is kept on disk, so only new bars are downloaded. None downloads the full period every time.
+        self.price_store_folder = price_store_folder
+        # With a folder, indicator state is kept per ticker and only new bars are computed (i.e. for intraday refresh)
+        self.indicator_state_folder = indicator_state_folder
+        self.indicator_states: "Optional[IndicatorStateStore]" = None
+        # Ticker payloads (info, quotes) shared with the other yfinance fetchers
+        self.sessions = sessions
+        self.price_store: "Optional[OhlcvStore]" = None
+        # Price history downloaded in bulk by prefetch, used once by fetch_data
+        self.prefetched: "Dict[str, pd.DataFrame]" = {}
+        self.lock = threading.Lock()
+
+    def get_price_store(self) -> "Optional[OhlcvStore]":
+        with self.lock:
+            if self.price_store is None and self.price_store_folder is not None:
+                from tools.ohlcv_store import OhlcvStore
+                self.price_store = OhlcvStore(self.price_store_folder)
+            return self.price_store
+
+    def get_indicator_states(self) -> "Optional[IndicatorStateStore]":
+        with self.lock:
+            if self.indicator_states is None and self.indicator_state_folder is not None:
+                from tools.fetch_window import fetch_window
+                from tools.indicator_state import IndicatorStateStore
+                self.indicator_states = IndicatorStateStore(
+                    self.indicator_state_folder, fetch_window().interval)
+            return self.indicator_states
+
+    def prefetch(self, ticker_symbols: List[str]) -> "Dict[str, pd.DataFrame]":
+        # Download the price history of all tickers with a few bulk requests, instead of one request per ticker
+        from tools.tecnical_data_tools import fetch_stock_histories
+
+        histories = fetch_stock_histories(
+            ticker_symbols, self.get_price_store())
+        log.info(
+            f"Prefetched price history for {len(histories)} of {len(ticker_symbols)} tickers")
+        with self.lock:
+            self.prefetched.update(histories)
+        return histories
+
     def fetch_data(self, ticker_symbol: str) -> StockDataTech:
+        # yfinance is slow to import, so it is loaded on the first fetch
+        from tools.tecnical_data_tools import hum_stock_analyzer_tool
 
-        (info, data_tables) = hum_stock_analyzer_tool(ticker_symbol)
+        with self.lock:
+            price_history = self.prefetched.pop(ticker_symbol, None)
+        (info, data_tables) = hum_stock_analyzer_tool(
+            ticker_symbol, self.get_price_store(), price_history, self.sessions, indicator_states=self.get_indicator_states())
         return StockDataTech(YFinanceTechicalDataFetcher.__name__, info, data_tables)
 
+    def fetch_many(self, ticker_symbols: List[str]) -> Dict[str, StockDataTech]:
+        """
+        Fetches many tickers, with the price history of all of them downloaded in bulk,
+        and the indicators and signal events of all of them computed in one pass.
+        Tickers that fail are logged and left out.
+        """
+        import pandas as pd
+        from tools.signal_engine import signal_events, ticker_events
+        from tools.tecnical_data_tools import hum_stock_analyzer_tool, techical_analysis_many
+
+        histories = self.prefetch(ticker_symbols)
+        analysed = techical_analysis_many(
+            histories, self.get_indicator_states())
+        # Signal events of all tickers in one pass, tickers without events get an empty table
+        events = ticker_events(signal_events(analysed))
+        results = {}
+        for ticker_symbol in ticker_symbols:
+            try:
+                with self.lock:
+                    price_history = self.prefetched.pop(ticker_symbol, None)
+                (info, data_tables) = hum_stock_analyzer_tool(
+                    ticker_symbol, self.get_price_store(), price_history, self.sessions, analysed.get(ticker_symbol),
+                    events=events.get(ticker_symbol, pd.DataFrame()))
+                results[ticker_symbol] = StockDataTech(
+                    YFinanceTechicalDataFetcher.__name__, info, data_tables)
+            except Exception as e:
+                log.error(f"Error fetching {ticker_symbol}: {e}")
+        return results
+
 
 class YFinanceFinDataFetcher(DataFetcher):
+    def __init__(self, sessions: "Optional[TickerSessionRegistry]" = None, fundamentals_folder: Optional[str] = "./data/fundamentals"):
+        self.sessions = sessions
+        # Statement numbers are kept on disk, new periods are added when they are filed. None reads the statements every time.
+        self.fundamentals_folder = fundamentals_folder
+        self.fundamentals: "Optional[FundamentalsStore]" = None
+        self.lock = threading.Lock()
+
+    def get_fundamentals(self) -> "Optional[FundamentalsStore]":
+        with self.lock:
+            if self.fundamentals is None and self.fundamentals_folder is not None:
+                from tools.fundamentals_store import FundamentalsStore
+                self.fundamentals = FundamentalsStore(self.fundamentals_folder)
+            return self.fundamentals
+
     def fetch_data(self, ticker_symbol: str) -> StockDataFin:
+        from tools.tecnical_data_tools import get_financial_numbers
 
-        (info, data_tables) = get_financial_numbers(ticker_symbol)
+        (info, data_tables) = get_financial_numbers(
+            ticker_symbol, self.sessions, self.get_fundamentals())
         return StockDataFin(YFinanceFinDataFetcher.__name__, info, data_tables)
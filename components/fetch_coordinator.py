@@ -0,0 +1,129 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List
+
+from components.data_acq_layer import DataFetcher
+from tools.app_logging import get_logger
+
+# Get the logger specified in the configuration file
+log = get_logger()
+
+
+class FetcherSpec:
+    # A registered fetcher, with how long we are willing to wait for it and if the analysis needs it.
+    # An optional fetcher is only waited for with wait, its errors and timeouts are logged and the analysis goes on.
+    def __init__(self, fetcher: DataFetcher, timeout: float, required: bool = True, wait: bool = False) -> None:
+        self.fetcher = fetcher
+        self.timeout = timeout
+        self.required = required
+        self.wait = required or wait
+        self.name = fetcher.__class__.__name__
+
+
+class FetchCoordinator:
+    """
+    Runs all fetchers for a ticker at the same time.
+    Returns as soon as the required fetchers are in, and raises when one of them failed or timed out. Each fetcher is limited by its own deadline,
+    so a slow source doesn't add to the total. Latency is recorded per fetcher.
+    A fetcher still running at its deadline can't be stopped, its thread runs on in the background until fetch_data
+    returns and the result is dropped. Fetchers bound their own network calls, so these threads end.
+    """
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = {}
+        self.timeouts: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def fetch(self, ticker_symbol: str, specs: List[FetcherSpec]) -> Dict[FetcherSpec, Any]:
+        if not specs:
+            return {}
+
+        results: Dict[FetcherSpec, Any] = {}
+        errors: Dict[FetcherSpec, Exception] = {}
+        start = time.monotonic()
+        # Own pool per call, so a fetcher that hangs past its deadline can't block fetches for other tickers
+        executor = ThreadPoolExecutor(
+            max_workers=len(specs), thread_name_prefix=f"fetch-{ticker_symbol}")
+        futures: Dict[Future, FetcherSpec] = {executor.submit(self._timed_fetch, spec, ticker_symbol): spec
+                                              for spec in specs}
+        pending = set(futures)
+        try:
+            while True:
+                now = time.monotonic()
+                expired = [future for future in pending
+                           if now - start >= futures[future].timeout]
+                for future in expired:
+                    pending.discard(future)
+                    self._record_timeout(ticker_symbol, futures[future])
+                if not any(futures[future].wait for future in pending):
+                    break
+
+                next_deadline = min(
+                    start + futures[future].timeout for future in pending)
+                done, pending = wait(pending, timeout=max(0, next_deadline - now),
+                                     return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._collect(ticker_symbol, futures[future], future, results, errors)
+
+            # Fetchers that aren't waited for only make it in if they are already done
+            for future in pending:
+                if future.done():
+                    self._collect(ticker_symbol, futures[future], future, results, errors)
+                else:
+                    log.info(
+                        f"Not waiting for optional {futures[future].name} on {ticker_symbol}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        # The analysis can't run without a required source, its error goes to the caller
+        for spec in specs:
+            if spec.required and spec not in results:
+                if spec in errors:
+                    raise errors[spec]
+                raise TimeoutError(
+                    f"Timeout fetching data for {ticker_symbol} from {spec.name} after {spec.timeout}s")
+
+        log.info(
+            f"Fetched {len(results)}/{len(specs)} sources for {ticker_symbol} in {time.monotonic() - start:.2f}s")
+        return results
+
+    def latency_summary(self) -> Dict[str, Dict[str, float]]:
+        # Count, mean and max latency in seconds, and number of timeouts, per fetcher
+        with self.lock:
+            summary = {}
+            for name in set(self.latencies) | set(self.timeouts):
+                samples = self.latencies.get(name, [])
+                summary[name] = {
+                    "count": len(samples),
+                    "mean": sum(samples) / len(samples) if samples else 0.0,
+                    "max": max(samples) if samples else 0.0,
+                    "timeouts": self.timeouts.get(name, 0),
+                }
+            return summary
+
+    def _timed_fetch(self, spec: FetcherSpec, ticker_symbol: str) -> Any:
+        start = time.monotonic()
+        try:
+            return spec.fetcher.fetch_data(ticker_symbol)
+        finally:
+            elapsed = time.monotonic() - start
+            with self.lock:
+                self.latencies.setdefault(spec.name, []).append(elapsed)
+            log.debug(
+                f"{spec.name} fetched {ticker_symbol} in {elapsed:.2f}s")
+
+    def _collect(self, ticker_symbol: str, spec: FetcherSpec, future: Future, results: Dict[FetcherSpec, Any],
+                 errors: Dict[FetcherSpec, Exception]) -> None:
+        try:
+            results[spec] = future.result()
+        except Exception as e:
+            errors[spec] = e
+            log.error(
+                f"Error fetching data for {ticker_symbol} from {spec.name}: {e}")
+
+    def _record_timeout(self, ticker_symbol: str, spec: FetcherSpec) -> None:
+        with self.lock:
+            self.timeouts[spec.name] = self.timeouts.get(spec.name, 0) + 1
+        log.error(
+            f"Timeout fetching data for {ticker_symbol} from {spec.name} after {spec.timeout}s")
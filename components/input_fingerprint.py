@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+from components.checkpoint_store import STAGE_ADVICE, STAGE_FINANCIAL, STAGE_TECHNICAL, CheckpointStore
+from components.data_fetchers.yfin_data_fetcher import YFinanceTechicalDataFetcher
+from tools.app_logging import get_logger
+
+# Get the logger specified in the configuration file
+log = get_logger()
+
+
+def fingerprint_inputs(fetched: Dict[str, list]) -> str:
+    """
+    Hash of everything the analysts get to see for a ticker.
+    For the price history only the last bar counts, the rest of the frame is derived from older bars that don't change.
+    """
+    digest = hashlib.sha256()
+
+    def add(value) -> None:
+        digest.update(str(value).encode("utf-8"))
+        digest.update(b"\0")
+
+    for data in fetched["technical_data"]:
+        add(data.fetcher_name)
+        add(json.dumps(data.info, sort_keys=True, default=str))
+        for i, table in enumerate(data.techical_indicators or []):
+            # The first yfinance table is the price history with the indicators, picked by position and not by object,
+            # so a resumed run (stages loaded from separate checkpoints) hashes the same as a fresh one
+            if data.fetcher_name == YFinanceTechicalDataFetcher.__name__ and i == 0:
+                add(table.tail(1).to_csv())
+            else:
+                add(table.to_csv())
+
+    for data in fetched["financial_data"]:
+        add(data.fetcher_name)
+        add(json.dumps(data.info, sort_keys=True, default=str))
+        for table in data.financial_indicators or []:
+            add(table.to_csv())
+
+    return digest.hexdigest()
+
+
+class FingerprintIndex:
+    """
+    Remembers the input fingerprint of each ticker, and the run that analysed those inputs.
+    When a ticker's inputs haven't changed (weekends, holidays, illiquid tickers), the reports from that run are reused instead of calling the LLM.
+    """
+
+    def __init__(self, path: str = "./data/input_fingerprints.json") -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.reused: List[str] = []
+        self.analysed: List[str] = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf8") as f:
+                self.entries: Dict[str, Dict[str, str]] = json.load(f)
+        else:
+            self.entries = {}
+
+    def previous_run(self, ticker_symbol: str, fingerprint: str) -> Optional[CheckpointStore]:
+        # Checkpoints of the run that analysed the same inputs, if it is still there
+        with self.lock:
+            entry = self.entries.get(ticker_symbol)
+        if entry is not None and entry["fingerprint"] == fingerprint:
+            previous = CheckpointStore(entry["run_folder"])
+            if all(previous.has(ticker_symbol, stage) for stage in [STAGE_TECHNICAL, STAGE_FINANCIAL, STAGE_ADVICE]):
+                log.info(
+                    f"Inputs for {ticker_symbol} are unchanged since {entry['run_folder']}, reusing reports")
+                with self.lock:
+                    self.reused.append(ticker_symbol)
+                return previous
+        with self.lock:
+            self.analysed.append(ticker_symbol)
+        return None
+
+    def record(self, ticker_symbol: str, fingerprint: str, run_folder: str) -> None:
+        with self.lock:
+            self.entries[ticker_symbol] = {
+                "fingerprint": fingerprint, "run_folder": run_folder}
+            os.makedirs(os.path.dirname(
+                os.path.abspath(self.path)), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf8") as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_path, self.path)
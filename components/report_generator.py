@@ -4,8 +4,8 @@ import time
 
 class ReportGenerator:
     def ensure_report_dir(self, report_folder: str):
-        if not os.path.exists(report_folder):
-            os.mkdir(report_folder)
+        # Several workers can write reports at the same time, so don't fail if another one created the folder first
+        os.makedirs(report_folder, exist_ok=True)
 
     def write_to_file(self, report_folder: str, file_name: str, text: str) -> str:
         self.ensure_report_dir(report_folder)
@@ -15,6 +15,11 @@ class ReportGenerator:
         return os.path.abspath(file_path)
 
     def write_stock_report(self, report_folder: str, ticker_symbol: str, stock_advice: str) -> str:
+        report = self.make_stock_report(ticker_symbol, stock_advice)
+        output_filename = f"{ticker_symbol}_report.md"
+        return self.write_to_file(report_folder, output_filename, report)
+
+    def make_stock_report(self, ticker_symbol: str, stock_advice: str) -> str:
         # Generate markdown report
 
         report_time = time.time()
@@ -27,9 +32,7 @@ class ReportGenerator:
             f"> Ticker code: {ticker_symbol}\n"
             f"> Report generated at: {time.ctime(report_time)}",
         ])
-
-        output_filename = f"{ticker_symbol}_report.md"
-        return self.write_to_file(report_folder, output_filename, report)
+        return report
 
     def write_advice_report(self, report_folder: str, portfolio_advice: str) -> str:
         report_time = time.time()
@@ -0,0 +1,65 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+
+class TaskGraph:
+    """
+    Small dependency graph of named tasks.
+    A task starts as soon as the tasks it depends on are done, so independent tasks run at the same time.
+    Each task is called with the results of its dependencies, in the order they are listed.
+    """
+
+    def __init__(self) -> None:
+        self.tasks: Dict[str, Callable[..., Any]] = {}
+        self.dependencies: Dict[str, List[str]] = {}
+
+    def add(self, name: str, task: Callable[..., Any], depends_on: Optional[List[str]] = None) -> None:
+        depends_on = depends_on or []
+        if name in self.tasks:
+            raise ValueError(f"Task '{name}' is already in the graph")
+        for dependency in depends_on:
+            if dependency not in self.tasks:
+                raise ValueError(
+                    f"Task '{name}' depends on unknown task '{dependency}'")
+        self.tasks[name] = task
+        self.dependencies[name] = list(depends_on)
+
+    def run(self, targets: Optional[List[str]] = None) -> Dict[str, Any]:
+        # Only the targets and what they depend on are run. Default is the whole graph.
+        # Tasks can only depend on tasks added before them, so the graph has no cycles
+        results: Dict[str, Any] = {}
+        running: Dict[Future, str] = {}
+        waiting = self.needed_tasks(targets or list(self.tasks))
+
+        with ThreadPoolExecutor(max_workers=max(1, len(self.tasks)), thread_name_prefix="task") as executor:
+            while waiting or running:
+                for name in [name for name in waiting
+                             if all(dependency in results for dependency in self.dependencies[name])]:
+                    waiting.remove(name)
+                    args = [results[dependency]
+                            for dependency in self.dependencies[name]]
+                    running[executor.submit(self.tasks[name], *args)] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        # Nothing that depends on a failed task can run, so stop here
+                        for other in running:
+                            other.cancel()
+                        raise
+        return results
+
+    def needed_tasks(self, targets: List[str]) -> List[str]:
+        needed = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.tasks:
+                raise ValueError(f"Unknown task '{name}'")
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.dependencies[name])
+        return [name for name in self.tasks if name in needed]
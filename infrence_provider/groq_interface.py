@@ -1,20 +1,16 @@
 import json
-import logging
-import logging.config
 from typing import Any, Dict, Optional
-from groq import Groq
+from groq import AsyncGroq, Groq
 import os
 
 from infrence_provider.infrence_provider import InferenceProvider
+from tools.app_logging import get_logger
 
 config_path = os.path.abspath(os.path.join(
     os.path.dirname(__file__), '../config/'))
 
-# Load the logging configuration
-logging.config.fileConfig(os.path.join(config_path, "logging.config"))
-
 # Get the logger specified in the configuration file
-log = logging.getLogger('sampleLogger')
+log = get_logger()
 
 
 class GroqInterface(InferenceProvider):
@@ -48,19 +44,36 @@ class GroqInterface(InferenceProvider):
         self.client = Groq(api_key=self.api_key)
 
     def infer(self, prompt: str, temperature: float = 1.0) -> str:
-        # Placeholder for actual Groq API call
         response = self.client.chat.completions.create(
+            **self.completion_args(prompt, temperature))
+        return response.choices[0].message.content or ""
+
+    def infer_structured(self, prompt: str, expected_format: str, temperature: float = 1.0) -> str:
+        response = self.client.chat.completions.create(
+            **self.structured_completion_args(prompt, expected_format, temperature))
+        return response.choices[0].message.content or ""
+
+    async def ainfer(self, prompt: str, temperature: float = 1.0) -> str:
+        response = await self.get_async_client().chat.completions.create(
+            **self.completion_args(prompt, temperature))
+        return response.choices[0].message.content or ""
+
+    async def ainfer_structured(self, prompt: str, expected_format: str, temperature: float = 1.0) -> str:
+        response = await self.get_async_client().chat.completions.create(
+            **self.structured_completion_args(prompt, expected_format, temperature))
+        return response.choices[0].message.content or ""
+
+    def completion_args(self, prompt: str, temperature: float) -> Dict[str, Any]:
+        return dict(
             messages=[{"role": "user", "content": prompt}],
             model=self.model,
             temperature=temperature,
             # max_completion_tokens=1024,
             # top_p=1,
         )
-        return response.choices[0].message.content or ""
 
-    def infer_structured(self, prompt: str, expected_format: str, temperature: float = 1.0) -> str:
-        # Placeholder for actual Groq API call
-        response = self.client.chat.completions.create(
+    def structured_completion_args(self, prompt: str, expected_format: str, temperature: float) -> Dict[str, Any]:
+        return dict(
             messages=[{"role": "user", "content": prompt}, {
                 "role": "assistant",
                 "content": f"```{expected_format}"
@@ -71,7 +84,9 @@ class GroqInterface(InferenceProvider):
             # top_p=1,
             stop="```",
         )
-        return response.choices[0].message.content or ""
+
+    def get_async_client(self) -> AsyncGroq:
+        return self.async_client(lambda: AsyncGroq(api_key=self.api_key))
 
     def get_provider_name(self) -> str:
         return "Groq"
@@ -1,11 +1,20 @@
+import asyncio
 import os
+import threading
+import weakref
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Callable, Dict, Any, TypeVar
+
+Client = TypeVar("Client")
+
+# Guards the async clients of every provider, subclasses don't call the base __init__
+_async_clients_lock = threading.Lock()
 
 
 class InferenceProvider(ABC):
     """
     Abstract Base Class defining the interface for an inference provider.
+    One instance is shared by all worker threads, so implementations must not keep per-request state on the instance.
     """
     @abstractmethod
     def __init__(self, config: Dict[str, Any]):
@@ -28,6 +37,35 @@ class InferenceProvider(ABC):
         """
         pass
 
+    async def ainfer(self, prompt: str, temperature: float = 1.0) -> str:
+        """
+        Async version of infer.
+        Providers with an async client should override this. The default runs the blocking infer in a worker thread,
+        so every provider can be used from async code.
+        """
+        return await asyncio.to_thread(self.infer, prompt, temperature)
+
+    async def ainfer_structured(self, prompt: str, expected_format: str, temperature: float = 1.0) -> str:
+        """
+        Async version of infer_structured.
+        Providers with an async client should override this. The default runs the blocking infer_structured in a worker thread.
+        """
+        return await asyncio.to_thread(self.infer_structured, prompt, expected_format, temperature)
+
+    def async_client(self, create: Callable[[], Client]) -> Client:
+        """
+        The async client for the running event loop, made with create the first time the loop asks.
+        An async client holds connections bound to an event loop, so there is one per loop.
+        """
+        loop = asyncio.get_running_loop()
+        with _async_clients_lock:
+            clients = self.__dict__.setdefault("async_clients", weakref.WeakKeyDictionary())
+            client = clients.get(loop)
+            if client is None:
+                client = create()
+                clients[loop] = client
+            return client
+
     @abstractmethod
     def get_provider_name(self) -> str:
         """Return the name of the provider."""
@@ -1,17 +1,17 @@
+import importlib
 from typing import Any, Dict
 
-from infrence_provider.groq_interface import GroqInterface
 from infrence_provider.infrence_provider import InferenceProvider
-from infrence_provider.ollama_interface import OllamaInterface
 
 
 class InferenceProviderFactory:
     """
     Factory class to create instances of InferenceProvider based on configuration.
     """
+    # Module and class of each provider. Only the configured provider (and its client library) is imported.
     PROVIDER_MAP = {
-        'groq': GroqInterface,
-        'ollama': OllamaInterface,
+        'groq': ('infrence_provider.groq_interface', 'GroqInterface'),
+        'ollama': ('infrence_provider.ollama_interface', 'OllamaInterface'),
     }
 
     @staticmethod
@@ -37,11 +37,14 @@ class InferenceProviderFactory:
             raise ValueError(
                 "Configuration must include 'active_provider_type' (e.g., 'groq', 'ollama')")
 
-        provider_class = InferenceProviderFactory.PROVIDER_MAP.get(
+        provider_location = InferenceProviderFactory.PROVIDER_MAP.get(
             provider_type.lower())
-        if not provider_class:
+        if not provider_location:
             raise ValueError(f"Invalid provider_type: '{provider_type}'. "
                              f"Valid types are: {list(InferenceProviderFactory.PROVIDER_MAP.keys())}")
+        module_name, class_name = provider_location
+        provider_class = getattr(
+            importlib.import_module(module_name), class_name)
 
         # Get the specific configuration section for the chosen provider
         provider_config_key_name = f"{provider_type.lower()}_config"
@@ -25,11 +25,7 @@ class OllamaInterface(InferenceProvider):
     def infer(self, prompt: str, temperature: float = 1.0) -> str:
 
         response = self.client.generate(
-            model=self.model,
-            prompt=prompt,
-            options={"temperature": temperature,
-                     "context_window": self.context_window},
-            stream=False)
+            **self.generate_args(prompt, temperature))
 
         return response['response']
 
@@ -37,6 +33,28 @@ class OllamaInterface(InferenceProvider):
         raise NotImplementedError(
             "Structured inference is not implemented for OllamaInterface.")
 
+    async def ainfer(self, prompt: str, temperature: float = 1.0) -> str:
+
+        response = await self.get_async_client().generate(
+            **self.generate_args(prompt, temperature))
+
+        return response['response']
+
+    async def ainfer_structured(self, prompt: str, expected_format: str, temperature: float = 1.0) -> str:
+        raise NotImplementedError(
+            "Structured inference is not implemented for OllamaInterface.")
+
+    def generate_args(self, prompt: str, temperature: float) -> Dict[str, Any]:
+        return dict(
+            model=self.model,
+            prompt=prompt,
+            options={"temperature": temperature,
+                     "context_window": self.context_window},
+            stream=False)
+
+    def get_async_client(self) -> ollama.AsyncClient:
+        return self.async_client(lambda: ollama.AsyncClient(host=self.base_url))
+
     def get_provider_name(self) -> str:
         return "Ollama"
 
@@ -1,24 +1,36 @@
 import json
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from agents.advisors.portfolio_advisor import PortfolioAdvisor
-from agents.advisors.report_summarizer import ReportSummarizer
+from agents.advisors.report_summarizer import ReportSummarizer, SummaryQueue
+from components.checkpoint_store import CheckpointStore
+from components.input_fingerprint import FingerprintIndex
 from components.report_generator import ReportGenerator
-import logging
-import logging.config
 
 from infrence_provider.infrence_provider_factory import InferenceProviderFactory
+from portfolio_item import PortfolioItem
 from portfolio_loader import PortfolioLoader
 from stock_information_processor import StockInformationProcessor
+from tools.app_logging import get_logger
 
 config_path = os.path.abspath(os.path.join(
     os.path.dirname(__file__), './config/'))
 
-# Load the logging configuration
-logging.config.fileConfig(os.path.join(config_path, "logging.config"))
-
 # Get the logger specified in the configuration file
-log = logging.getLogger('sampleLogger')
+log = get_logger()
+
+
+def write_stock_report(processor: StockInformationProcessor, report_generator: ReportGenerator, summary_queue: SummaryQueue, checkpoints: CheckpointStore, fingerprints: FingerprintIndex, report_folder: str, stock: PortfolioItem) -> str:
+    # Runs the whole analysis for one stock. This is called from the worker pool, so the processor and generator are shared between threads.
+    advice_on_stock = processor.process(stock, checkpoints, fingerprints)
+    report = report_generator.make_stock_report(
+        stock.ticker_symbol, advice_on_stock["advice_on_stock"])
+    # Summarize right away, while the other stocks are still being analysed
+    summary_queue.put(stock.ticker_symbol, report)
+    return report_generator.write_to_file(
+        report_folder, f"{stock.ticker_symbol}_report.md", report)
+
 
 if __name__ == "__main__":
     try:
@@ -51,26 +63,79 @@ if __name__ == "__main__":
     stocks = PortfolioLoader(os.path.join(
         config_path, "portfolio.json")).load()
 
-    for stock in stocks:
-        if os.path.exists(f"{report_folder}/{stock.ticker_symbol}_report.md"):
-            continue  # Skip existing reports
-        advice_on_stock = processor.process(stock)
-        report_path = report_generator.write_stock_report(
-            report_folder, stock.ticker_symbol, advice_on_stock["advice_on_stock"])
-
-    files = []
-    for foldername, subfolders, filenames in os.walk(report_folder):
-        for filename in filenames:
-            if filename == "portfolio_advice_report.md" or filename == "portfolio_assesment_report.md":
-                continue
-            # Get the full path to the file
-            files.append(os.path.join(foldername, filename))
+    # Most of the time is spent waiting on the network (yfinance, SEC, LLM), so several stocks are analysed at once
+    max_workers = max(1, int(app_config.get("max_workers", 1)))
+
+    # Output of each stage is kept for the run, so a restarted run continues where it stopped
+    checkpoints = CheckpointStore(report_folder)
+    # Tickers with the same inputs as an earlier run reuse the reports from that run
+    fingerprints = FingerprintIndex()
 
     summarizer = ReportSummarizer(llm_provider)
+    summary_queue = SummaryQueue(
+        summarizer, workers=max_workers, checkpoints=checkpoints)
+    summary_queue.start()
+
+    pending_stocks = []
+    for stock in stocks:
+        report_file = f"{report_folder}/{stock.ticker_symbol}_report.md"
+        if os.path.exists(report_file):
+            # Skip existing reports, they only need a summary
+            with open(report_file, encoding="utf-8") as f:
+                summary_queue.put(stock.ticker_symbol, f.read())
+        else:
+            pending_stocks.append(stock)
+
+    log.info(
+        f"Analysing {len(pending_stocks)} of {len(stocks)} stocks with {max_workers} workers")
+
+    # Price history for all stocks in a few bulk requests. If that fails, each stock downloads its own.
+    try:
+        processor.prefetch(pending_stocks)
+    except Exception as e:
+        log.error(f"Error prefetching price history: {e}")
+
+    failed_stocks = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stock") as executor:
+        futures = {executor.submit(write_stock_report, processor, report_generator, summary_queue, checkpoints, fingerprints, report_folder, stock): stock
+                   for stock in pending_stocks}
+        for future in as_completed(futures):
+            stock = futures[future]
+            try:
+                report_path = future.result()
+                log.info(
+                    f"Stock report for {stock.ticker_symbol}: {report_path}")
+            except Exception as e:
+                # One bad ticker should not abort the rest of the portfolio
+                failed_stocks[stock.ticker_symbol] = e
+                log.error(
+                    f"Error analysing {stock.name} ({stock.ticker_symbol}): {e}")
+
+    if failed_stocks:
+        log.warning(
+            f"{len(failed_stocks)} stocks failed: {', '.join(failed_stocks.keys())}")
+    log.info(
+        f"Fetch latency per source: {processor.fetch_coordinator.latency_summary()}")
+    log.info(
+        f"Ticker sessions: {processor.ticker_sessions.stats()}")
+    log.info(
+        f"Inputs unchanged for {len(fingerprints.reused)} of {len(pending_stocks)} stocks, skipped re-analysis of: {', '.join(fingerprints.reused)}")
+
+    # Summaries come back by ticker, keep the portfolio order for the advisor
+    summaries_by_ticker = summary_queue.close()
+    summaries = [summaries_by_ticker[stock.ticker_symbol]
+                 for stock in stocks if stock.ticker_symbol in summaries_by_ticker]
 
     portfolio_advisor = PortfolioAdvisor(llm_provider, summarizer)
 
-    advice = portfolio_advisor.provide_advice(files)
+    # Risk numbers for the whole portfolio, from the stored price history
+    risk_tables = None
+    try:
+        risk_tables = processor.portfolio_risk(stocks)
+    except Exception as e:
+        log.error(f"Error computing portfolio risk: {e}")
+
+    advice = portfolio_advisor.advice_from_summaries(summaries, risk_tables)
     advice_file = report_generator.write_advice_report(report_folder, advice)
     log.info(f"Portfolio investment advice: {advice_file}")
 
@@ -9,3 +9,5 @@ class PortfolioItem:
         self.currency = stock_info.get('currency', "")
         self.buy_date = stock_info.get(
             'buy_date', datetime.datetime.now().date())
+        # Number of shares held, used to weight the holding in the portfolio risk numbers
+        self.position = stock_info.get('position')
@@ -1,15 +1,10 @@
 import json
-import logging
-import logging.config
 
 from portfolio_item import PortfolioItem
-
-# Load the logging configuration
-logging.config.fileConfig(os.path.abspath(os.path.join(
-    os.path.dirname(__file__), './config/logging.config')))
+from tools.app_logging import get_logger
 
 # Get the logger specified in the configuration file
-log = logging.getLogger('sampleLogger')
+log = get_logger()
 
 
 class PortfolioLoader:
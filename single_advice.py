@@ -1,30 +1,41 @@
 from agents.advisors.stock_advisor import StockAdvisor
+from infrence_provider.infrence_provider import InferenceProvider
 from infrence_provider.infrence_provider_factory import InferenceProviderFactory
-import logging.config
-import logging
 import json
 import os
 import sys
 import base64
+from typing import Dict
 
 from tools.unicode_safety import UnicodeSafety
+from tools.app_logging import get_logger
 
 config_path = os.path.abspath(os.path.join(
     os.path.dirname(__file__), './config/'))
 
-logging.config.fileConfig(os.path.join(config_path, "logging.config"))
-
 # Get the logger specified in the configuration file
-log = logging.getLogger('sampleLogger')
+log = get_logger()
 
 
-def main():
+def parse_arg(arg: str) -> Dict[str, str]:
     # Expected string: {'TECHREPORT':'test','FINREPORT':'test'}
-    arg = sys.argv[1]
     decoded_arg = base64.urlsafe_b64decode(arg + '===').decode()
-    jsonstr = json.loads(decoded_arg)
-    technical_analysis = jsonstr['TECHREPORT']
-    financial_analysis = jsonstr['FINREPORT']
+    return json.loads(decoded_arg)
+
+
+def run(reports: Dict[str, str], llm_provider: InferenceProvider) -> str:
+    technical_analysis = reports['TECHREPORT']
+    financial_analysis = reports['FINREPORT']
+
+    stock_advisor = StockAdvisor(llm_provider)
+    advice_on_stock = stock_advisor.provide_advice(
+        technical_analysis, financial_analysis)
+
+    return UnicodeSafety().makeSafe("ADVICE:" + advice_on_stock)
+
+
+def main():
+    reports = parse_arg(sys.argv[1])
 
     try:
         with open(os.path.join(config_path, "app_config.json")) as f:
@@ -34,11 +45,7 @@ def main():
         log.error(e)
 
     llm_provider = InferenceProviderFactory().create_provider(app_config)
-    stock_advisor = StockAdvisor(llm_provider)
-    advice_on_stock = stock_advisor.provide_advice(
-        technical_analysis, financial_analysis)
-
-    print(UnicodeSafety().makeSafe("ADVICE:" + advice_on_stock))
+    print(run(reports, llm_provider))
 
 
 if __name__ == "__main__":
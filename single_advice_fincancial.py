@@ -1,30 +1,35 @@
 from infrence_provider.infrence_provider_factory import InferenceProviderFactory
 from stock_information_processor import StockInformationProcessor
 from portfolio_item import PortfolioItem
-import logging.config
-import logging
 import json
 import os
 import sys
 
 from tools.unicode_safety import UnicodeSafety
+from tools.app_logging import get_logger
 
 
 config_path = os.path.abspath(os.path.join(
     os.path.dirname(__file__), './config/'))
 
-logging.config.fileConfig(os.path.join(config_path, "logging.config"))
-
 # Get the logger specified in the configuration file
-log = logging.getLogger('sampleLogger')
+log = get_logger()
 
 
-def main():
+def parse_arg(arg: str) -> PortfolioItem:
     # python removes qoutes form paramter strings, just because
     # Expected string: "{'name':'John Deere','ticker_symbol':'DE','buy_price':386.12,'currency':'USD','buy_date':'2024-06-18'}"
-    arg = sys.argv[1].replace("'", '"')
-    jsonstr = json.loads(arg)
-    stock = PortfolioItem(jsonstr)
+    jsonstr = json.loads(arg.replace("'", '"'))
+    return PortfolioItem(jsonstr)
+
+
+def run(stock: PortfolioItem, processor: StockInformationProcessor) -> str:
+    advice_on_stock = processor.runFinancialAnalysis(stock)
+    return UnicodeSafety().makeSafe("FINREPORT:" + advice_on_stock)
+
+
+def main():
+    stock = parse_arg(sys.argv[1])
     try:
         with open(os.path.join(config_path, "api_keys.json")) as keysFile:
             api_keys = json.load(keysFile)
@@ -39,8 +44,7 @@ def main():
 
     llm_provider = InferenceProviderFactory().create_provider(app_config)
     processor = StockInformationProcessor(api_keys, llm_provider)
-    advice_on_stock = processor.runFinancialAnalysis(stock)
-    print(UnicodeSafety().makeSafe("FINREPORT:" + advice_on_stock))
+    print(run(stock, processor))
 
 
 if __name__ == "__main__":
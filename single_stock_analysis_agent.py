@@ -1,24 +1,23 @@
-from typing import Dict
+from typing import Any, Dict
 from agents.critics.stock_report_agent import StockReportAgent
+from components.checkpoint_store import STAGE_ADVICE, STAGE_FINANCIAL, STAGE_TECHNICAL
+from infrence_provider.infrence_provider import InferenceProvider
 from infrence_provider.infrence_provider_factory import InferenceProviderFactory
 from portfolio_item import PortfolioItem
 from stock_information_processor import StockInformationProcessor
-import logging.config
-import logging
 import json
 import os
 import sys
 import base64
 
 from tools.unicode_safety import UnicodeSafety
+from tools.app_logging import get_logger
 
 config_path = os.path.abspath(os.path.join(
     os.path.dirname(__file__), './config/'))
 
-logging.config.fileConfig(os.path.join(config_path, "logging.config"))
-
 # Get the logger specified in the configuration file
-log = logging.getLogger('sampleLogger')
+log = get_logger()
 
 
 # def main():
@@ -167,12 +166,40 @@ log = logging.getLogger('sampleLogger')
 #     """
 
 
-def main():
+def parse_arg(arg: str) -> PortfolioItem:
     # Expected string: {'name':'John Deere','ticker_symbol':'DE','buy_price':386.12,'currency':'USD','buy_date':'2024-06-18'}
-    arg = sys.argv[1].replace("'", '"')
-    # print(arg)
-    jsonstr = json.loads(arg)
-    stock = PortfolioItem(jsonstr)
+    jsonstr = json.loads(arg.replace("'", '"'))
+    return PortfolioItem(jsonstr)
+
+
+def run(stock: PortfolioItem, llm_provider: InferenceProvider, processor: StockInformationProcessor) -> str:
+    agent = StockReportAgent(llm_provider)
+
+    # The table only needs the two analyses, so it is made while the advice is written and honed
+    graph = processor.build_graph(stock)
+    graph.add("finished_report", agent.hone_report, [STAGE_ADVICE])
+    graph.add("table", lambda technical_analysis, financial_analysis: agent.tablebot(
+        financial_analysis["financial_report"], technical_analysis["technical_report"]),
+        [STAGE_TECHNICAL, STAGE_FINANCIAL])
+    # Only what the report and table need, not the indicator frame
+    results: Dict[str, Any] = graph.run(["finished_report", "table"])
+
+    finished_report = results["finished_report"]
+    table = results["table"]
+    rep = UnicodeSafety().makeSafe(finished_report)
+    table = UnicodeSafety().makeSafe(table)
+    ret = json.dumps(
+        {
+            "analysis": rep,
+            "table": table
+        },
+        ensure_ascii=False
+    )
+    return "OUTPUTDATA:"+ret
+
+
+def main():
+    stock = parse_arg(sys.argv[1])
 
     try:
         with open(os.path.join(config_path, "api_keys.json")) as keysFile:
@@ -188,22 +215,7 @@ def main():
 
     llm_provider = InferenceProviderFactory().create_provider(app_config)
     processor = StockInformationProcessor(api_keys, llm_provider)
-    report_text: Dict[str, str] = processor.process(stock)
-
-    agent = StockReportAgent(llm_provider)
-    finished_report = agent.hone_report(report_text["advice_on_stock"])
-    table = agent.tablebot(report_text["financial_report"],
-                           report_text["technical_report"])
-    rep = UnicodeSafety().makeSafe(finished_report)
-    table = UnicodeSafety().makeSafe(table)
-    ret = json.dumps(
-        {
-            "analysis": rep,
-            "table": table
-        },
-        ensure_ascii=False
-    )
-    print("OUTPUTDATA:"+ret)
+    print(run(stock, llm_provider, processor))
 
 
 if __name__ == "__main__":
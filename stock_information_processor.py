@@ -1,91 +1,191 @@
-import os
-from typing import Dict, List
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 from agents.advisors.stock_advisor import StockAdvisor
+from components.checkpoint_store import STAGE_ADVICE, STAGE_FETCH, STAGE_FINANCIAL, STAGE_INDICATORS, STAGE_TECHNICAL, CheckpointStore
 from components.analysis_layer import FinancialStatementAnalyst, TechnicalDataAnalyst
-from components.data_acq_layer import DataFetcher, FMPDataFetcher, FinnhubDataFetcher
+from components.data_acq_layer import FMPDataFetcher, FinnhubDataFetcher, StockDataFin, StockDataTech
+from components.fetch_coordinator import FetchCoordinator, FetcherSpec
+from components.input_fingerprint import FingerprintIndex, fingerprint_inputs
+from components.task_graph import TaskGraph
 from components.data_fetchers.sec_edgar_fetcher import SecEdgarDataFetcher
 from components.data_fetchers.yfin_data_fetcher import YFinanceFinDataFetcher, YFinanceTechicalDataFetcher
 from infrence_provider.infrence_provider import InferenceProvider
 from portfolio_item import PortfolioItem
-import logging
-import logging.config
+from tools.app_logging import get_logger
+from tools.ticker_session import TickerSessionRegistry
 
-# Load the logging configuration
-logging.config.fileConfig(os.path.abspath(os.path.join(
-    os.path.dirname(__file__), './config/logging.config')))
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Get the logger specified in the configuration file
-log = logging.getLogger('sampleLogger')
+log = get_logger()
 
 
 class StockInformationProcessor:
     # Setup data fetchers and configure which LLM are used for each step in the process
     def __init__(self, apiKeys: dict, infrenceProvider: InferenceProvider):
 
-        self.ta_fetchers: List[DataFetcher] = []
-        self.ta_fetchers.append(FMPDataFetcher())
-        self.ta_fetchers.append(FinnhubDataFetcher())
-        self.ta_fetchers.append(YFinanceTechicalDataFetcher())
+        # The yfinance fetchers share one session per ticker, so info and quotes are downloaded once
+        self.ticker_sessions = TickerSessionRegistry()
+
+        # All fetchers run at the same time. Timeout is in seconds, optional fetchers are not waited for unless wait is set.
+        self.ta_fetchers: List[FetcherSpec] = []
+        self.ta_fetchers.append(FetcherSpec(
+            FMPDataFetcher(), timeout=10, required=False))
+        self.ta_fetchers.append(FetcherSpec(
+            FinnhubDataFetcher(), timeout=10, required=False))
+        self.ta_fetchers.append(FetcherSpec(
+            YFinanceTechicalDataFetcher(sessions=self.ticker_sessions), timeout=60))
 
         self.technical_analyst = TechnicalDataAnalyst(infrenceProvider)
 
-        self.fin_fetchers: List[DataFetcher] = []
-        self.fin_fetchers.append(YFinanceFinDataFetcher())
-        self.fin_fetchers.append(SecEdgarDataFetcher())
+        self.fin_fetchers: List[FetcherSpec] = []
+        self.fin_fetchers.append(FetcherSpec(
+            YFinanceFinDataFetcher(sessions=self.ticker_sessions), timeout=60))
+        self.fin_fetchers.append(FetcherSpec(
+            SecEdgarDataFetcher(), timeout=120, required=False, wait=True))
+
+        self.fetch_coordinator = FetchCoordinator()
 
         self.financial_analyst = FinancialStatementAnalyst(infrenceProvider)
 
         self.stock_advisor = StockAdvisor(infrenceProvider)
 
-    # Run techical analysis and gather fundamental data. Make advice for the stock
-    def process(self, stock: PortfolioItem) -> Dict[str, str]:
-        log.info(f"Running analysis on {stock.name} ({stock.ticker_symbol})")
-
-        # Fetch techical data
-        techical_data = []
-        for fetcher in self.ta_fetchers:
+    def prefetch(self, stocks: List[PortfolioItem]) -> None:
+        # Fetchers that can download many tickers at once get the whole list up front, process() then uses what they got
+        ticker_symbols = [stock.ticker_symbol for stock in stocks]
+        # SEC filings download in the background while prices are downloaded and the stocks are analysed
+        for spec in self.fin_fetchers:
+            if isinstance(spec.fetcher, SecEdgarDataFetcher):
+                spec.fetcher.prefetch(ticker_symbols)
+        for spec in self.ta_fetchers + self.fin_fetchers:
+            if isinstance(spec.fetcher, YFinanceTechicalDataFetcher):
+                spec.fetcher.prefetch(ticker_symbols)
+
+    def portfolio_risk(self, stocks: List[PortfolioItem]) -> Optional[str]:
+        """
+        Risk numbers for the whole portfolio (volatility, beta and relative strength against the benchmark, correlations,
+        sector and industry concentration, Monte Carlo VaR/CVaR) from the stored price history, as Markdown tables for the portfolio advisor.
+        """
+        from tools.fetch_window import FetchWindow
+        from tools.indicator_engine import IndicatorSpec
+        from tools.portfolio_risk import portfolio_risk, risk_config, risk_tables
+        from tools.risk_simulator import RiskSimulator, cost_weights, simulation_config
+        from tools.tecnical_data_tools import fetch_stock_histories, get_essential_info
+
+        config = risk_config()
+        price_store = None
+        for spec in self.ta_fetchers:
+            if isinstance(spec.fetcher, YFinanceTechicalDataFetcher):
+                price_store = spec.fetcher.get_price_store()
+
+        # No indicators, just the returns of the lookback
+        window = FetchWindow(IndicatorSpec(sma=[], golden_cross=None, macd=None, adx=None, rsi=None),
+                             output_rows=config["lookback_bars"] + 1)
+        ticker_symbols = list(dict.fromkeys(
+            [stock.ticker_symbol for stock in stocks] + [config["benchmark"]]))
+        histories = fetch_stock_histories(ticker_symbols, price_store, window)
+
+        sectors, industries = {}, {}
+        for stock in stocks:
             try:
-                data = fetcher.fetch_data(stock.ticker_symbol)
-                if (data.info is not None or data.techical_indicators is not None):
-                    techical_data.append(data)
+                info = get_essential_info(
+                    self.ticker_sessions.get(stock.ticker_symbol))
+                sectors[stock.ticker_symbol] = info.get("Sector")
+                industries[stock.ticker_symbol] = info.get("Industry")
             except Exception as e:
-                log.error(
-                    f"Error fetching technical data for {stock.ticker_symbol} from {fetcher.__class__.__name__}: {e}")
+                log.warning(f"No sector for {stock.ticker_symbol}: {e}")
+
+        risk = portfolio_risk(histories, config["benchmark"], {stock.ticker_symbol: stock.position for stock in stocks},
+                              sectors, industries, config)
+        if not risk:
+            return None
+
+        # Downside risk of what was paid for the holdings, 1 and 10 days out
+        simulation = simulation_config()
+        returns = risk["returns"]
+        weights = cost_weights({stock.ticker_symbol: stock.position for stock in stocks},
+                               {stock.ticker_symbol: stock.buy_price for stock in stocks}, list(returns.columns))
+        simulator = RiskSimulator(returns.to_numpy(), weights, simulation["seed"],
+                                  simulation["workers"], simulation["chunk_paths"])
+        risk["value_at_risk"] = simulator.report(
+            simulation["paths"], simulation["horizons"], simulation["confidence"])
+        return risk_tables(risk, config["max_table_rows"])
 
-        # Fetch finanical data
-        financial_data = []
-        for fetcher in self.fin_fetchers:
-            try:
-                data = fetcher.fetch_data(stock.ticker_symbol)
-                financial_data.append(data)
-            except Exception as e:
-                log.error(
-                    f"Error fetching financial data for {stock.ticker_symbol} from {fetcher.__class__.__name__}: {e}")
+    # Run techical analysis and gather fundamental data. Make advice for the stock
+    def process(self, stock: PortfolioItem, checkpoints: Optional[CheckpointStore] = None, fingerprints: Optional[FingerprintIndex] = None) -> Dict[str, str]:
+        log.info(f"Running analysis on {stock.name} ({stock.ticker_symbol})")
+
+        targets = [STAGE_INDICATORS, STAGE_TECHNICAL,
+                   STAGE_FINANCIAL, STAGE_ADVICE]
+        if checkpoints is not None and fingerprints is not None:
+            targets.append("record_fingerprint")
+        results = self.build_graph(stock, checkpoints, fingerprints).run(targets)
+
+        return {"advice_on_stock": results[STAGE_ADVICE], "financial_report": results[STAGE_FINANCIAL]["financial_report"], "technical_report": results[STAGE_TECHNICAL]["technical_report"]}
+
+    def build_graph(self, stock: PortfolioItem, checkpoints: Optional[CheckpointStore] = None, fingerprints: Optional[FingerprintIndex] = None) -> TaskGraph:
+        # The techical and financial analysis don't depend on each other, so they run at the same time.
+        # The advisor starts when both are done. Callers can add their own tasks on top of the graph.
+        graph = TaskGraph()
+
+        def add_stage(stage: str, task: Callable[..., Any], depends_on: Optional[List[str]] = None) -> None:
+            if checkpoints is None:
+                graph.add(stage, task, depends_on)
+            elif checkpoints.has(stock.ticker_symbol, stage):
+                # Done in an earlier attempt of this run. Load it, and don't run what it depended on.
+                graph.add(stage, lambda: checkpoints.load(
+                    stock.ticker_symbol, stage))
+            else:
+                graph.add(stage, lambda *args: checkpoints.save(
+                    stock.ticker_symbol, stage, task(*args)), depends_on)
+
+        # Fetch techical and finanical data, all sources at once
+        add_stage(STAGE_FETCH, lambda: self.fetch_results(self.fetch_coordinator.fetch(
+            stock.ticker_symbol, self.ta_fetchers + self.fin_fetchers)))
+
+        # Keep the indicator frame on its own, so it can be used without the rest of the fetched data
+        add_stage(STAGE_INDICATORS, lambda fetched: self.indicator_frame(
+            fetched["technical_data"]), [STAGE_FETCH])
+
+        # If the inputs are the same as in an earlier run, the reports from that run are reused.
+        # Without a fingerprint index the inputs aren't hashed at all.
+        if fingerprints is not None:
+            graph.add("fingerprint", fingerprint_inputs, [STAGE_FETCH])
+            graph.add("previous_run", lambda fingerprint: fingerprints.previous_run(
+                stock.ticker_symbol, fingerprint), ["fingerprint"])
+        else:
+            graph.add("previous_run", lambda: None)
 
         # Analyse the stock based on techicals
-        technical_analysis = self.technical_analyst.analyze(
-            techical_data, stock)
+        add_stage(STAGE_TECHNICAL, lambda fetched, previous_run: previous_run.load(stock.ticker_symbol, STAGE_TECHNICAL)
+                  if previous_run is not None else self.technical_analyst.analyze(fetched["technical_data"], stock),
+                  [STAGE_FETCH, "previous_run"])
 
         # Do finanical analysis
-        financial_analysis = self.financial_analyst.analyze(
-            financial_data, stock)
+        add_stage(STAGE_FINANCIAL, lambda fetched, previous_run: previous_run.load(stock.ticker_symbol, STAGE_FINANCIAL)
+                  if previous_run is not None else self.financial_analyst.analyze(fetched["financial_data"], stock),
+                  [STAGE_FETCH, "previous_run"])
 
         # Provide advice for a position in this stock, based on the techical and financial analysies
-        advice_on_stock = self.stock_advisor.provide_advice(
-            technical_analysis, financial_analysis)
+        add_stage(STAGE_ADVICE, lambda technical_analysis, financial_analysis, previous_run: previous_run.load(stock.ticker_symbol, STAGE_ADVICE)
+                  if previous_run is not None else self.stock_advisor.provide_advice(technical_analysis, financial_analysis),
+                  [STAGE_TECHNICAL, STAGE_FINANCIAL, "previous_run"])
+
+        # Once the advice is in this run's checkpoints, later runs can reuse it for the same inputs
+        if checkpoints is not None and fingerprints is not None:
+            graph.add("record_fingerprint", lambda advice, fingerprint: fingerprints.record(
+                stock.ticker_symbol, fingerprint, checkpoints.run_folder), [STAGE_ADVICE, "fingerprint"])
 
-        return {"advice_on_stock": advice_on_stock, "financial_report": financial_analysis["financial_report"], "technical_report": technical_analysis["technical_report"]}
+        return graph
 
     def runTechicalAnalysis(self, stock: PortfolioItem) -> str:
         log.info(
             f"Running technical analysis on {stock.name} ({stock.ticker_symbol})")
 
         # Fetch techical data
-        techical_data = []
-        for fetcher in self.ta_fetchers:
-            data = fetcher.fetch_data(stock.ticker_symbol)
-            if (data.info is not None or data.techical_indicators is not None):
-                techical_data.append(data)
+        fetched = self.fetch_coordinator.fetch(
+            stock.ticker_symbol, self.ta_fetchers)
+        techical_data = self.techical_results(fetched)
 
         # Analyse the stock based on techicals
         technical_analysis = self.technical_analyst.analyze(
@@ -101,12 +201,30 @@ class StockInformationProcessor:
             f"Running financial analysis on {stock.name} ({stock.ticker_symbol})")
 
         # Fetch finanical data
-        financial_data = []
-        for fetcher in self.fin_fetchers:
-            data = fetcher.fetch_data(stock.ticker_symbol)
-            financial_data.append(data)
+        fetched = self.fetch_coordinator.fetch(
+            stock.ticker_symbol, self.fin_fetchers)
+        financial_data = self.financial_results(fetched)
+
         # Do finanical analysis
         financial_analysis = self.financial_analyst.analyze(
             financial_data, stock)
 
         return financial_analysis["financial_report"]
+
+    def fetch_results(self, fetched: Dict[FetcherSpec, Any]) -> Dict[str, list]:
+        return {"technical_data": self.techical_results(fetched), "financial_data": self.financial_results(fetched)}
+
+    def indicator_frame(self, techical_data: List[StockDataTech]) -> "Optional[pd.DataFrame]":
+        # The first table from the yfinance fetcher is the price history with the techical indicators
+        for data in techical_data:
+            if data.fetcher_name == YFinanceTechicalDataFetcher.__name__ and data.techical_indicators:
+                return data.techical_indicators[0]
+        return None
+
+    def techical_results(self, fetched: Dict[FetcherSpec, Any]) -> List[StockDataTech]:
+        # Keep registration order, and skip fetchers that had nothing for this stock
+        return [fetched[spec] for spec in self.ta_fetchers
+                if spec in fetched and (fetched[spec].info is not None or fetched[spec].techical_indicators is not None)]
+
+    def financial_results(self, fetched: Dict[FetcherSpec, Any]) -> List[StockDataFin]:
+        return [fetched[spec] for spec in self.fin_fetchers if spec in fetched]
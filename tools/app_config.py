@@ -0,0 +1,25 @@
+import json
+import os
+import threading
+from typing import Optional
+
+app_config_file = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '../config/app_config.json'))
+
+_app_config: Optional[dict] = None
+_lock = threading.Lock()
+
+
+def app_config_section(name: str, defaults: Optional[dict] = None) -> dict:
+    """
+    A section of app_config.json over its defaults. The file is read the first time a section is asked for,
+    not by every module that has settings.
+    """
+    global _app_config
+    with _lock:
+        if _app_config is None:
+            _app_config = {}
+            if os.path.exists(app_config_file):
+                with open(app_config_file) as f:
+                    _app_config = json.load(f)
+    return dict(defaults or {}, **_app_config.get(name, {}))
@@ -0,0 +1,23 @@
+import logging
+import logging.config
+import os
+import threading
+
+config_file = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '../config/logging.config'))
+
+_configured = False
+_lock = threading.Lock()
+
+
+def get_logger() -> logging.Logger:
+    """
+    Returns the logger specified in the configuration file.
+    The configuration is loaded the first time this is called, not by every module that logs.
+    """
+    global _configured
+    with _lock:
+        if not _configured:
+            logging.config.fileConfig(config_file)
+            _configured = True
+    return logging.getLogger('sampleLogger')
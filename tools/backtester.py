@@ -0,0 +1,130 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from tools.indicator_engine import IndicatorSpec, align, indicator_arrays
+from tools.signal_engine import RULE_COLUMNS, configured_indicator_spec, signal_rules
+
+# Backtest of the signal rules (tools/signal_engine.py) on price history, all tickers and bars as one array each.
+# Every rule is traded long or flat, on the close, from the bar after the signal (no look-ahead):
+#   cross: long while "fast" is above "slow" (golden cross, MACD above its signal line)
+#   band:  long from the bar "column" falls below "low" (oversold) until it rises above "high" (overbought)
+#   trend: long while "column" is above "threshold" and "positive" is above "negative" (ADX uptrend)
+
+RESULT_COLUMNS = ["Trades", "Hit rate", "Total return", "Buy and hold",
+                  "Annual return", "Max drawdown", "Exposure"]
+
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    # Carries the last value that isn't NaN down each column
+    rows = np.where(~np.isnan(values), np.arange(values.shape[0])[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return values[rows, np.arange(values.shape[1])]
+
+
+def rule_positions(rule: dict, indicators: Dict[str, np.ndarray]) -> np.ndarray:
+    """1 where the rule holds the ticker at the close of the bar, 0 where it is flat."""
+    with np.errstate(invalid="ignore"):
+        if rule["type"] == "cross":
+            held = indicators[rule["fast"]] > indicators[rule["slow"]]
+        elif rule["type"] == "band":
+            value = indicators[rule["column"]]
+            state = np.where(value < rule["low"], 1.0,
+                             np.where(value > rule["high"], 0.0, np.nan))
+            held = np.nan_to_num(forward_fill(state)) > 0
+        elif rule["type"] == "trend":
+            held = (indicators[rule["column"]] > rule["threshold"]) & (
+                indicators[rule["positive"]] > indicators[rule["negative"]])
+        else:
+            raise ValueError(f"Unknown signal type {rule['type']}")
+    return held.astype(np.float64)
+
+
+def trade_returns(positions: np.ndarray, log_returns: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Number of trades and number of winning trades per ticker. A trade runs from an entry to the next exit."""
+    entries = (positions == 1) & (np.vstack([np.zeros((1, positions.shape[1])), positions[:-1]]) == 0)
+    # Trades are numbered over all tickers (column by column), bars outside a trade get trade 0
+    trade_ids = np.cumsum(entries.T.ravel()).reshape(positions.shape[1], -1).T
+    trade_ids = np.where(positions == 1, trade_ids, 0)
+    # A trade earns the returns of the bars after the bars it was held on
+    earned = np.vstack([np.zeros((1, positions.shape[1])), np.where(trade_ids[:-1] > 0, log_returns[1:], 0.0)])
+    earned_ids = np.vstack([np.zeros((1, positions.shape[1]), dtype=trade_ids.dtype), trade_ids[:-1]])
+    per_trade = np.bincount(earned_ids.ravel(), weights=earned.ravel(), minlength=int(trade_ids.max()) + 1)
+    # Ticker of each trade, from the bar it was entered on
+    trade_tickers = np.zeros(len(per_trade), dtype=np.int64)
+    entry_bars = np.flatnonzero(entries.T.ravel())
+    trade_tickers[np.arange(1, len(entry_bars) + 1)] = entry_bars // positions.shape[0]
+    trades = np.bincount(trade_tickers[1:], minlength=positions.shape[1])
+    wins = np.bincount(trade_tickers[1:], weights=per_trade[1:] > 0, minlength=positions.shape[1])
+    return trades, wins
+
+
+def max_drawdown(log_returns: np.ndarray) -> np.ndarray:
+    equity = np.exp(np.cumsum(log_returns, axis=0))
+    peak = np.maximum.accumulate(np.vstack([np.ones((1, equity.shape[1])), equity]), axis=0)[1:]
+    return (equity / peak - 1).min(axis=0)
+
+
+def backtest(frames: Dict[str, pd.DataFrame], rules: Optional[List[dict]] = None, spec: Optional[IndicatorSpec] = None,
+             bars_per_year: int = 252) -> pd.DataFrame:
+    """
+    Backtests every signal rule on the price history of every ticker.
+
+    :param frames: Price history by ticker (Close, High and Low), i.e. read from the price store.
+    :param rules: Signal rules, the configured ones when None. Rules on indicators the spec doesn't compute are skipped.
+    :param spec: Indicators to compute, the configured ones when None. It needs the columns the rules read.
+    :return: One row per rule and ticker with the number of trades, the share of trades that made money, total return of the rule
+             against buy and hold, annual return, max drawdown and the share of bars in the market.
+    """
+    # The rules and the indicators come from the same spec, so no configured rule is skipped
+    spec = spec or configured_indicator_spec()
+    rules = rules if rules is not None else signal_rules(spec)
+    frames = {ticker_symbol: df for ticker_symbol, df in frames.items() if len(df) > 1}
+    if not frames:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    rows = max(len(df) for df in frames.values())
+    close = align(frames, "Close", rows)
+    indicators = indicator_arrays(close, align(frames, "High", rows), align(frames, "Low", rows), spec)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        log_returns = np.nan_to_num(np.log(close[1:] / close[:-1]))
+    log_returns = np.vstack([np.zeros((1, close.shape[1])), log_returns])
+    bars = (~np.isnan(close)).sum(axis=0)
+    years = np.maximum(bars - 1, 1) / bars_per_year
+
+    results = []
+    for rule in rules:
+        if any(rule[key] not in indicators for key in RULE_COLUMNS[rule["type"]]):
+            continue
+        positions = rule_positions(rule, indicators)
+        # Held at the close of a bar, earns the next bar's return
+        held = np.vstack([np.zeros((1, positions.shape[1])), positions[:-1]])
+        strategy = held * log_returns
+        trades, wins = trade_returns(positions, log_returns)
+        total = np.exp(strategy.sum(axis=0)) - 1
+        with np.errstate(invalid="ignore", divide="ignore"):
+            results.append(pd.DataFrame({
+                "Trades": trades,
+                "Hit rate": np.where(trades > 0, wins / trades, np.nan),
+                "Total return": total,
+                "Buy and hold": np.exp(log_returns.sum(axis=0)) - 1,
+                "Annual return": (1 + total) ** (1 / years) - 1,
+                "Max drawdown": max_drawdown(strategy),
+                "Exposure": held.sum(axis=0) / np.maximum(bars - 1, 1),
+            }, index=pd.MultiIndex.from_product([[rule["name"]], list(frames)], names=["Rule", "Ticker"])))
+    if not results:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    return pd.concat(results)
+
+
+def summarize(results: pd.DataFrame) -> pd.DataFrame:
+    """Per rule: trades, hit rate over all trades, and the median return, buy and hold and drawdown over the tickers."""
+    grouped = results.groupby(level="Rule", sort=False)
+    summary = grouped[["Total return", "Buy and hold", "Annual return", "Max drawdown", "Exposure"]].median()
+    wins = (results["Hit rate"].fillna(0) * results["Trades"]).groupby(level="Rule", sort=False).sum()
+    summary.insert(0, "Hit rate", wins / grouped["Trades"].sum())
+    summary.insert(0, "Trades", grouped["Trades"].sum())
+    summary["Beats buy and hold"] = (results["Total return"] > results["Buy and hold"]).groupby(
+        level="Rule", sort=False).mean()
+    return summary
@@ -0,0 +1,124 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+from tools.app_logging import get_logger
+
+# Get the logger specified in the configuration file
+log = get_logger()
+
+# Ticker to CIK (SEC company number) lookup, kept as one SQLite table with the ticker as primary key.
+# A lookup reads one row through the index, so nothing is parsed up front and the file is only opened on the first lookup.
+# When the table is older than max_age_days it is rebuilt from the SEC in a background thread,
+# lookups keep using the old table until the new one is swapped in.
+#
+#   cik(ticker TEXT PRIMARY KEY, cik TEXT)   one row per ticker
+#   meta(key TEXT PRIMARY KEY, value TEXT)   "built": when the mapping was downloaded, seconds since epoch
+
+LEGACY_JSON = "./data/sec_cik_tickers.json"
+
+
+def download_mapping() -> Dict[str, str]:
+    from sec_cik_mapper import StockMapper
+
+    return StockMapper().ticker_to_cik
+
+
+class CikIndex:
+    """
+    Ticker to CIK lookup on disk. The index is built on first use, from the old sec_cik_tickers.json when there is one
+    (no download), otherwise from the SEC.
+    """
+
+    def __init__(self, path: str = "./data/sec_cik.sqlite", max_age_days: float = 7, legacy_json: str = LEGACY_JSON) -> None:
+        self.path = path
+        self.max_age_days = max_age_days
+        self.legacy_json = legacy_json
+        self.lock = threading.Lock()
+        self.connection: Optional[sqlite3.Connection] = None
+        self.refresh_thread: Optional[threading.Thread] = None
+
+    def cik(self, ticker_symbol: str) -> Optional[str]:
+        """CIK of the ticker, None when the SEC doesn't know it or the index can't be built."""
+        with self.lock:
+            try:
+                connection = self.connect()
+            except Exception as e:
+                log.warning(f"No ticker to CIK index: {e}")
+                return None
+            row = connection.execute("SELECT cik FROM cik WHERE ticker = ?",
+                                     (ticker_symbol.upper(),)).fetchone()
+        return row[0] if row else None
+
+    def connect(self) -> sqlite3.Connection:
+        # Called with the lock held
+        if self.connection is None:
+            if not os.path.exists(self.path):
+                self.build(self.initial_mapping())
+            # Shared by the fetcher's worker threads, every use is under the lock
+            self.connection = sqlite3.connect(
+                f"file:{os.path.abspath(self.path)}?mode=ro", uri=True, check_same_thread=False)
+            if self.stale() and self.refresh_thread is None:
+                self.refresh_thread = threading.Thread(
+                    target=self.refresh, name="cik-index-refresh", daemon=True)
+                self.refresh_thread.start()
+        return self.connection
+
+    def initial_mapping(self) -> tuple[Dict[str, str], float]:
+        if os.path.exists(self.legacy_json):
+            with open(self.legacy_json, "r", encoding="utf8") as f:
+                # As old as the json file, so an old one is refreshed in the background
+                return json.load(f), os.path.getmtime(self.legacy_json)
+        return download_mapping(), time.time()
+
+    def stale(self) -> bool:
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = 'built'").fetchone()
+        return row is None or time.time() - float(row[0]) > self.max_age_days * 24 * 60 * 60
+
+    def refresh(self) -> None:
+        try:
+            mapping = download_mapping()
+        except Exception as e:
+            log.warning(f"Keeping the old ticker to CIK index, download failed: {e}")
+            return
+        with self.lock:
+            # Closed before the swap, an open file can't be replaced on Windows. The next lookup opens the new one.
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+            self.refresh_thread = None
+            try:
+                self.build((mapping, time.time()))
+            except Exception as e:
+                log.warning(f"Keeping the old ticker to CIK index, writing it failed: {e}")
+                return
+        log.info(f"Ticker to CIK index refreshed, {len(mapping)} tickers")
+
+    def build(self, source: tuple[Dict[str, str], float]) -> None:
+        """Writes the index to a temporary file and swaps it in."""
+        mapping, built = source
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        os.close(fd)
+        try:
+            connection = sqlite3.connect(tmp_path)
+            with connection:
+                connection.execute(
+                    "CREATE TABLE cik (ticker TEXT PRIMARY KEY, cik TEXT NOT NULL) WITHOUT ROWID")
+                connection.execute(
+                    "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+                connection.executemany("INSERT OR REPLACE INTO cik VALUES (?, ?)",
+                                       ((ticker_symbol.upper(), str(cik)) for ticker_symbol, cik in mapping.items()))
+                connection.execute(
+                    "INSERT INTO meta VALUES ('built', ?)", (str(built),))
+            connection.close()
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,141 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from tools.app_config import app_config_section
+from tools.app_logging import get_logger
+
+# Get the logger specified in the configuration file
+log = get_logger()
+
+# How long each class of payload is fresh, in minutes. Quotes move all day, statements change once a quarter.
+DEFAULT_TTL_MINUTES = {"quote": 15, "info": 6 * 60, "statements": 3 * 24 * 60}
+
+
+class DiskCache:
+    """
+    Payloads (quotes, company info, statements) kept on disk, with a time to live per class of payload.
+    When the cache is over max_bytes, the least recently used entries are removed.
+    With prefer_cache, any cached entry is used no matter its age, so analysis can be re-run without a network.
+    """
+
+    def __init__(self, folder: str = "./data/yf_cache", max_bytes: int = 256 * 1024 * 1024,
+                 ttl_minutes: Optional[Dict[str, float]] = None, prefer_cache: bool = False) -> None:
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.ttl_minutes = dict(DEFAULT_TTL_MINUTES, **(ttl_minutes or {}))
+        self.prefer_cache = prefer_cache
+        self.lock = threading.Lock()
+        # path -> (size, last used), read from disk once
+        self.entries: Optional[Dict[str, Tuple[int, float]]] = None
+
+    def path(self, kind: str, key: str) -> str:
+        return os.path.join(self.folder, kind, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".pkl")
+
+    def get_or_load(self, kind: str, key: str, load: Callable[[], Any]) -> Any:
+        path = self.path(kind, key)
+        cached = self.read(path)
+        if cached is not None:
+            saved, value = cached
+            if self.prefer_cache or time.time() - saved < self.ttl_minutes[kind] * 60:
+                self.touch(path)
+                return value
+
+        try:
+            value = load()
+        except Exception as e:
+            if cached is None:
+                raise
+            # Better an old payload than none, i.e. when the network is down
+            log.warning(
+                f"Using cached {kind} for {key} from {time.ctime(cached[0])}, download failed: {e}")
+            self.touch(path)
+            return cached[1]
+
+        self.write(path, value)
+        return value
+
+    def read(self, path: str) -> Optional[Tuple[float, Any]]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            log.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+    def write(self, path: str, value: Any) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((time.time(), value), f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        with self.lock:
+            self.load_entries()[path] = (os.path.getsize(path), time.time())
+            self.evict()
+
+    def touch(self, path: str) -> None:
+        # Last use is the file's modification time, so the next process evicts in the same order.
+        # Freshness is the time saved in the entry, not the file's.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self.lock:
+            entries = self.load_entries()
+            if path in entries:
+                entries[path] = (entries[path][0], time.time())
+
+    def load_entries(self) -> Dict[str, Tuple[int, float]]:
+        # Last use starts out as the file's modification time
+        if self.entries is None:
+            self.entries = {}
+            if os.path.exists(self.folder):
+                for root, _, files in os.walk(self.folder):
+                    for name in files:
+                        if name.endswith(".pkl"):
+                            path = os.path.join(root, name)
+                            stat = os.stat(path)
+                            self.entries[path] = (stat.st_size, stat.st_mtime)
+        return self.entries
+
+    def evict(self) -> None:
+        total = sum(size for size, _ in self.entries.values())
+        for path, (size, _) in sorted(self.entries.items(), key=lambda entry: entry[1][1]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            del self.entries[path]
+            total -= size
+
+
+_yf_cache: Optional[DiskCache] = None
+_yf_cache_lock = threading.Lock()
+
+
+def yf_cache() -> DiskCache:
+    """
+    The cache for yfinance payloads, set up from "yfinance_cache" in app_config.json the first time it is used.
+    """
+    global _yf_cache
+    with _yf_cache_lock:
+        if _yf_cache is None:
+            config = app_config_section("yfinance_cache")
+            _yf_cache = DiskCache(folder=config.get("folder", "./data/yf_cache"),
+                                  max_bytes=int(
+                                      config.get("max_mb", 256) * 1024 * 1024),
+                                  ttl_minutes=config.get("ttl_minutes"),
+                                  prefer_cache=config.get("prefer_cache", False))
+        return _yf_cache
@@ -0,0 +1,239 @@
+import datetime
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, Iterable, List, Optional, Tuple
+from tools.app_config import app_config_section
+from tools.app_logging import get_logger
+from tools.filing_manifest import FILING_FILE
+
+if TYPE_CHECKING:
+    from tools.cik_index import CikIndex
+
+# Get the logger specified in the configuration file
+log = get_logger()
+
+# Background download of SEC filings for the whole portfolio. It is started with all tickers at the beginning of a run,
+# so it runs while prices are downloaded and the LLM works, and the filings are on disk when the financial analysis needs them.
+# Every request to the SEC, from any download thread, first takes a token from one shared bucket. In any second at most
+# burst + requests_per_second requests go out, which has to stay within the SEC's limit of 10 requests per second
+# (https://www.sec.gov/os/webmaster-faq#developers).
+# Filings are saved where sec_edgar_downloader saves them: <folder>/sec-edgar-filings/<ticker>/<form>/<accession number>/full-submission.txt
+
+SUBMISSIONS_URL = "https://data.sec.gov/submissions/{name}"
+ARCHIVE_URL = "https://www.sec.gov/Archives/edgar/data/{cik}/{folder}/{accession}.txt"
+
+# forms: SEC form types to download, "after"/"before": filing dates (YYYY-MM-DD), after defaults to lookback_days ago.
+# The SEC asks for a user agent with a company name and contact email.
+DEFAULT_EDGAR_CONFIG = {"user_agent": "MyCompanyName my.email@domain.com", "forms": ["8-K"], "after": None, "before": None,
+                        "lookback_days": 90, "requests_per_second": 8, "burst": 2, "workers": 2, "wait_seconds": 110,
+                        "cik_max_age_days": 7, "max_age_seconds": 600}
+
+
+class TokenBucket:
+    """Rate limiter shared between threads. Tokens come back at rate per second, up to capacity are saved for a burst."""
+
+    def __init__(self, rate: float, capacity: float = 1) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> None:
+        """Blocks until tokens are free and takes them."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens +
+                                  (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def date_range(config: dict, today: Optional[datetime.date] = None) -> Tuple[str, str]:
+    today = today or datetime.date.today()
+    after = config["after"] or (
+        today - datetime.timedelta(days=config["lookback_days"])).isoformat()
+    return after, config["before"] or today.isoformat()
+
+
+def matching_filings(columns: dict, forms: Iterable[str], after: str, before: str) -> List[Tuple[str, str]]:
+    # (form, accession number) of the filings in a submissions table (one list per column) of the forms and dates
+    forms = set(forms)
+    return [(form, accession) for form, accession, filed in zip(columns["form"], columns["accessionNumber"], columns["filingDate"])
+            if form in forms and after <= filed <= before]
+
+
+class EdgarPrefetcher:
+    """
+    Downloads the filings of queued tickers on background threads, one ticker at a time per thread.
+    Filings already on disk are not downloaded again.
+    """
+
+    def __init__(self, cik_index: "CikIndex", folder: str = "./data/", config: Optional[dict] = None) -> None:
+        self.cik_index = cik_index
+        self.folder = folder
+        self.config = dict(DEFAULT_EDGAR_CONFIG, **(config or {}))
+        self.bucket = TokenBucket(
+            self.config["requests_per_second"], self.config["burst"])
+        self.lock = threading.Lock()
+        self.pending: Deque[str] = deque()
+        # Set when the ticker's downloads are done, or failed
+        self.done: Dict[str, threading.Event] = {}
+        # When each ticker's downloads were done. After max_age_seconds the ticker is downloaded again,
+        # so a long lived process (worker_server) gets filings made since.
+        self.finished: Dict[str, float] = {}
+        # Paths of the downloaded filings a reader hasn't parsed yet, so readers don't walk the folders
+        self.downloaded: Dict[str, List[str]] = {}
+        self.workers: List[threading.Thread] = []
+
+    def start(self, ticker_symbols: Iterable[str]) -> None:
+        """Queues the tickers that aren't queued or recently done, in order, and returns right away."""
+        with self.lock:
+            for ticker_symbol in ticker_symbols:
+                if self.needs_download(ticker_symbol):
+                    self.done[ticker_symbol] = threading.Event()
+                    self.pending.append(ticker_symbol)
+            self.start_workers()
+
+    def wait(self, ticker_symbol: str, timeout: Optional[float] = None) -> bool:
+        """
+        Waits for the ticker's filings. A ticker that wasn't queued, or was done too long ago, is queued,
+        a ticker still in the queue goes first.
+
+        :return: False when the downloads didn't finish within timeout.
+        """
+        with self.lock:
+            if self.needs_download(ticker_symbol):
+                self.done[ticker_symbol] = threading.Event()
+                self.pending.appendleft(ticker_symbol)
+            elif ticker_symbol in self.pending:
+                self.pending.remove(ticker_symbol)
+                self.pending.appendleft(ticker_symbol)
+            self.start_workers()
+            done = self.done[ticker_symbol]
+        return done.wait(timeout)
+
+    def new_filings(self, ticker_symbol: str) -> List[str]:
+        """Paths of the ticker's downloaded filings that haven't been marked parsed."""
+        with self.lock:
+            return list(self.downloaded.get(ticker_symbol, []))
+
+    def parsed(self, ticker_symbol: str, paths: Iterable[str]) -> None:
+        """Drops paths from new_filings(), once they are in the manifest."""
+        paths = set(paths)
+        with self.lock:
+            remaining = [path for path in self.downloaded.get(ticker_symbol, []) if path not in paths]
+            if remaining:
+                self.downloaded[ticker_symbol] = remaining
+            else:
+                self.downloaded.pop(ticker_symbol, None)
+
+    def needs_download(self, ticker_symbol: str) -> bool:
+        # Called with the lock held
+        if ticker_symbol not in self.done:
+            return True
+        finished = self.finished.get(ticker_symbol)
+        return (finished is not None and self.done[ticker_symbol].is_set()
+                and time.monotonic() - finished > self.config["max_age_seconds"])
+
+    def start_workers(self) -> None:
+        # Called with the lock held. Workers stop when the queue is empty, so they are started again for new tickers.
+        self.workers = [worker for worker in self.workers if worker.is_alive()]
+        for _ in range(min(len(self.pending), self.config["workers"] - len(self.workers))):
+            worker = threading.Thread(
+                target=self.run, name="edgar-prefetch", daemon=True)
+            self.workers.append(worker)
+            worker.start()
+
+    def run(self) -> None:
+        while True:
+            with self.lock:
+                if not self.pending:
+                    self.workers.remove(threading.current_thread())
+                    return
+                ticker_symbol = self.pending.popleft()
+            try:
+                paths = self.download(ticker_symbol)
+                if paths:
+                    log.info(f"Downloaded {len(paths)} SEC filings of {ticker_symbol}")
+                    with self.lock:
+                        self.downloaded.setdefault(ticker_symbol, []).extend(paths)
+            except Exception as e:
+                log.error(f"Error downloading SEC filings of {ticker_symbol}: {e}")
+            finally:
+                with self.lock:
+                    self.finished[ticker_symbol] = time.monotonic()
+                    self.done[ticker_symbol].set()
+
+    def download(self, ticker_symbol: str) -> List[str]:
+        """Downloads the ticker's filings of the configured forms and dates that aren't on disk, returns their paths."""
+        cik = self.cik_index.cik(ticker_symbol)
+        if cik is None:
+            log.warning(f"No CIK for {ticker_symbol}, no SEC filings")
+            return []
+        downloaded = []
+        for form, accession in self.filings(cik):
+            path = os.path.join(self.folder, "sec-edgar-filings", ticker_symbol,
+                                form.replace("/", "-"), accession, FILING_FILE)
+            if os.path.exists(path):
+                continue
+            contents = self.request(ARCHIVE_URL.format(
+                cik=int(cik), folder=accession.replace("-", ""), accession=accession))
+            save(path, contents)
+            downloaded.append(path)
+        return downloaded
+
+    def filings(self, cik: str) -> List[Tuple[str, str]]:
+        # The submissions file has the recent filings, older ones are in pages that are only read when they are in the dates
+        after, before = date_range(self.config)
+        submissions = json.loads(self.request(
+            SUBMISSIONS_URL.format(name=f"CIK{int(cik):010d}.json")))
+        filings = matching_filings(
+            submissions["filings"]["recent"], self.config["forms"], after, before)
+        for page in submissions["filings"].get("files", []):
+            if page["filingFrom"] <= before and page["filingTo"] >= after:
+                filings += matching_filings(json.loads(self.request(SUBMISSIONS_URL.format(name=page["name"]))),
+                                            self.config["forms"], after, before)
+        return filings
+
+    def request(self, url: str) -> bytes:
+        self.bucket.acquire()
+        request = urllib.request.Request(url, headers={
+            "User-Agent": self.config["user_agent"], "Accept-Encoding": "gzip"})
+        with urllib.request.urlopen(request, timeout=60) as response:
+            contents = response.read()
+            if response.headers.get("Content-Encoding") == "gzip":
+                contents = gzip.decompress(contents)
+        return contents
+
+
+def save(path: str, contents: bytes) -> None:
+    # Written to a temporary file first, so a reader never sees half a filing
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(contents)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def edgar_config() -> dict:
+    """
+    Settings for SEC downloads, from "sec_edgar" in app_config.json.
+    """
+    return app_config_section("sec_edgar", DEFAULT_EDGAR_CONFIG)
@@ -0,0 +1,105 @@
+import math
+import threading
+from typing import Dict, Optional
+
+import pandas as pd
+
+from tools.app_config import app_config_section
+from tools.indicator_engine import IndicatorSpec
+
+# Calendar days per bar, for turning a number of bars into a start date.
+# Daily bars only come on trading days (about 252 a year), intraday bars only in trading hours (6.5 hours a day).
+CALENDAR_DAYS_PER_BAR = {"1d": 365 / 252, "5d": 7, "1wk": 7, "1mo": 31, "3mo": 92}
+TRADING_MINUTES_PER_DAY = 6.5 * 60
+INTRADAY_MINUTES = {"1m": 1, "2m": 2, "5m": 5, "15m": 15,
+                    "30m": 30, "60m": 60, "90m": 90, "1h": 60}
+# Extra days for holidays and the bars of the current day
+START_SLACK_DAYS = 7
+
+
+def decay_bars(alpha: float, tolerance: float) -> int:
+    # Bars until the weight left on the start of an exponential average is below tolerance
+    if tolerance >= 1:
+        return 0
+    return math.ceil(math.log(tolerance) / math.log(1 - alpha))
+
+
+class FetchWindow:
+    """
+    How much price history techical_analysis needs: the bars each indicator needs to settle, plus the rows that are kept.
+    An SMA is settled after its length. EMA and Wilder averages never forget their start entirely,
+    they are settled when the weight left on the bars before the window is below settle_tolerance.
+    A settle_tolerance of 1 only waits for the first value that isn't NaN.
+    """
+
+    def __init__(self, spec: Optional[IndicatorSpec] = None, output_rows: int = 25, interval: str = "1d",
+                 settle_tolerance: float = 0.01) -> None:
+        if interval not in CALENDAR_DAYS_PER_BAR and interval not in INTRADAY_MINUTES:
+            raise ValueError(f"Unknown interval {interval}")
+        self.spec = spec or IndicatorSpec()
+        self.output_rows = output_rows
+        self.interval = interval
+        self.settle_tolerance = settle_tolerance
+
+    @classmethod
+    def from_config(cls, config: dict) -> "FetchWindow":
+        return cls(IndicatorSpec.from_config(config.get("indicators", {})),
+                   output_rows=config.get("output_rows", 25),
+                   interval=config.get("interval", "1d"),
+                   settle_tolerance=config.get("settle_tolerance", 0.01))
+
+    def warmup_bars(self) -> Dict[str, int]:
+        """Number of bars up to and including the first settled value, by indicator."""
+        spec = self.spec
+        tolerance = self.settle_tolerance
+        bars = {f"SMA_{length}": length for length in spec.sma}
+        if spec.macd is not None:
+            fast, slow, signal = spec.macd
+            # The EMAs are seeded with the mean of their first length bars
+            line = max(length + decay_bars(2 / (length + 1), tolerance)
+                       for length in [fast, slow])
+            # The signal line averages the MACD line, so it settles after the line has
+            bars[f"MACD_{fast}_{slow}_{signal}"] = max(
+                line + decay_bars(2 / (signal + 1), tolerance), slow + signal - 1)
+        if spec.adx is not None:
+            # The DX is a Wilder average of the moves from the second bar on, the ADX averages the DX once more
+            wilder = max(spec.adx, decay_bars(1 / spec.adx, tolerance))
+            bars[f"ADX_{spec.adx}"] = 2 * wilder
+        if spec.rsi is not None:
+            bars["RSI"] = 1 + max(spec.rsi, decay_bars(1 / spec.rsi, tolerance))
+        return bars
+
+    def bars(self) -> int:
+        """Bars to fetch, so that every kept row has settled values."""
+        return max(self.warmup_bars().values(), default=1) + self.output_rows - 1
+
+    def start(self, tz=None, now: Optional[pd.Timestamp] = None) -> pd.Timestamp:
+        """First date to fetch from, so that at least bars() bars are downloaded."""
+        now = now if now is not None else pd.Timestamp.now(tz=tz)
+        if self.interval in INTRADAY_MINUTES:
+            days_per_bar = INTRADAY_MINUTES[self.interval] / \
+                TRADING_MINUTES_PER_DAY * 7 / 5
+        else:
+            days_per_bar = CALENDAR_DAYS_PER_BAR[self.interval]
+        days = math.ceil(self.bars() * days_per_bar) + START_SLACK_DAYS
+        return now.normalize() - pd.Timedelta(days=days)
+
+    def __repr__(self) -> str:
+        return (f"FetchWindow({self.spec}, output_rows={self.output_rows}, interval={self.interval}, "
+                f"settle_tolerance={self.settle_tolerance}, bars={self.bars()})")
+
+
+_fetch_window: Optional[FetchWindow] = None
+_fetch_window_lock = threading.Lock()
+
+
+def fetch_window() -> FetchWindow:
+    """
+    The window for techical_analysis, set up from "technical_analysis" in app_config.json the first time it is used.
+    """
+    global _fetch_window
+    with _fetch_window_lock:
+        if _fetch_window is None:
+            _fetch_window = FetchWindow.from_config(
+                app_config_section("technical_analysis"))
+        return _fetch_window
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from tools.app_logging import get_logger
+
+# Get the logger specified in the configuration file
+log = get_logger()
+
+# Manifest of the downloaded SEC filings that have been processed, one SQLite row per accession number
+# with the text extracted from the filing and where it came from.
+# A filing of more than one ticker (i.e. GOOG and GOOGL) is downloaded for each, so the key is accession number and ticker.
+# A filing is only parsed again when its file changed (size or modification time, then the SHA-256 of its content)
+# or when the extraction changed (EXTRACTOR_VERSION).
+#
+#   filings(accession, ticker, form, filed, path, size, mtime_ns, sha256, extractor, text, processed)
+
+# Bump when the extracted text changes, so every filing is extracted again
+EXTRACTOR_VERSION = 1
+
+FILING_FILE = "full-submission.txt"
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def content_hash(filepath: str) -> str:
+    sha = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class FilingManifest:
+    """
+    Extracted text of processed filings, opened on first use. Safe to share between threads;
+    processes share it through SQLite's file locking.
+    """
+
+    def __init__(self, path: str = "./data/sec_filings.sqlite") -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def connect(self) -> sqlite3.Connection:
+        # Called with the lock held
+        if self.connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # Shared by the fetcher's worker threads, every use is under the lock
+            self.connection = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False)
+            self.connection.row_factory = sqlite3.Row
+            with self.connection:
+                self.connection.execute("""CREATE TABLE IF NOT EXISTS filings (
+                    accession TEXT NOT NULL, ticker TEXT NOT NULL, form TEXT, filed TEXT, path TEXT NOT NULL,
+                    size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL, extractor INTEGER NOT NULL,
+                    text TEXT NOT NULL, processed REAL NOT NULL, PRIMARY KEY (accession, ticker))""")
+                self.connection.execute(
+                    "CREATE INDEX IF NOT EXISTS filings_ticker ON filings (ticker)")
+        return self.connection
+
+    def get(self, accession: str, ticker_symbol: str) -> Optional[dict]:
+        with self.lock:
+            row = self.connect().execute(
+                "SELECT * FROM filings WHERE accession = ? AND ticker = ?", (accession, ticker_symbol)).fetchone()
+        return dict(row) if row else None
+
+    def put(self, filing: dict) -> None:
+        with self.lock:
+            connection = self.connect()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO filings VALUES (:accession, :ticker, :form, :filed, :path, :size, :mtime_ns, "
+                    ":sha256, :extractor, :text, :processed)", filing)
+
+    def filings(self, ticker_symbol: str) -> List[dict]:
+        """Processed filings of a ticker, newest filed first."""
+        with self.lock:
+            rows = self.connect().execute(
+                "SELECT * FROM filings WHERE ticker = ? ORDER BY filed DESC", (ticker_symbol,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def processed(self, ticker_symbol: str, filepath: str, extract: Callable[[str], str],
+                  header: Callable[[str], Dict[str, str]]) -> dict:
+        """
+        The manifest entry of a filing, extracting it first when it is new or changed.
+
+        :param filepath: .../<ticker>/<form>/<accession number>/full-submission.txt, as sec_edgar_downloader saves them.
+        :param extract: Text of the filing from its path.
+        :param header: SEC header entries of the filing from its path.
+        """
+        folder = os.path.dirname(filepath)
+        accession = os.path.basename(folder)
+        stat = os.stat(filepath)
+        known = self.get(accession, ticker_symbol)
+        if known is not None and known["extractor"] == EXTRACTOR_VERSION:
+            if (known["size"], known["mtime_ns"], known["path"]) == (stat.st_size, stat.st_mtime_ns, filepath):
+                return known
+            # Touched, copied or moved, the content may still be the same
+            sha256 = content_hash(filepath)
+            if known["sha256"] == sha256:
+                known.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns, path=filepath)
+                self.put(known)
+                return known
+        else:
+            sha256 = content_hash(filepath)
+
+        entries = header(filepath)
+        filing = {"accession": accession, "ticker": ticker_symbol, "form": os.path.basename(os.path.dirname(folder)),
+                  "filed": entries.get("FILED AS OF DATE"), "path": filepath, "size": stat.st_size,
+                  "mtime_ns": stat.st_mtime_ns, "sha256": sha256, "extractor": EXTRACTOR_VERSION,
+                  "text": extract(filepath), "processed": time.time()}
+        self.put(filing)
+        log.info(f"Processed {filing['form']} filing {accession} of {ticker_symbol}")
+        return filing
+
+    def update(self, ticker_symbol: str, base_dir: str, extract: Callable[[str], str],
+               header: Callable[[str], Dict[str, str]]) -> List[dict]:
+        """Manifest entries of every filing under base_dir, only new or changed filings are extracted."""
+        entries = []
+        for foldername, subfolders, filenames in os.walk(base_dir):
+            if FILING_FILE in filenames:
+                entries.append(self.processed(ticker_symbol, os.path.join(
+                    foldername, FILING_FILE), extract, header))
+        return entries
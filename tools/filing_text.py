@@ -0,0 +1,139 @@
+import re
+import string
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List
+
+# Text of an SEC filing (full-submission.txt), read line by line and parsed as it is read, so a filing of tens of MB
+# is never in memory and reading stops as soon as there is enough text.
+# A submission is the SEC header followed by <DOCUMENT> blocks (the form, exhibits, images, XBRL), each with
+# <TYPE>, <SEQUENCE>, <FILENAME> and <DESCRIPTION> lines and then the document in <TEXT>.
+# Documents that are images, archives, spreadsheets or XBRL are skipped whole, and uuencoded parts
+# ("begin 644 name" up to "end") are skipped wherever they are.
+
+# Characters of text kept from a filing
+TEXT_BUDGET = 2500
+
+# Document types and file names that have no text worth reading
+SKIPPED_TYPES = ("GRAPHIC", "ZIP", "EXCEL", "PDF", "XML", "JSON", "EX-101")
+SKIPPED_EXTENSIONS = (".jpg", ".jpeg", ".gif", ".png", ".pdf", ".zip", ".xls", ".xlsx", ".xml", ".xsd", ".json",
+                      ".js", ".css")
+
+# Tags whose content isn't text: styles, scripts, code, links, and the hidden header of inline XBRL
+SKIPPED_TAGS = {"style", "script", "code", "a", "ix:header", "xbrl"}
+
+UUENCODE_BEGIN = re.compile(r"begin [0-7]{3,4} ")
+
+PUNCTUATION = str.maketrans("", "", string.punctuation)
+
+# English stop words of nltk, kept here so they aren't loaded from the nltk data on every call
+STOP_WORDS = frozenset("""
+i me my myself we our ours ourselves you you're you've you'll you'd your yours yourself yourselves he him his himself
+she she's her hers herself it it's its itself they them their theirs themselves what which who whom this that that'll
+these those am is are was were be been being have has had having do does did doing a an the and but if or because as
+until while of at by for with about against between into through during before after above below to from up down in
+out on off over under again further then once here there when where why how all any both each few more most other
+some such no nor not only own same so than too very s t can will just don don't should should've now d ll m o re ve y
+ain aren aren't couldn couldn't didn didn't doesn doesn't hadn hadn't hasn hasn't haven haven't isn isn't ma mightn
+mightn't mustn mustn't needn needn't shan shan't shouldn shouldn't wasn wasn't weren weren't won won't wouldn wouldn't
+""".split())
+
+
+class FilingTextParser(HTMLParser):
+    """Collects the stripped text of the HTML it is fed, outside SKIPPED_TAGS, until it has budget characters."""
+
+    def __init__(self, budget: int = TEXT_BUDGET) -> None:
+        super().__init__(convert_charrefs=True)
+        self.budget = budget
+        self.parts: List[str] = []
+        self.length = 0
+        self.skip_depth = 0
+
+    @property
+    def full(self) -> bool:
+        return self.length >= self.budget
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def handle_data(self, data):
+        text = data.strip()
+        if text and not self.skip_depth and not self.full:
+            self.parts.append(text)
+            self.length += len(text) + 1
+
+    def text(self) -> str:
+        return " ".join(self.parts)[:self.budget]
+
+
+def skipped_document(header: List[str]) -> bool:
+    # header: the lines of a <DOCUMENT> before its <TEXT>
+    for line in header:
+        if line.startswith("<TYPE>") and line[6:].strip().upper().startswith(SKIPPED_TYPES):
+            return True
+        if line.startswith("<FILENAME>") and line[10:].strip().lower().endswith(SKIPPED_EXTENSIONS):
+            return True
+    return False
+
+
+def text_lines(lines: Iterable[str]) -> Iterable[str]:
+    """The lines of a submission without the skipped documents and uuencoded parts."""
+    lines = iter(lines)
+    for line in lines:
+        if line.startswith("<DOCUMENT>"):
+            header = [line]
+            for line in lines:
+                header.append(line)
+                if line.startswith("<TEXT>"):
+                    break
+            if skipped_document(header):
+                for line in lines:
+                    if line.startswith("</DOCUMENT>"):
+                        break
+                continue
+            yield from header
+        elif UUENCODE_BEGIN.match(line):
+            for line in lines:
+                if line.rstrip() == "end":
+                    break
+        else:
+            yield line
+
+
+def filing_text(filepath: str, budget: int = TEXT_BUDGET) -> str:
+    """The first budget characters of text of a filing, reading only as much of the file as that takes."""
+    parser = FilingTextParser(budget)
+    with open(filepath, "r", encoding="utf-8", errors="replace") as f:
+        for line in text_lines(f):
+            if line.startswith("<DOCUMENT>"):
+                # A link or style left open in one document doesn't hide the next
+                parser.skip_depth = 0
+            parser.feed(line)
+            if parser.full:
+                break
+    parser.close()
+    return parser.text()
+
+
+def submission_header(filepath: str) -> Dict[str, str]:
+    """The top level entries of the SEC header ("CONFORMED SUBMISSION TYPE", "FILED AS OF DATE", ...), read up to its end."""
+    header = {}
+    with open(filepath, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line.startswith("</SEC-HEADER>") or line.startswith("<DOCUMENT>"):
+                break
+            # Entries of the filer and other sections are indented
+            key, colon, value = line.partition(":")
+            if colon and value.strip() and not line[:1].isspace() and not line.startswith("<"):
+                header.setdefault(key.strip(), value.strip())
+    return header
+
+
+def normalize(text: str) -> str:
+    """Lower case words without punctuation, numbers kept, stop words removed."""
+    words = text.lower().translate(PUNCTUATION).split()
+    return " ".join(word for word in words if word.isalnum() and word not in STOP_WORDS)
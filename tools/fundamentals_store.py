@@ -0,0 +1,209 @@
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Local store for financial statement numbers, in long format: one row per (period end, frequency, metric) with its value.
+# Each ticker is a folder with one flat binary file per column, like the price store (tools/ohlcv_store.py).
+# Metric names are stored once in meta.json, the metric column holds their position in that list.
+# Only (period end, frequency, metric) rows that aren't stored yet are appended, stored numbers are never changed.
+#
+#   <folder>/<ticker>/meta.json       rows, metric names, the last period end of each frequency and if it is missing metrics
+#   <folder>/<ticker>/period_end.i8   end of the period, nanoseconds since epoch
+#   <folder>/<ticker>/frequency.i1    0 yearly, 1 quarterly
+#   <folder>/<ticker>/metric.i4       position in the metric names
+#   <folder>/<ticker>/value.f8        the number
+
+FREQUENCIES = ["yearly", "quarterly"]
+
+# Statements (TickerSession properties) of each frequency
+STATEMENTS = {"yearly": ["balance_sheet", "cash_flow", "income_stmt"],
+              "quarterly": ["quarterly_balance_sheet", "quarterly_cash_flow", "quarterly_income_stmt"]}
+
+# Months from one period end to the next. A new period can't be filed before that, so statements aren't read until then.
+PERIOD_MONTHS = {"yearly": 12, "quarterly": 3}
+
+COLUMN_DTYPES = {"period_end": "int64", "frequency": "int8",
+                 "metric": "int32", "value": "float64"}
+COLUMN_FILES = {"period_end": "period_end.i8", "frequency": "frequency.i1",
+                "metric": "metric.i4", "value": "value.f8"}
+
+
+def statement_rows(statements: List[pd.DataFrame], frequency: str) -> pd.DataFrame:
+    """
+    Long rows (period_end, frequency, metric, value) from yfinance statements (metrics as rows, period ends as columns).
+    A metric that is in more than one statement is taken from the first one.
+    """
+    parts = []
+    for statement in statements:
+        if statement is None or statement.empty:
+            continue
+        rows = statement.rename_axis(index="metric", columns="period_end").stack().rename("value").reset_index()
+        parts.append(rows)
+    if not parts:
+        return pd.DataFrame({"period_end": pd.DatetimeIndex([]), "frequency": pd.Series(dtype=str),
+                             "metric": pd.Series(dtype=str), "value": pd.Series(dtype=float)})
+    rows = pd.concat(parts, ignore_index=True)
+    rows["period_end"] = pd.to_datetime(rows["period_end"]).dt.tz_localize(None)
+    rows["value"] = pd.to_numeric(rows["value"], errors="coerce")
+    rows = rows.dropna(subset=["value"]).drop_duplicates(
+        subset=["period_end", "metric"], keep="first")
+    rows.insert(1, "frequency", frequency)
+    return rows[["period_end", "frequency", "metric", "value"]].reset_index(drop=True)
+
+
+def pivot_metrics(rows: pd.DataFrame, metrics: List[str], periods: int) -> pd.DataFrame:
+    """
+    The metrics of the last periods as a table, metrics as rows and period ends as columns (newest first), like yfinance statements.
+    Metrics that aren't there are left out.
+    """
+    rows = rows[rows["metric"].isin(metrics)]
+    period_ends = sorted(rows["period_end"].unique(), reverse=True)[:periods]
+    rows = rows[rows["period_end"].isin(period_ends)]
+    table = rows.pivot(index="metric", columns="period_end", values="value")
+    table = table.reindex(index=[metric for metric in metrics if metric in table.index],
+                          columns=sorted(table.columns, reverse=True))
+    table.index.name = None
+    table.columns.name = None
+    return table
+
+
+class FundamentalsStore:
+    def __init__(self, folder: str = "./data/fundamentals") -> None:
+        self.folder = folder
+        self.lock = threading.Lock()
+        self.ticker_locks: Dict[str, threading.RLock] = {}
+
+    def ticker_folder(self, ticker_symbol: str) -> str:
+        return os.path.join(self.folder, ticker_symbol)
+
+    def ticker_lock(self, ticker_symbol: str) -> threading.RLock:
+        # One writer per ticker. Different tickers are written at the same time.
+        with self.lock:
+            return self.ticker_locks.setdefault(ticker_symbol, threading.RLock())
+
+    def read_meta(self, ticker_symbol: str) -> Optional[dict]:
+        path = os.path.join(self.ticker_folder(ticker_symbol), "meta.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf8") as f:
+            return json.load(f)
+
+    def last_period(self, ticker_symbol: str, frequency: str) -> Optional[pd.Timestamp]:
+        meta = self.read_meta(ticker_symbol)
+        if meta is None or meta["last_period"].get(frequency) is None:
+            return None
+        return pd.Timestamp(meta["last_period"][frequency])
+
+    def due(self, ticker_symbol: str, frequency: str, now: Optional[pd.Timestamp] = None) -> bool:
+        # True when the next period has ended, so a new filing can be out,
+        # or when the last period is still missing metrics that yfinance may have filled in since
+        meta = self.read_meta(ticker_symbol)
+        if meta is None or meta["last_period"].get(frequency) is None:
+            return True
+        if meta.get("incomplete", {}).get(frequency):
+            return True
+        now = now if now is not None else pd.Timestamp.now()
+        return now >= pd.Timestamp(meta["last_period"][frequency]) + pd.DateOffset(months=PERIOD_MONTHS[frequency])
+
+    def read(self, ticker_symbol: str, frequency: Optional[str] = None) -> pd.DataFrame:
+        """All stored rows of the ticker (or of one frequency) as (period_end, frequency, metric, value)."""
+        meta = self.read_meta(ticker_symbol)
+        if meta is None:
+            return statement_rows([], frequency or FREQUENCIES[0])
+        columns = {name: self.column(ticker_symbol, meta, name)
+                   for name in COLUMN_FILES}
+        mask = slice(None) if frequency is None else columns["frequency"] == FREQUENCIES.index(
+            frequency)
+        return pd.DataFrame({
+            "period_end": pd.DatetimeIndex(np.asarray(columns["period_end"][mask], dtype="datetime64[ns]")),
+            "frequency": np.asarray(FREQUENCIES)[columns["frequency"][mask]],
+            "metric": np.asarray(meta["metrics"], dtype=object)[columns["metric"][mask]],
+            "value": np.array(columns["value"][mask]),
+        })
+
+    def query(self, ticker_symbol: str, metrics: List[str], periods: int, frequency: str) -> pd.DataFrame:
+        """The metrics of the last periods of a frequency, metrics as rows and period ends as columns."""
+        return pivot_metrics(self.read(ticker_symbol, frequency), metrics, periods)
+
+    def append(self, ticker_symbol: str, rows: pd.DataFrame) -> int:
+        """
+        Appends the rows whose (period end, frequency, metric) isn't stored yet. Returns the number of rows appended.
+        That takes new periods, and metrics of a stored period that were missing (NaN) when it was first read.
+        Numbers that are already stored are kept as they are, restatements are not picked up.
+        """
+        with self.ticker_lock(ticker_symbol):
+            meta = self.read_meta(ticker_symbol) or {
+                "rows": 0, "metrics": [], "last_period": {}}
+            stored = self.read(ticker_symbol)
+            keys = ["period_end", "frequency", "metric"]
+            new_rows = rows[~pd.MultiIndex.from_frame(rows[keys]).isin(
+                pd.MultiIndex.from_frame(stored[keys]))]
+            if not len(new_rows):
+                return 0
+            new_rows = new_rows.reset_index(drop=True)
+
+            # A last period with fewer metrics than the one before it is read again while it is the last period
+            all_rows = pd.concat([stored, new_rows], ignore_index=True)
+            meta.setdefault("incomplete", {})
+            for frequency, group in all_rows.groupby("frequency"):
+                period_ends = sorted(group["period_end"].unique(), reverse=True)
+                meta["last_period"][frequency] = pd.Timestamp(period_ends[0]).isoformat()
+                metrics = [set(group.loc[group["period_end"] == period_end, "metric"])
+                           for period_end in period_ends[:2]]
+                meta["incomplete"][frequency] = len(metrics) == 2 and bool(metrics[1] - metrics[0])
+
+            codes = {metric: i for i, metric in enumerate(meta["metrics"])}
+            for metric in new_rows["metric"].unique():
+                if metric not in codes:
+                    codes[metric] = len(meta["metrics"])
+                    meta["metrics"].append(metric)
+            self.write_rows(ticker_symbol, meta, {
+                "period_end": pd.DatetimeIndex(new_rows["period_end"]).as_unit("ns").asi8,
+                "frequency": new_rows["frequency"].map(FREQUENCIES.index).to_numpy(),
+                "metric": new_rows["metric"].map(codes).to_numpy(),
+                "value": new_rows["value"].to_numpy(dtype=np.float64),
+            })
+            return len(new_rows)
+
+    def update(self, ticker_symbol: str, session) -> int:
+        """
+        Reads the statements of each frequency that is due from the ticker's session (a TickerSession) and appends the new periods.
+        Frequencies that aren't due are not read, so their statements aren't downloaded.
+        """
+        appended = 0
+        for frequency in FREQUENCIES:
+            if self.due(ticker_symbol, frequency):
+                appended += self.append(ticker_symbol, statement_rows(
+                    [getattr(session, name) for name in STATEMENTS[frequency]], frequency))
+        return appended
+
+    def write_rows(self, ticker_symbol: str, meta: dict, columns: Dict[str, np.ndarray]) -> None:
+        folder = self.ticker_folder(ticker_symbol)
+        os.makedirs(folder, exist_ok=True)
+        first_row = meta["rows"]
+        for name, values in columns.items():
+            dtype = np.dtype(COLUMN_DTYPES[name])
+            path = os.path.join(folder, COLUMN_FILES[name])
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                f.seek(first_row * dtype.itemsize)
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+                f.truncate()
+
+        # The row count is written last. Until then, readers see the rows that were there before.
+        meta["rows"] = first_row + len(columns["value"])
+        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf8") as f:
+            json.dump(meta, f, indent=4)
+        os.replace(tmp_path, os.path.join(folder, "meta.json"))
+
+    def column(self, ticker_symbol: str, meta: dict, name: str) -> np.ndarray:
+        dtype = np.dtype(COLUMN_DTYPES[name])
+        if meta["rows"] == 0:
+            return np.empty(0, dtype=dtype)
+        path = os.path.join(self.ticker_folder(ticker_symbol), COLUMN_FILES[name])
+        return np.memmap(path, dtype=dtype, mode="r", shape=(meta["rows"],))
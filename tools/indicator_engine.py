@@ -0,0 +1,241 @@
+import sys
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Techical indicators for many tickers at once.
+# Prices are a 2-D array, one row per bar and one column per ticker. Each ticker's bars are aligned to the last row,
+# with NaN before its first bar, so every column is computed as if the ticker was on its own.
+# The formulas are the ones pandas_ta uses (no TA-Lib), so the numbers and column names match what techical_analysis had before.
+
+
+def sma(close: np.ndarray, length: int) -> np.ndarray:
+    # Rolling mean, NaN until there are length bars in the window
+    valid = ~np.isnan(close)
+    sums = np.cumsum(np.where(valid, close, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    window_sums = sums.copy()
+    window_sums[length:] -= sums[:-length]
+    window_counts = counts.copy()
+    window_counts[length:] -= counts[:-length]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(window_counts == length, window_sums / length, np.nan)
+
+
+def ewm_mean(values: np.ndarray, alpha: float, adjust: bool, min_periods: int = 0) -> np.ndarray:
+    # Same recursion as pandas' ewm(alpha=alpha, adjust=adjust, min_periods=min_periods).mean(), one step per bar for all tickers
+    old_wt_factor = 1.0 - alpha
+    new_wt = 1.0 if adjust else alpha
+    output = np.full(values.shape, np.nan)
+    weighted = values[0].copy()
+    old_wt = np.ones(values.shape[1:])
+    nobs = (~np.isnan(weighted)).astype(np.int64)
+    output[0] = np.where(nobs >= max(min_periods, 1), weighted, np.nan)
+    for i in range(1, values.shape[0]):
+        current = values[i]
+        is_observation = ~np.isnan(current)
+        nobs += is_observation
+        started = ~np.isnan(weighted)
+
+        old_wt = np.where(started, old_wt * old_wt_factor, old_wt)
+        update = started & is_observation
+        with np.errstate(invalid="ignore"):
+            weighted = np.where(update, (old_wt * weighted + new_wt * current) / (old_wt + new_wt), weighted)
+        if adjust:
+            old_wt = np.where(update, old_wt + new_wt, old_wt)
+        else:
+            old_wt = np.where(update, 1.0, old_wt)
+
+        weighted = np.where(~started & is_observation, current, weighted)
+        output[i] = np.where(nobs >= max(min_periods, 1), weighted, np.nan)
+    return output
+
+
+def first_valid_rows(values: np.ndarray) -> np.ndarray:
+    # Row of the first bar of each ticker, or the number of rows when it has none
+    valid = ~np.isnan(values)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), values.shape[0])
+
+
+def ema(close: np.ndarray, length: int) -> np.ndarray:
+    # Seeded with the mean of the first length bars, then ewm(span=length, adjust=False)
+    rows = close.shape[0]
+    columns = np.arange(close.shape[1])
+    seed_rows = first_valid_rows(close) + length - 1
+    # Tickers with fewer bars than length get no result, like in pandas_ta
+    has_seed = seed_rows < rows
+    seed_rows = np.minimum(seed_rows, rows - 1)
+
+    valid = ~np.isnan(close)
+    sums = np.cumsum(np.where(valid, close, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        seeds = sums[seed_rows, columns] / counts[seed_rows, columns]
+
+    seeded = np.where(np.arange(rows)[:, None] < seed_rows, np.nan, close)
+    seeded[seed_rows, columns] = seeds
+    seeded[:, ~has_seed] = np.nan
+    return ewm_mean(seeded, alpha=2.0 / (length + 1), adjust=False)
+
+
+def rma(values: np.ndarray, length: int) -> np.ndarray:
+    # Wilder's moving average
+    return ewm_mean(values, alpha=1.0 / length, adjust=True, min_periods=length)
+
+
+def shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    shifted = np.full(values.shape, np.nan)
+    shifted[periods:] = values[:-periods]
+    return shifted
+
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    line = ema(close, fast) - ema(close, slow)
+    # The signal line starts at the first MACD value
+    signal_line = ema(line, signal)
+    return {f"MACD_{fast}_{slow}_{signal}": line,
+            f"MACDh_{fast}_{slow}_{signal}": line - signal_line,
+            f"MACDs_{fast}_{slow}_{signal}": signal_line}
+
+
+def rsi(close: np.ndarray, length: int = 14) -> np.ndarray:
+    change = close - shift(close)
+    with np.errstate(invalid="ignore"):
+        gains = rma(np.where(change < 0, 0.0, change), length)
+        losses = rma(np.where(change > 0, 0.0, change), length)
+        return 100 * gains / (gains + np.abs(losses))
+
+
+def zero_small(values: np.ndarray) -> np.ndarray:
+    return np.where(np.abs(values) < sys.float_info.epsilon, 0.0, values)
+
+
+def adx(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int = 14) -> Dict[str, np.ndarray]:
+    # Average true range
+    high_low = high - low
+    # pandas_ta nudges the whole range off zero if any bar has high == low
+    high_low = np.where((high_low == 0).any(axis=0), high_low + sys.float_info.epsilon, high_low)
+    prev_close = shift(close)
+    true_range = np.fmax(np.fmax(np.abs(high_low), np.abs(high - prev_close)), np.abs(prev_close - low))
+    true_range[np.isnan(prev_close)] = np.nan
+    atr = rma(true_range, length)
+
+    # Directional movement
+    up = high - shift(high)
+    down = shift(low) - low
+    with np.errstate(invalid="ignore", divide="ignore"):
+        positive = zero_small(((up > down) & (up > 0)) * up)
+        negative = zero_small(((down > up) & (down > 0)) * down)
+        k = 100 / atr
+        dmp = k * rma(positive, length)
+        dmn = k * rma(negative, length)
+        dx = 100 * np.abs(dmp - dmn) / (dmp + dmn)
+    return {f"ADX_{length}": rma(dx, length), f"DMP_{length}": dmp, f"DMN_{length}": dmn}
+
+
+def align(frames: Dict[str, pd.DataFrame], column: str, rows: int) -> np.ndarray:
+    # One column per ticker, each ticker's bars at the bottom
+    values = np.full((rows, len(frames)), np.nan)
+    for i, df in enumerate(frames.values()):
+        if len(df):
+            values[-len(df):, i] = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+    return values
+
+
+class IndicatorSpec:
+    """
+    Which indicators techical_analysis computes, and their lengths. A part that is None is left out.
+    golden_cross is the pair of SMA lengths compared for the golden cross column, both must be in sma.
+    """
+
+    def __init__(self, sma: Sequence[int] = (10, 50), golden_cross: Optional[Sequence[int]] = (10, 50),
+                 macd: Optional[Sequence[int]] = (12, 26, 9), adx: Optional[int] = 14, rsi: Optional[int] = 14) -> None:
+        self.sma = list(sma or [])
+        self.golden_cross = list(golden_cross) if golden_cross else None
+        self.macd = list(macd) if macd else None
+        self.adx = adx
+        self.rsi = rsi
+        if self.golden_cross is not None and not set(self.golden_cross) <= set(self.sma):
+            raise ValueError(
+                f"Golden cross {self.golden_cross} needs both lengths in sma {self.sma}")
+
+    @classmethod
+    def from_config(cls, config: dict) -> "IndicatorSpec":
+        # Keys that are missing keep their default, keys set to null turn the indicator off
+        return cls(**{name: config[name] for name in ["sma", "golden_cross", "macd", "adx", "rsi"] if name in config})
+
+    def columns(self) -> List[str]:
+        names = [f"SMA_{length}" for length in self.sma]
+        if self.golden_cross is not None:
+            names.append("Golden Cross")
+        if self.macd is not None:
+            fast, slow, signal = self.macd
+            names += [f"MACD_{fast}_{slow}_{signal}",
+                      f"MACDh_{fast}_{slow}_{signal}", f"MACDs_{fast}_{slow}_{signal}"]
+        if self.adx is not None:
+            names += [f"ADX_{self.adx}", f"DMP_{self.adx}", f"DMN_{self.adx}"]
+        if self.rsi is not None:
+            names.append("RSI")
+        return names
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, IndicatorSpec) and vars(self) == vars(other)
+
+    def __repr__(self) -> str:
+        return f"IndicatorSpec({', '.join(f'{name}={value}' for name, value in vars(self).items())})"
+
+
+def indicator_arrays(close: np.ndarray, high: np.ndarray, low: np.ndarray, spec: Optional[IndicatorSpec] = None) -> Dict[str, np.ndarray]:
+    """
+    The indicators of spec (SMA 10/50, golden cross, MACD, ADX and RSI by default) for aligned price arrays (one row per bar, one column per ticker).
+    Returns an array of the same shape per indicator, in the column order techical_analysis uses.
+    """
+    spec = spec or IndicatorSpec()
+    indicators = {f"SMA_{length}": sma(close, length) for length in spec.sma}
+    if spec.golden_cross is not None:
+        short, long = spec.golden_cross
+        with np.errstate(invalid="ignore"):
+            indicators["Golden Cross"] = indicators[f"SMA_{short}"] > indicators[f"SMA_{long}"]
+    if spec.macd is not None:
+        indicators.update(macd(close, *spec.macd))
+    if spec.adx is not None:
+        indicators.update(adx(high, low, close, spec.adx))
+    if spec.rsi is not None:
+        indicators["RSI"] = rsi(close, spec.rsi)
+    return indicators
+
+
+def compute_indicators(frames: Dict[str, pd.DataFrame], spec: Optional[IndicatorSpec] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Indicators for the price history of each ticker, computed for all tickers in one pass.
+    Returns a frame per ticker with the price columns and the indicator columns, on the ticker's own index.
+    Tickers without bars (unknown or delisted) are returned as they are, like incremental_indicators does.
+    """
+    if not frames:
+        return {}
+    rows = max(len(df) for df in frames.values())
+    if rows == 0:
+        # No bars at all (unknown or delisted tickers), nothing to compute
+        return dict(frames)
+    indicators = indicator_arrays(align(frames, "Close", rows), align(
+        frames, "High", rows), align(frames, "Low", rows), spec)
+
+    # The numeric indicators in one block, so each ticker's frame is made from a single array
+    names = list(indicators.keys())
+    golden_cross = indicators.pop("Golden Cross", None)
+    numeric = [name for name in names if name != "Golden Cross"]
+    block = np.stack(list(indicators.values()), axis=-1) if indicators else np.empty((rows, len(frames), 0))
+
+    results = {}
+    for i, (ticker_symbol, df) in enumerate(frames.items()):
+        count = len(df)
+        if count == 0:
+            results[ticker_symbol] = df
+            continue
+        values = pd.DataFrame(
+            block[rows - count:, i, :], index=df.index, columns=numeric)
+        if golden_cross is not None:
+            values.insert(names.index("Golden Cross"), "Golden Cross", golden_cross[rows - count:, i])
+        results[ticker_symbol] = pd.concat([df, values], axis=1)
+    return results
@@ -0,0 +1,339 @@
+import os
+import pickle
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from tools.indicator_engine import IndicatorSpec
+
+# Indicator state that is updated one bar at a time, instead of computing the whole history again.
+# Every state keeps one value per ticker (the last axis of its arrays), so a bar is applied to a whole universe at once.
+# Stepping through a ticker's bars gives the same numbers as compute_indicators on those bars (tools/indicator_engine.py).
+
+
+class VectorState:
+    # Base for states where every array has one entry per ticker on the last axis.
+    # Lists hold states of their own, anything else (lengths, the spec) is shared by all tickers.
+
+    def select(self, tickers: List[int]) -> "VectorState":
+        selected = object.__new__(type(self))
+        for name, value in vars(self).items():
+            if isinstance(value, np.ndarray):
+                value = value[..., tickers].copy()
+            elif isinstance(value, VectorState):
+                value = value.select(tickers)
+            elif isinstance(value, list):
+                value = [item.select(tickers) for item in value]
+            setattr(selected, name, value)
+        return selected
+
+    @staticmethod
+    def stack(states: List["VectorState"]) -> "VectorState":
+        stacked = object.__new__(type(states[0]))
+        for name, value in vars(states[0]).items():
+            if isinstance(value, np.ndarray):
+                value = np.concatenate(
+                    [getattr(state, name) for state in states], axis=-1)
+            elif isinstance(value, VectorState):
+                value = VectorState.stack(
+                    [getattr(state, name) for state in states])
+            elif isinstance(value, list):
+                value = [VectorState.stack([getattr(state, name)[i] for state in states])
+                         for i in range(len(value))]
+            setattr(stacked, name, value)
+        return stacked
+
+    def copy(self) -> "VectorState":
+        return self.select(list(range(self.size())))
+
+    def size(self) -> int:
+        for value in vars(self).values():
+            if isinstance(value, np.ndarray):
+                return value.shape[-1]
+            if isinstance(value, VectorState):
+                return value.size()
+        return 0
+
+
+class SmaState(VectorState):
+    # The last length values in a ring buffer, and their running sum
+    def __init__(self, length: int, tickers: int) -> None:
+        self.length = length
+        self.window = np.full((length, tickers), np.nan)
+        self.position = np.zeros(tickers, dtype=np.int64)
+        self.total = np.zeros(tickers)
+        self.count = np.zeros(tickers, dtype=np.int64)
+
+    def step(self, values: np.ndarray, active: np.ndarray) -> np.ndarray:
+        columns = np.arange(values.shape[0])
+        oldest = self.window[self.position, columns]
+        new_valid = ~np.isnan(values)
+        old_valid = ~np.isnan(oldest)
+        self.total = np.where(active, self.total + np.where(new_valid, values, 0.0) -
+                              np.where(old_valid, oldest, 0.0), self.total)
+        self.count = np.where(
+            active, self.count + new_valid - old_valid, self.count)
+        self.window[self.position, columns] = np.where(
+            active, values, oldest)
+        self.position = np.where(
+            active, (self.position + 1) % self.length, self.position)
+        return np.where(self.count == self.length, self.total / self.length, np.nan)
+
+
+class EwmState(VectorState):
+    # pandas' ewm().mean() recursion, see ewm_mean in tools/indicator_engine.py
+    def __init__(self, alpha: float, adjust: bool, min_periods: int, tickers: int) -> None:
+        self.alpha = alpha
+        self.adjust = adjust
+        self.min_periods = min_periods
+        self.weighted = np.full(tickers, np.nan)
+        self.old_wt = np.ones(tickers)
+        self.nobs = np.zeros(tickers, dtype=np.int64)
+
+    def step(self, values: np.ndarray, active: np.ndarray) -> np.ndarray:
+        new_wt = 1.0 if self.adjust else self.alpha
+        is_observation = ~np.isnan(values) & active
+        started = ~np.isnan(self.weighted)
+        self.nobs = self.nobs + is_observation
+
+        old_wt = np.where(started & active, self.old_wt *
+                          (1.0 - self.alpha), self.old_wt)
+        update = started & is_observation
+        with np.errstate(invalid="ignore"):
+            weighted = np.where(update, (old_wt * self.weighted +
+                                new_wt * values) / (old_wt + new_wt), self.weighted)
+        if self.adjust:
+            old_wt = np.where(update, old_wt + new_wt, old_wt)
+        else:
+            old_wt = np.where(update, 1.0, old_wt)
+        self.weighted = np.where(~started & is_observation, values, weighted)
+        self.old_wt = old_wt
+        return np.where(self.nobs >= max(self.min_periods, 1), self.weighted, np.nan)
+
+
+class EmaState(VectorState):
+    # Seeded with the mean of the first length bars, then ewm(span=length, adjust=False)
+    def __init__(self, length: int, tickers: int) -> None:
+        self.length = length
+        self.bars = np.zeros(tickers, dtype=np.int64)
+        self.seed_total = np.zeros(tickers)
+        self.seed_count = np.zeros(tickers, dtype=np.int64)
+        self.ewm = EwmState(2.0 / (length + 1), False, 0, tickers)
+
+    def step(self, values: np.ndarray, active: np.ndarray) -> np.ndarray:
+        valid = ~np.isnan(values)
+        # Bars are counted from the ticker's first value
+        counting = active & ((self.bars > 0) | valid)
+        self.bars = np.where(counting, self.bars + 1, self.bars)
+        seeding = counting & (self.bars <= self.length)
+        self.seed_total = np.where(
+            seeding & valid, self.seed_total + values, self.seed_total)
+        self.seed_count = np.where(
+            seeding & valid, self.seed_count + 1, self.seed_count)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            seed = self.seed_total / self.seed_count
+        fed = np.where(self.bars == self.length, seed,
+                       np.where(self.bars > self.length, values, np.nan))
+        return self.ewm.step(fed, active)
+
+
+def rma_state(length: int, tickers: int) -> EwmState:
+    # Wilder's moving average
+    return EwmState(1.0 / length, True, length, tickers)
+
+
+class IndicatorState(VectorState):
+    """
+    State of the indicators of spec (SMA 10/50, MACD(12,26,9), ADX(14) and RSI(14) by default) for a number of tickers.
+    step() applies one bar to every active ticker, in O(1) per indicator, and returns the indicator values for that bar.
+    """
+
+    def __init__(self, tickers: int, spec: Optional[IndicatorSpec] = None) -> None:
+        self.spec = spec or IndicatorSpec()
+        self.smas = [SmaState(length, tickers) for length in self.spec.sma]
+        if self.spec.macd is not None:
+            fast, slow, signal = self.spec.macd
+            self.ema_fast = EmaState(fast, tickers)
+            self.ema_slow = EmaState(slow, tickers)
+            self.ema_signal = EmaState(signal, tickers)
+        if self.spec.rsi is not None:
+            self.rsi_gains = rma_state(self.spec.rsi, tickers)
+            self.rsi_losses = rma_state(self.spec.rsi, tickers)
+        if self.spec.adx is not None:
+            self.atr = rma_state(self.spec.adx, tickers)
+            self.dm_positive = rma_state(self.spec.adx, tickers)
+            self.dm_negative = rma_state(self.spec.adx, tickers)
+            self.adx = rma_state(self.spec.adx, tickers)
+        self.prev_close = np.full(tickers, np.nan)
+        self.prev_high = np.full(tickers, np.nan)
+        self.prev_low = np.full(tickers, np.nan)
+        self.zero_range = np.zeros(tickers, dtype=bool)
+
+    def step(self, close: np.ndarray, high: np.ndarray, low: np.ndarray, active: np.ndarray) -> Dict[str, np.ndarray]:
+        spec = self.spec
+        values = {}
+        for length, sma_state in zip(spec.sma, self.smas):
+            values[f"SMA_{length}"] = sma_state.step(close, active)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if spec.golden_cross is not None:
+                short, long = spec.golden_cross
+                values["Golden Cross"] = values[f"SMA_{short}"] > values[f"SMA_{long}"]
+
+            if spec.macd is not None:
+                # MACD, the signal line starts at the first MACD value
+                suffix = "_".join(str(length) for length in spec.macd)
+                line = self.ema_fast.step(
+                    close, active) - self.ema_slow.step(close, active)
+                signal_line = self.ema_signal.step(line, active)
+                values[f"MACD_{suffix}"] = line
+                values[f"MACDh_{suffix}"] = line - signal_line
+                values[f"MACDs_{suffix}"] = signal_line
+
+            if spec.adx is not None:
+                # ADX. pandas_ta nudges the high-low range off zero when the series has a bar with high == low.
+                # Here the nudge starts at that bar, the difference is within float rounding.
+                high_low = high - low
+                self.zero_range = np.where(
+                    active, self.zero_range | (high_low == 0), self.zero_range)
+                high_low = np.where(
+                    self.zero_range, high_low + sys.float_info.epsilon, high_low)
+                true_range = np.fmax(np.fmax(np.abs(high_low), np.abs(
+                    high - self.prev_close)), np.abs(self.prev_close - low))
+                true_range = np.where(np.isnan(self.prev_close),
+                                      np.nan, true_range)
+                atr = self.atr.step(true_range, active)
+                up = high - self.prev_high
+                down = self.prev_low - low
+                positive = ((up > down) & (up > 0)) * up
+                negative = ((down > up) & (down > 0)) * down
+                positive = np.where(np.abs(positive) <
+                                    sys.float_info.epsilon, 0.0, positive)
+                negative = np.where(np.abs(negative) <
+                                    sys.float_info.epsilon, 0.0, negative)
+                k = 100 / atr
+                dmp = k * self.dm_positive.step(positive, active)
+                dmn = k * self.dm_negative.step(negative, active)
+                dx = 100 * np.abs(dmp - dmn) / (dmp + dmn)
+                values[f"ADX_{spec.adx}"] = self.adx.step(dx, active)
+                values[f"DMP_{spec.adx}"] = dmp
+                values[f"DMN_{spec.adx}"] = dmn
+
+            if spec.rsi is not None:
+                change = close - self.prev_close
+                gains = self.rsi_gains.step(
+                    np.where(change < 0, 0.0, change), active)
+                losses = self.rsi_losses.step(
+                    np.where(change > 0, 0.0, change), active)
+                values["RSI"] = 100 * gains / (gains + np.abs(losses))
+
+        self.prev_close = np.where(active, close, self.prev_close)
+        self.prev_high = np.where(active, high, self.prev_high)
+        self.prev_low = np.where(active, low, self.prev_low)
+        return {name: np.where(active, value, np.nan) if value.dtype != bool else value & active
+                for name, value in values.items()}
+
+
+class IndicatorStateStore:
+    """
+    Keeps the indicator state of each ticker on disk, with the last rows of indicator values.
+    The state is saved up to the bar before the newest one, since the newest bar may still change (i.e. intraday).
+    """
+
+    def __init__(self, folder: str = "./data/indicator_state", interval: str = "1d") -> None:
+        self.folder = os.path.join(folder, interval)
+
+    def path(self, ticker_symbol: str) -> str:
+        return os.path.join(self.folder, f"{ticker_symbol}.pkl")
+
+    def load(self, ticker_symbol: str) -> Optional[dict]:
+        if not os.path.exists(self.path(ticker_symbol)):
+            return None
+        with open(self.path(ticker_symbol), "rb") as f:
+            return pickle.load(f)
+
+    def save(self, ticker_symbol: str, entry: dict) -> None:
+        os.makedirs(self.folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(entry, f)
+        os.replace(tmp_path, self.path(ticker_symbol))
+
+
+def step_bars(state: IndicatorState, bars: List[pd.DataFrame]) -> List[Dict[str, List[np.ndarray]]]:
+    # Applies each ticker's bars in order, all tickers at once. Returns the indicator values of every bar, by ticker.
+    steps = max((len(df) for df in bars), default=0)
+    outputs: List[Dict[str, List[np.ndarray]]] = [{} for _ in bars]
+    lengths = np.array([len(df) for df in bars])
+    prices = {}
+    for column in ["Close", "High", "Low"]:
+        prices[column] = np.full((steps, len(bars)), np.nan)
+        for i, df in enumerate(bars):
+            prices[column][:len(df), i] = df[column].to_numpy(
+                dtype=np.float64, na_value=np.nan)
+    for row in range(steps):
+        active = row < lengths
+        values = state.step(prices["Close"][row], prices["High"]
+                            [row], prices["Low"][row], active)
+        for i in np.flatnonzero(active):
+            for name, value in values.items():
+                outputs[i].setdefault(name, []).append(value[i])
+    return outputs
+
+
+def incremental_indicators(frames: Dict[str, pd.DataFrame], store: IndicatorStateStore, keep: int = 25,
+                           spec: Optional[IndicatorSpec] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Indicators for the last keep bars of each ticker, from the saved state and the bars after it.
+    A ticker without saved state, whose saved state is for other indicators, or is from bars that are not in its frame any more
+    (or have been adjusted), starts over from its first bar.
+    The values are the same as compute_indicators on all bars since the state was started.
+    """
+    spec = spec or IndicatorSpec()
+    # Tickers without bars (unknown or delisted) are returned as they are, so they don't fail the batch
+    symbols = [ticker_symbol for ticker_symbol, df in frames.items() if len(df)]
+    entries = {ticker_symbol: store.load(ticker_symbol)
+               for ticker_symbol in symbols}
+    states: List[IndicatorState] = []
+    pending: List[pd.DataFrame] = []
+    for ticker_symbol in symbols:
+        df, entry = frames[ticker_symbol], entries[ticker_symbol]
+        # Prices before a split or dividend are adjusted afterwards, then the saved state no longer fits the bars
+        if entry is not None and getattr(entry["state"], "spec", None) == spec and entry["last"] in df.index and np.isclose(df.at[entry["last"], "Close"], entry["close"]):
+            states.append(entry["state"])
+            pending.append(df[df.index > entry["last"]])
+        else:
+            entries[ticker_symbol] = None
+            states.append(IndicatorState(1, spec))
+            pending.append(df)
+    if not symbols:
+        return dict(frames)
+
+    # Everything but the newest bar is saved, the newest bar is applied to a copy
+    state = VectorState.stack(states)
+    committed = step_bars(state, [df.iloc[:-1] for df in pending])
+    saved = state.copy()
+    newest = step_bars(state, [df.iloc[-1:] for df in pending])
+
+    results = {}
+    for i, ticker_symbol in enumerate(symbols):
+        df = frames[ticker_symbol]
+        rows = [pd.DataFrame(committed[i], index=pending[i].index[:-1]),
+                pd.DataFrame(newest[i], index=pending[i].index[-1:])]
+        entry = entries[ticker_symbol]
+        if entry is not None:
+            rows.insert(0, entry["rows"])
+        indicator_rows = pd.concat([r for r in rows if len(r)])
+        indicator_rows = indicator_rows[~indicator_rows.index.duplicated(
+            keep="last")]
+        if len(pending[i]) > 1:
+            saved_rows = indicator_rows[indicator_rows.index <
+                                        pending[i].index[-1]].tail(keep)
+            store.save(ticker_symbol, {"last": pending[i].index[-2], "close": pending[i]["Close"].iloc[-2],
+                                       "state": saved.select([i]), "rows": saved_rows})
+        tail = df.tail(keep)
+        results[ticker_symbol] = pd.concat(
+            [tail, indicator_rows.reindex(tail.index)], axis=1)
+    return {ticker_symbol: results.get(ticker_symbol, df) for ticker_symbol, df in frames.items()}
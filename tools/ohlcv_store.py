@@ -0,0 +1,186 @@
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# Local store for price history (open, high, low, close, volume bars).
+# Each series (ticker and interval) is a folder with one flat binary file per column, plus the timestamps.
+# Columns are read with np.memmap, so reading the newest bars doesn't load the whole history.
+# Updates write only the new bars at the end of the files.
+#
+#   <folder>/<interval>/<ticker>/meta.json     rows, timezone and dtype of each column
+#   <folder>/<interval>/<ticker>/timestamp.i8  bar start, nanoseconds since epoch (UTC)
+#   <folder>/<interval>/<ticker>/<column>.bin  one value per bar
+
+
+class OhlcvStore:
+    def __init__(self, folder: str = "./data/ohlcv") -> None:
+        self.folder = folder
+        self.lock = threading.Lock()
+        self.series_locks: Dict[str, threading.RLock] = {}
+
+    def series_folder(self, ticker_symbol: str, interval: str) -> str:
+        return os.path.join(self.folder, interval, ticker_symbol)
+
+    def series_lock(self, ticker_symbol: str, interval: str) -> threading.RLock:
+        # One writer per series. Different tickers are written at the same time.
+        with self.lock:
+            return self.series_locks.setdefault(self.series_folder(ticker_symbol, interval), threading.RLock())
+
+    def last_timestamp(self, ticker_symbol: str, interval: str) -> Optional[pd.Timestamp]:
+        meta = self.read_meta(ticker_symbol, interval)
+        if meta is None or meta["rows"] == 0:
+            return None
+        timestamps = self.column(ticker_symbol, interval, meta, "timestamp")
+        return self.to_timestamps(timestamps[-1:], meta["tz"])[0]
+
+    def timezone(self, ticker_symbol: str, interval: str) -> Optional[str]:
+        meta = self.read_meta(ticker_symbol, interval)
+        return meta["tz"] if meta is not None else None
+
+    def first_timestamp(self, ticker_symbol: str, interval: str) -> Optional[pd.Timestamp]:
+        meta = self.read_meta(ticker_symbol, interval)
+        if meta is None or meta["rows"] == 0:
+            return None
+        timestamps = self.column(ticker_symbol, interval, meta, "timestamp")
+        return self.to_timestamps(timestamps[:1], meta["tz"])[0]
+
+    def read(self, ticker_symbol: str, interval: str, start: Optional[pd.Timestamp] = None) -> Optional[pd.DataFrame]:
+        """
+        Bars from start (or all of them), in the same shape yfinance returns them.
+        Returns None when nothing is stored for the series.
+        """
+        meta = self.read_meta(ticker_symbol, interval)
+        if meta is None:
+            return None
+
+        timestamps = self.column(ticker_symbol, interval, meta, "timestamp")
+        first_row = 0
+        if start is not None:
+            first_row = int(np.searchsorted(
+                timestamps, self.to_nanoseconds(pd.DatetimeIndex([start]))[0]))
+
+        # Only the requested rows are copied out of the mapped files
+        index = self.to_timestamps(timestamps[first_row:], meta["tz"])
+        index.name = "Date"
+        data = {name: np.array(self.column(ticker_symbol, interval, meta, name)[first_row:])
+                for name in meta["columns"]}
+        return pd.DataFrame(data, index=index, columns=meta["columns"])
+
+    def write(self, ticker_symbol: str, interval: str, bars: pd.DataFrame) -> None:
+        # Replace the whole series, i.e. when earlier bars have been adjusted for a split or dividend
+        with self.series_lock(ticker_symbol, interval):
+            meta = {"rows": 0, "tz": str(bars.index.tz) if bars.index.tz is not None else None,
+                    "columns": list(bars.columns),
+                    "dtypes": {name: self.storage_dtype(bars[name]) for name in bars.columns}}
+            self.write_rows(ticker_symbol, interval, meta, 0, bars)
+
+    def append(self, ticker_symbol: str, interval: str, bars: pd.DataFrame) -> None:
+        """
+        Adds bars to the end of the series.
+        Stored bars at or after the first new bar are replaced, since the newest stored bar may have been taken before the period closed.
+        """
+        if bars.empty:
+            return
+        with self.series_lock(ticker_symbol, interval):
+            meta = self.read_meta(ticker_symbol, interval)
+            if meta is None:
+                self.write(ticker_symbol, interval, bars)
+                return
+
+            bars = self.in_timezone(bars, meta["tz"])
+            timestamps = self.column(ticker_symbol, interval, meta, "timestamp")
+            first_row = int(np.searchsorted(
+                timestamps, self.to_nanoseconds(bars.index)[0]))
+            del timestamps
+            # Keep the stored column layout, columns the new bars don't have are left empty
+            bars = bars.reindex(columns=meta["columns"])
+            self.write_rows(ticker_symbol, interval, meta, first_row, bars)
+
+    def write_rows(self, ticker_symbol: str, interval: str, meta: dict, first_row: int, bars: pd.DataFrame) -> None:
+        folder = self.series_folder(ticker_symbol, interval)
+        os.makedirs(folder, exist_ok=True)
+
+        columns: Dict[str, np.ndarray] = {
+            "timestamp": self.to_nanoseconds(bars.index)}
+        for name in meta["columns"]:
+            if meta["dtypes"][name] == "int64":
+                columns[name] = bars[name].fillna(0).to_numpy(dtype=np.int64)
+            else:
+                columns[name] = bars[name].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        # Files are not truncated: a reader with the old meta.json may still map the old row count.
+        # Bytes past meta["rows"] are never read.
+        for name, values in columns.items():
+            path = self.column_path(folder, name)
+            dtype = np.dtype(meta["dtypes"].get(name, "int64"))
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                f.seek(first_row * dtype.itemsize)
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+
+        # The row count is written last, so readers don't see appended bars until they are complete.
+        # Rows from first_row on are overwritten in place (the last, unfinished bar, or the whole series on write()),
+        # a reader at that moment can get new values in some columns and old ones in others.
+        meta["rows"] = first_row + len(bars)
+        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf8") as f:
+            json.dump(meta, f, indent=4)
+        os.replace(tmp_path, os.path.join(folder, "meta.json"))
+
+    def read_meta(self, ticker_symbol: str, interval: str) -> Optional[dict]:
+        path = os.path.join(self.series_folder(
+            ticker_symbol, interval), "meta.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf8") as f:
+            return json.load(f)
+
+    def column(self, ticker_symbol: str, interval: str, meta: dict, name: str) -> np.ndarray:
+        dtype = np.dtype(meta["dtypes"].get(name, "int64"))
+        if meta["rows"] == 0:
+            return np.empty(0, dtype=dtype)
+        path = self.column_path(self.series_folder(
+            ticker_symbol, interval), name)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(meta["rows"],))
+
+    @staticmethod
+    def column_path(folder: str, name: str) -> str:
+        if name == "timestamp":
+            return os.path.join(folder, "timestamp.i8")
+        return os.path.join(folder, name.lower().replace(" ", "_") + ".bin")
+
+    @staticmethod
+    def storage_dtype(values: pd.Series) -> str:
+        # Volume is stored as integers, everything else as floats
+        return "int64" if pd.api.types.is_integer_dtype(values.dtype) else "float64"
+
+    @staticmethod
+    def in_timezone(bars: pd.DataFrame, tz: Optional[str]) -> pd.DataFrame:
+        # Bars without a timezone are taken as wall time in the series' timezone, bars with one are converted to it
+        index = pd.DatetimeIndex(bars.index)
+        if index.tz is None and tz is not None:
+            index = index.tz_localize(tz)
+        elif index.tz is not None and tz is None:
+            index = index.tz_localize(None)
+        elif index.tz is not None:
+            index = index.tz_convert(tz)
+        return bars.set_axis(index, axis=0)
+
+    @staticmethod
+    def to_nanoseconds(index: pd.DatetimeIndex) -> np.ndarray:
+        index = pd.DatetimeIndex(index)
+        if index.tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+        return index.as_unit("ns").asi8
+
+    @staticmethod
+    def to_timestamps(nanoseconds: np.ndarray, tz: Optional[str]) -> pd.DatetimeIndex:
+        index = pd.DatetimeIndex(np.asarray(nanoseconds, dtype="datetime64[ns]"))
+        if tz is not None:
+            index = index.tz_localize("UTC").tz_convert(tz)
+        return index
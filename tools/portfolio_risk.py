@@ -0,0 +1,205 @@
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+from tools.app_config import app_config_section
+
+# Risk numbers for a whole portfolio from the price history of its holdings, computed on one array of returns
+# (one row per date, one column per holding) so it scales to thousands of holdings.
+# Weights are by market value (position times last close) when every holding has a position, otherwise equal.
+# Prices are not converted between currencies.
+
+DAY_NS = 24 * 60 * 60 * 1_000_000_000
+
+DEFAULT_RISK_CONFIG = {"benchmark": "SPY", "lookback_bars": 252,
+                       "relative_strength_bars": 63, "bars_per_year": 252, "max_table_rows": 20}
+
+
+def return_matrix(histories: Dict[str, pd.DataFrame], bars: Optional[int] = None) -> pd.DataFrame:
+    """
+    Daily returns of the close, one column per ticker, on the union of the tickers' dates. NaN where a ticker didn't trade.
+    Each return is from the ticker's previous bar, so a holiday on one exchange doesn't lose a return.
+    """
+    days, returns = {}, {}
+    for ticker_symbol, df in histories.items():
+        close = df["Close"].to_numpy(dtype=np.float64, na_value=np.nan)
+        # A holding needs two closes for a return, and a last price
+        if np.count_nonzero(~np.isnan(close)) < 2:
+            continue
+        index = pd.DatetimeIndex(df.index)
+        # Calendar day of each bar, in the exchange's own time
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        days[ticker_symbol] = index.as_unit("ns").asi8[1:] // DAY_NS
+        with np.errstate(invalid="ignore", divide="ignore"):
+            returns[ticker_symbol] = close[1:] / close[:-1] - 1
+    if not days:
+        return pd.DataFrame()
+
+    all_days = np.unique(np.concatenate(list(days.values())))
+    matrix = np.full((len(all_days), len(days)), np.nan)
+    for i, ticker_symbol in enumerate(days):
+        matrix[np.searchsorted(all_days, days[ticker_symbol]), i] = returns[ticker_symbol]
+    frame = pd.DataFrame(matrix, index=pd.DatetimeIndex(all_days * DAY_NS, name="Date"), columns=list(days))
+    return frame.tail(bars) if bars is not None else frame
+
+
+def covariance(returns: np.ndarray) -> np.ndarray:
+    """
+    Covariance of every pair of columns, over the dates both have a return, as matrix products.
+    Each column is centered on its own mean, which is close to the pairwise mean when the histories mostly overlap.
+    """
+    valid = ~np.isnan(returns)
+    centered = np.where(valid, returns - np.nanmean(returns, axis=0), 0.0)
+    counts = valid.T.astype(np.float64) @ valid.astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 1, (centered.T @ centered) / (counts - 1), np.nan)
+
+
+def correlation(cov: np.ndarray) -> np.ndarray:
+    deviation = np.sqrt(np.diag(cov))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return cov / np.outer(deviation, deviation)
+
+
+def holding_weights(positions: Dict[str, Optional[float]], last_prices: pd.Series) -> pd.Series:
+    # Market value weights, or equal weights when a position is missing
+    tickers = list(last_prices.index)
+    values = pd.Series([positions.get(ticker_symbol) for ticker_symbol in tickers],
+                       index=tickers, dtype=float) * last_prices
+    if values.isna().any() or values.sum() <= 0:
+        values = pd.Series(1.0, index=tickers)
+    return values / values.sum()
+
+
+def most_correlated_pairs(corr: np.ndarray, tickers: list, count: int) -> pd.DataFrame:
+    # The pairs with the highest correlation, without building a table of all pairs
+    upper = np.where(np.tri(len(tickers), dtype=bool), np.nan, corr).ravel()
+    upper = np.where(np.isnan(upper), -np.inf, upper)
+    count = min(count, int(np.isfinite(upper).sum()))
+    if count == 0:
+        return pd.DataFrame(columns=["Holding", "Other holding", "Correlation"])
+    top = np.argpartition(-upper, count - 1)[:count]
+    top = top[np.argsort(-upper[top])]
+    rows, columns = np.unravel_index(top, corr.shape)
+    return pd.DataFrame({"Holding": np.asarray(tickers)[rows], "Other holding": np.asarray(tickers)[columns],
+                         "Correlation": upper[top]})
+
+
+def concentration(weights: pd.Series, groups: Dict[str, Optional[str]], name: str) -> pd.DataFrame:
+    # Weight and number of holdings per group (i.e. sector), largest first
+    labels = pd.Series([groups.get(ticker_symbol) or "Unknown" for ticker_symbol in weights.index],
+                       index=weights.index, name=name)
+    table = weights.groupby(labels).agg(["sum", "count"])
+    table.columns = ["Weight", "Holdings"]
+    table["Holdings"] = table["Holdings"].astype(int)
+    return table.sort_values("Weight", ascending=False)
+
+
+def portfolio_risk(histories: Dict[str, pd.DataFrame], benchmark: str, positions: Optional[Dict[str, Optional[float]]] = None,
+                   sectors: Optional[Dict[str, Optional[str]]] = None, industries: Optional[Dict[str, Optional[str]]] = None,
+                   config: Optional[dict] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Risk numbers of the holdings in histories against the benchmark (which may be in histories).
+
+    :return: Tables by name: "summary" (portfolio volatility, beta, diversification), "holdings" (weight, volatility, beta and
+             relative strength of each holding), "pairs" (most correlated holdings), "sectors" and "industries" (concentration),
+             the daily "returns" of the holdings, and the full "covariance" and "correlation" matrices of them.
+    """
+    config = dict(DEFAULT_RISK_CONFIG, **(config or {}))
+    returns = return_matrix(histories, config["lookback_bars"])
+    candidates = [ticker_symbol for ticker_symbol in returns.columns
+                  if ticker_symbol != benchmark or ticker_symbol in (positions or {})]
+    # A holding whose history ends before the lookback has no volatility or beta, it is left out and named in the summary
+    counts = returns[candidates].notna().sum()
+    holdings = [ticker_symbol for ticker_symbol in candidates if counts[ticker_symbol] > 1]
+    left_out = [ticker_symbol for ticker_symbol in candidates if counts[ticker_symbol] <= 1]
+    if not holdings:
+        return {}
+    annualize = np.sqrt(config["bars_per_year"])
+
+    # Holdings and benchmark in one array, the benchmark is the last column
+    benchmark_returns = returns[benchmark] if benchmark in returns.columns else pd.Series(
+        np.nan, index=returns.index)
+    values = np.column_stack([returns[holdings].to_numpy(dtype=np.float64),
+                              benchmark_returns.to_numpy(dtype=np.float64)])
+    cov = covariance(values)
+    holding_cov = cov[:-1, :-1]
+    corr = correlation(holding_cov)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        beta = cov[:-1, -1] / cov[-1, -1]
+
+    last_prices = pd.Series({ticker_symbol: histories[ticker_symbol]["Close"].dropna().iloc[-1]
+                             for ticker_symbol in holdings})
+    weights = holding_weights(positions or {}, last_prices)
+    w = weights.to_numpy()
+
+    # Relative strength: growth of the holding over the last bars, against the growth of the benchmark
+    recent = values[-config["relative_strength_bars"]:]
+    growth = np.prod(1 + np.nan_to_num(recent), axis=0)
+    relative_strength = growth[:-1] / growth[-1] - 1
+
+    portfolio_variance = w @ np.nan_to_num(holding_cov) @ w
+    off_diagonal = corr[~np.eye(len(holdings), dtype=bool)]
+    sector_table = concentration(weights, sectors or {}, "Sector")
+    industry_table = concentration(weights, industries or {}, "Industry")
+
+    summary = pd.DataFrame({"Value": {
+        "Holdings": len(holdings),
+        "Benchmark": benchmark,
+        "Portfolio volatility (annual)": np.sqrt(portfolio_variance) * annualize,
+        "Benchmark volatility (annual)": np.sqrt(cov[-1, -1]) * annualize,
+        "Portfolio beta": np.nansum(w * beta),
+        "Average correlation": np.nanmean(off_diagonal) if off_diagonal.size else np.nan,
+        "Effective number of holdings": 1 / np.sum(w ** 2),
+        "Largest holding weight": w.max(),
+        "Largest sector weight": sector_table["Weight"].iloc[0],
+        "Sector concentration (HHI)": np.sum(sector_table["Weight"] ** 2),
+    }})
+    if left_out:
+        summary.loc["Left out, no returns in the lookback"] = ", ".join(
+            left_out[:config["max_table_rows"]]) + (" ..." if len(left_out) > config["max_table_rows"] else "")
+    holdings_table = pd.DataFrame({
+        "Weight": w,
+        "Volatility (annual)": np.sqrt(np.diag(holding_cov)) * annualize,
+        "Beta": beta,
+        f"Relative strength ({config['relative_strength_bars']} bars)": relative_strength,
+        "Sector": [(sectors or {}).get(ticker_symbol) or "Unknown" for ticker_symbol in holdings],
+    }, index=pd.Index(holdings, name="Ticker")).sort_values("Weight", ascending=False)
+
+    return {"summary": summary, "holdings": holdings_table,
+            "pairs": most_correlated_pairs(corr, holdings, config["max_table_rows"]),
+            "sectors": sector_table, "industries": industry_table,
+            "returns": returns[holdings],
+            "covariance": pd.DataFrame(holding_cov, index=holdings, columns=holdings),
+            "correlation": pd.DataFrame(corr, index=holdings, columns=holdings)}
+
+
+def risk_tables(risk: Dict[str, pd.DataFrame], max_rows: int = 20) -> str:
+    """The risk tables as compact Markdown for a prompt. Long tables are cut to max_rows, the matrices are left out."""
+    risk = dict(risk)
+    if "summary" in risk:
+        # Mixed column of numbers and names
+        risk["summary"] = risk["summary"].map(
+            lambda value: f"{value:.3f}" if isinstance(value, float) else value)
+    titles = {"summary": "Portfolio", "holdings": "Largest holdings", "pairs": "Most correlated holdings",
+              "sectors": "Sector concentration", "industries": "Industry concentration",
+              "value_at_risk": "Value at risk, loss as a fraction of the portfolio value (Monte Carlo)"}
+    sections = []
+    for name, title in titles.items():
+        if name in risk and len(risk[name]):
+            rows = len(risk[name]) if name == "summary" else max_rows
+            table = risk[name].head(rows)
+            shown = f" (top {rows} of {len(risk[name])})" if len(
+                risk[name]) > rows else ""
+            # As objects, so tabulate doesn't read the counts as floats next to the float columns
+            sections.append(
+                f"{title}{shown}:\n{table.astype(object).to_markdown(index=name != 'pairs', floatfmt='.3f')}")
+    return "\n\n".join(sections)
+
+
+def risk_config() -> dict:
+    """
+    Settings for the risk numbers, from "portfolio_risk" in app_config.json.
+    """
+    return app_config_section("portfolio_risk", DEFAULT_RISK_CONFIG)
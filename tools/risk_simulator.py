@@ -0,0 +1,149 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from tools.app_config import app_config_section
+
+# Monte Carlo value at risk (VaR) and expected shortfall (CVaR) of a portfolio, from the daily returns of its holdings.
+#   historical: every simulated day is a day drawn from the history, all holdings together, so their co-movement is kept
+#   parametric: every simulated day is drawn from a multivariate normal with the mean and covariance of the history
+# Paths are simulated for the longest horizon, each holding compounds on its own, and the loss of each horizon is read off the same paths.
+# Paths are made in chunks, and chunk i always gets the i-th seed spawned from the run's seed,
+# so the numbers are the same whether the chunks run in one process or on a process pool.
+
+METHODS = ["historical", "parametric"]
+
+DEFAULT_SIMULATION_CONFIG = {"paths": 100_000, "horizons": [1, 10], "confidence": [0.95, 0.99],
+                             "seed": 20240618, "workers": None, "chunk_paths": 50_000}
+
+# Upper bound on the simulated daily returns (paths x days x holdings) of one chunk, so a chunk stays around 32 MB
+MAX_CHUNK_VALUES = 4_000_000
+
+# Simulated daily returns of a run below which it stays in this process. A process pool takes a few tenths of
+# a second to start, and 100,000 paths of 10 days for 20 holdings (20 million values) take about as long in one process.
+MIN_POOL_VALUES = 50_000_000
+
+# Inputs of the chunks, set once per worker process instead of being sent with every chunk
+_inputs: Dict[str, np.ndarray] = {}
+
+
+def set_inputs(inputs: Dict[str, np.ndarray]) -> None:
+    global _inputs
+    _inputs = inputs
+
+
+def simulation_inputs(returns: np.ndarray, weights: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    What the chunks need: the history (missing returns as 0) for historical paths,
+    the mean and a square root of the covariance for parametric paths.
+    """
+    history = np.nan_to_num(returns)
+    mean = np.nanmean(returns, axis=0)
+    valid = ~np.isnan(returns)
+    centered = np.where(valid, returns - mean, 0.0)
+    counts = np.maximum(valid.T.astype(np.float64) @
+                        valid.astype(np.float64) - 1, 1)
+    cov = (centered.T @ centered) / counts
+    # Pairwise covariance isn't always positive semi-definite, negative eigenvalues are cut to 0
+    eigenvalues, eigenvectors = np.linalg.eigh(cov)
+    root = eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+    return {"history": history, "mean": np.nan_to_num(mean), "root": root, "weights": weights / weights.sum()}
+
+
+def simulate_chunk(method: str, paths: int, horizons: Sequence[int], seed: np.random.SeedSequence) -> np.ndarray:
+    """Losses (fraction of the portfolio value) of paths, one column per horizon."""
+    rng = np.random.default_rng(seed)
+    weights = _inputs["weights"]
+    days = max(horizons)
+    if method == "historical":
+        history = _inputs["history"]
+        draws = rng.integers(0, history.shape[0], size=(paths, days))
+        daily = history[draws]
+    elif method == "parametric":
+        normal = rng.standard_normal(
+            size=(paths, days, _inputs["root"].shape[1]))
+        daily = _inputs["mean"] + normal @ _inputs["root"].T
+    else:
+        raise ValueError(f"Unknown method {method}")
+
+    # Value of each holding along the path, the portfolio is bought and held
+    growth = np.cumprod(1 + daily, axis=1)
+    losses = np.empty((paths, len(horizons)))
+    for i, horizon in enumerate(horizons):
+        losses[:, i] = 1 - growth[:, horizon - 1, :] @ weights
+    return losses
+
+
+def var_cvar(losses: np.ndarray, confidence: float) -> tuple[float, float]:
+    # VaR is the loss quantile, CVaR the mean of the losses at or above it
+    var = float(np.quantile(losses, confidence))
+    return var, float(losses[losses >= var].mean())
+
+
+class RiskSimulator:
+    """
+    Simulates portfolio losses on chunks of paths. With more than one worker and at least MIN_POOL_VALUES
+    simulated returns, the chunks run on a process pool.
+    """
+
+    def __init__(self, returns: np.ndarray, weights: np.ndarray, seed: int = DEFAULT_SIMULATION_CONFIG["seed"],
+                 workers: Optional[int] = None, chunk_paths: int = DEFAULT_SIMULATION_CONFIG["chunk_paths"]) -> None:
+        self.inputs = simulation_inputs(np.asarray(returns, dtype=np.float64), np.asarray(weights, dtype=np.float64))
+        self.seed = seed
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_paths = chunk_paths
+
+    def losses(self, method: str, paths: int, horizons: Sequence[int]) -> np.ndarray:
+        """Losses of paths, one column per horizon (in days)."""
+        chunk_paths = max(1, min(self.chunk_paths, MAX_CHUNK_VALUES //
+                                 (max(horizons) * len(self.inputs["weights"]))))
+        chunks = math.ceil(paths / chunk_paths)
+        sizes = [min(chunk_paths, paths - i * chunk_paths)
+                 for i in range(chunks)]
+        # The same seeds for both methods, each method is its own experiment
+        seeds = np.random.SeedSequence(
+            [self.seed, METHODS.index(method)]).spawn(chunks)
+        values = paths * max(horizons) * len(self.inputs["weights"])
+        if self.workers == 1 or chunks == 1 or values < MIN_POOL_VALUES:
+            set_inputs(self.inputs)
+            results = [simulate_chunk(method, size, horizons, seed)
+                       for size, seed in zip(sizes, seeds)]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, chunks), initializer=set_inputs,
+                                     initargs=(self.inputs,)) as executor:
+                results = list(executor.map(simulate_chunk, [method] * chunks, sizes,
+                                            [horizons] * chunks, seeds))
+        return np.concatenate(results)
+
+    def report(self, paths: int, horizons: Sequence[int] = (1, 10), confidence: Sequence[float] = (0.95, 0.99),
+               methods: Sequence[str] = METHODS) -> pd.DataFrame:
+        """VaR and CVaR (fraction of the portfolio value) by method and horizon."""
+        rows = []
+        for method in methods:
+            losses = self.losses(method, paths, horizons)
+            for i, horizon in enumerate(horizons):
+                row = {"Method": method, "Horizon (days)": horizon}
+                for level in confidence:
+                    row[f"VaR {level:.0%}"], row[f"CVaR {level:.0%}"] = var_cvar(
+                        losses[:, i], level)
+                rows.append(row)
+        return pd.DataFrame(rows).set_index(["Method", "Horizon (days)"])
+
+
+def cost_weights(positions: Dict[str, Optional[float]], buy_prices: Dict[str, Optional[float]], tickers: List[str]) -> np.ndarray:
+    # Weights by what was paid (position times buy price), equal when a position or buy price is missing
+    paid = np.array([(positions.get(ticker_symbol) or np.nan) * (buy_prices.get(ticker_symbol) or np.nan)
+                     for ticker_symbol in tickers], dtype=np.float64)
+    if np.isnan(paid).any() or (paid <= 0).any():
+        return np.full(len(tickers), 1.0 / len(tickers))
+    return paid / paid.sum()
+
+
+def simulation_config() -> dict:
+    """
+    Settings for the simulation, from "risk_simulation" in app_config.json.
+    """
+    return app_config_section("risk_simulation", DEFAULT_SIMULATION_CONFIG)
@@ -0,0 +1,161 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from tools.app_config import app_config_section
+from tools.app_logging import get_logger
+from tools.indicator_engine import IndicatorSpec
+
+# Get the logger specified in the configuration file
+log = get_logger()
+
+# Signal events from the indicator columns of techical_analysis_many, for all tickers and dates at once.
+# A rule is a dict with a name, a type and the columns it reads:
+#   cross: "fast" crossing "slow" (i.e. SMA or MACD line against its signal line)
+#   band:  "column" moving out of, or back into, the band between "low" and "high" (i.e. RSI)
+#   trend: "column" rising above, or falling below, "threshold", the direction is "positive" against "negative" (i.e. ADX)
+# Without "signals" in the config, the rules are made for the configured indicators (default_signal_rules),
+# so changing an indicator's lengths doesn't lose its signal.
+
+
+def default_signal_rules(spec: IndicatorSpec) -> List[dict]:
+    """SMA crossover (the golden cross pair, or the two shortest SMAs), MACD cross, RSI band and ADX trend, as far as spec has them."""
+    rules = []
+    pair = spec.golden_cross or sorted(spec.sma)[:2]
+    if len(pair) == 2:
+        rules.append({"name": "SMA crossover", "type": "cross",
+                      "fast": f"SMA_{min(pair)}", "slow": f"SMA_{max(pair)}"})
+    if spec.macd is not None:
+        lengths = "_".join(str(length) for length in spec.macd)
+        rules.append({"name": "MACD cross", "type": "cross",
+                      "fast": f"MACD_{lengths}", "slow": f"MACDs_{lengths}"})
+    if spec.rsi is not None:
+        rules.append({"name": "RSI band", "type": "band",
+                      "column": "RSI", "low": 30, "high": 70})
+    if spec.adx is not None:
+        rules.append({"name": "ADX trend", "type": "trend", "column": f"ADX_{spec.adx}",
+                      "threshold": 25, "positive": f"DMP_{spec.adx}", "negative": f"DMN_{spec.adx}"})
+    return rules
+
+
+DEFAULT_SIGNAL_RULES = default_signal_rules(IndicatorSpec())
+
+EVENT_COLUMNS = ["Ticker", "Date", "Signal", "Event", "Value"]
+
+# Columns each type of rule reads
+RULE_COLUMNS = {"cross": ["fast", "slow"], "band": ["column"],
+                "trend": ["column", "positive", "negative"]}
+
+
+def stack_frames(frames: Dict[str, pd.DataFrame], columns: List[str]) -> pd.DataFrame:
+    # One long frame, indexed by ticker and date, with the previous bar of each ticker next to it
+    stacked = pd.concat({ticker_symbol: df.reindex(columns=columns) for ticker_symbol, df in frames.items() if len(df)},
+                        names=["Ticker", "Date"])
+    previous = stacked.groupby(level="Ticker").shift()
+    return stacked.join(previous, rsuffix=" previous")
+
+
+def cross_events(stacked: pd.DataFrame, rule: dict) -> List[pd.DataFrame]:
+    spread = stacked[rule["fast"]] - stacked[rule["slow"]]
+    previous = stacked[rule["fast"] + " previous"] - \
+        stacked[rule["slow"] + " previous"]
+    return [event_rows(spread, (spread > 0) & (previous <= 0), rule["name"], "bullish cross"),
+            event_rows(spread, (spread < 0) & (previous >= 0), rule["name"], "bearish cross")]
+
+
+def band_zone(values: pd.Series, low: float, high: float) -> pd.Series:
+    # -1 below the band, 1 above it, 0 inside. NaN stays NaN, so no event comes from a missing value.
+    zone = np.select([values < low, values > high], [-1, 1], 0)
+    return pd.Series(zone, index=values.index).where(values.notna())
+
+
+def band_events(stacked: pd.DataFrame, rule: dict) -> List[pd.DataFrame]:
+    value = stacked[rule["column"]]
+    zone = band_zone(value, rule["low"], rule["high"])
+    previous_zone = band_zone(
+        stacked[rule["column"] + " previous"], rule["low"], rule["high"])
+    changed = (zone != previous_zone) & zone.notna() & previous_zone.notna()
+    return [event_rows(value, changed & (zone == -1), rule["name"], "oversold"),
+            event_rows(value, changed & (zone == 1), rule["name"], "overbought"),
+            event_rows(value, changed & (zone == 0) &
+                       (previous_zone == -1), rule["name"], "left oversold"),
+            event_rows(value, changed & (zone == 0) & (previous_zone == 1), rule["name"], "left overbought")]
+
+
+def trend_events(stacked: pd.DataFrame, rule: dict) -> List[pd.DataFrame]:
+    value = stacked[rule["column"]]
+    previous = stacked[rule["column"] + " previous"]
+    starts = (value > rule["threshold"]) & (previous <= rule["threshold"])
+    rising = stacked[rule["positive"]] > stacked[rule["negative"]]
+    return [event_rows(value, starts & rising, rule["name"], "uptrend started"),
+            event_rows(value, starts & ~rising,
+                       rule["name"], "downtrend started"),
+            event_rows(value, (value <= rule["threshold"]) & (previous > rule["threshold"]), rule["name"], "trend ended")]
+
+
+RULE_EVENTS = {"cross": cross_events,
+               "band": band_events, "trend": trend_events}
+
+
+def event_rows(values: pd.Series, mask: pd.Series, signal: str, event: str) -> pd.DataFrame:
+    selected = values[mask.fillna(False).astype(bool)]
+    rows = selected.reset_index()
+    rows.columns = ["Ticker", "Date", "Value"]
+    rows["Signal"] = signal
+    rows["Event"] = event
+    return rows
+
+
+def signal_events(frames: Dict[str, pd.DataFrame], rules: Optional[List[dict]] = None,
+                  spec: Optional[IndicatorSpec] = None) -> pd.DataFrame:
+    """
+    Signal events of every ticker, i.e. a golden cross, RSI moving into oversold or ADX showing a new trend.
+
+    :param frames: Indicator columns by ticker, as techical_analysis_many returns them.
+    :param rules: Signal rules, the configured ones (or the ones for spec) when None. Rules on columns that weren't computed are skipped.
+    :return: One row per event with Ticker, Date, Signal, Event and the indicator Value, sorted by ticker and date.
+    """
+    rules = rules if rules is not None else signal_rules(spec)
+    available = set().union(*(df.columns for df in frames.values())) if frames else set()
+    usable = []
+    for rule in rules:
+        missing = [rule[key] for key in RULE_COLUMNS[rule["type"]]
+                   if rule[key] not in available]
+        if missing:
+            log.warning(f"Skipping signal {rule['name']}, no {missing} columns")
+        else:
+            usable.append(rule)
+    if not usable or not any(len(df) for df in frames.values()):
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+
+    columns = list(dict.fromkeys(rule[key] for rule in usable
+                                 for key in RULE_COLUMNS[rule["type"]]))
+    stacked = stack_frames(frames, columns)
+    events = [rows for rule in usable for rows in RULE_EVENTS[rule["type"]](
+        stacked, rule) if len(rows)]
+    if not events:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    return pd.concat(events, ignore_index=True)[EVENT_COLUMNS].sort_values(
+        ["Ticker", "Date", "Signal"], kind="stable", ignore_index=True)
+
+
+def ticker_events(events: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    # The event table split by ticker, indexed by date, for the prompt of each stock
+    return {ticker_symbol: rows.drop(columns="Ticker").set_index("Date")
+            for ticker_symbol, rows in events.groupby("Ticker", sort=False)}
+
+
+def configured_indicator_spec() -> IndicatorSpec:
+    """The indicators from "indicators" under "technical_analysis" in app_config.json."""
+    return IndicatorSpec.from_config(app_config_section("technical_analysis").get("indicators", {}))
+
+
+def signal_rules(spec: Optional[IndicatorSpec] = None) -> List[dict]:
+    """
+    The signal rules, from "signals" under "technical_analysis" in app_config.json.
+    Without them, the default rules for spec, or for the configured indicators when spec is None.
+    """
+    config = app_config_section("technical_analysis")
+    if "signals" in config:
+        return config["signals"]
+    return default_signal_rules(spec or configured_indicator_spec())
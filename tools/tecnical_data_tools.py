@@ -1,9 +1,22 @@
+from typing import TYPE_CHECKING, Optional
 import pandas as pd
 import tabulate
 import yfinance as yf
-import pandas_ta as ta
 from tabulate import tabulate
 
+from tools.disk_cache import yf_cache
+from tools.fetch_window import START_SLACK_DAYS, FetchWindow, fetch_window
+from tools.fundamentals_store import STATEMENTS, pivot_metrics, statement_rows
+from tools.indicator_engine import compute_indicators
+from tools.indicator_state import IndicatorStateStore, incremental_indicators
+from tools.signal_engine import signal_events, ticker_events
+from tools.ticker_session import TickerSession
+
+if TYPE_CHECKING:
+    from tools.fundamentals_store import FundamentalsStore
+    from tools.ohlcv_store import OhlcvStore
+    from tools.ticker_session import TickerSessionRegistry
+
 
 # Tools for getting stock data from Yahoo Finance.
 # Including simple techical analysis.
@@ -15,7 +28,7 @@ yfin_allowed_intervals = ['1m', '2m', '5m', '15m', '30m',
                           '60m', '90m', '1h', '1d', '5d', '1wk', '1mo', '3mo']
 
 
-def get_essential_info(data: yf.Ticker) -> dict:
+def get_essential_info(data: TickerSession) -> dict:
     inf = {}
     inf["Name"] = data.info.get("longName")
     inf["Industry"] = data.info.get("industryDisp")
@@ -53,23 +66,30 @@ def remove_dataframe_nan(df):
     return df.dropna(how='all')
 
 
-def get_yf_data(ticker) -> yf.Ticker:
+def get_yf_data(ticker, sessions: "Optional[TickerSessionRegistry]" = None) -> TickerSession:
     """
     Fetches stock data for the given ticker using yfinance.
     :param ticker: Stock ticker symbol as a string.
-    :return: DataFrame with stock data.
+    :param sessions: Registry shared by the fetchers of a run. Without it, the payloads are only shared by this caller.
+    :return: Session that downloads each payload once.
     """
     # yf.enable_debug_mode()
     # Fetch data
-    data = yf.Ticker(ticker)
-    return data
+    if sessions is not None:
+        return sessions.get(ticker)
+    return TickerSession(ticker)
 
 
-def fetch_stock_history_data(yf_ticker_data) -> pd.DataFrame:
+def fetch_stock_history_data(yf_ticker_data, price_store: "Optional[OhlcvStore]" = None, window: Optional[FetchWindow] = None) -> pd.DataFrame:
+    # The window has the bars the configured indicators need, see tools/fetch_window.py
+    window = window or fetch_window()
 
-    # Get historical market data for the last n months
-    df = yf_ticker_data.history(
-        period=yfin_allowed_timespans[3], interval=yfin_allowed_intervals[8])
+    if price_store is None:
+        # Get historical market data for the window
+        df = yf_ticker_data.history(start=window.start().strftime(
+            "%Y-%m-%d"), interval=window.interval).tail(window.bars())
+    else:
+        df = update_stock_history_data(yf_ticker_data, price_store, window)
 
     # Ensure the DataFrame index is a DatetimeIndex
     df.index = pd.DatetimeIndex(df.index)
@@ -77,82 +97,209 @@ def fetch_stock_history_data(yf_ticker_data) -> pd.DataFrame:
     return df
 
 
-def techical_analysis(df: pd.DataFrame):
+def update_stock_history_data(yf_ticker_data, price_store: "OhlcvStore", window: FetchWindow) -> pd.DataFrame:
+    """
+    Downloads only the bars after the last stored one, and reads the window from the local store.
+    The last stored bar is downloaded again, since it may have been stored before the market closed.
+    """
+    ticker_symbol = yf_ticker_data.ticker
+    interval = window.interval
+    last_stored = price_store.last_timestamp(ticker_symbol, interval)
+
+    if last_stored is not None and yf_cache().prefer_cache:
+        # Offline mode, use the stored bars as they are
+        return read_stock_history(price_store, ticker_symbol, window)
+    if last_stored is None or needs_backfill(price_store, ticker_symbol, window):
+        df = yf_ticker_data.history(start=window.start().strftime(
+            "%Y-%m-%d"), interval=interval)
+        if df.empty:
+            return df
+        price_store.write(ticker_symbol, interval, df)
+    else:
+        new_bars = yf_ticker_data.history(
+            start=last_stored.strftime("%Y-%m-%d"), interval=interval)
+        if not store_new_bars(price_store, ticker_symbol, interval, new_bars):
+            refetch_stored_history(yf_ticker_data, price_store, interval)
+
+    return read_stock_history(price_store, ticker_symbol, window)
+
+
+def needs_backfill(price_store: "OhlcvStore", ticker_symbol: str, window: FetchWindow) -> bool:
+    # The window got longer than the stored history (i.e. an SMA_200 was configured), the missing start is downloaded.
+    # A ticker listed after the start of the window has fewer bars than it needs, it is downloaded again until it has them.
+    meta = price_store.read_meta(ticker_symbol, window.interval)
+    if meta is None or meta["rows"] >= window.bars():
+        return False
+    first_stored = price_store.first_timestamp(ticker_symbol, window.interval)
+    return first_stored > window.start(first_stored.tz) + pd.Timedelta(days=START_SLACK_DAYS)
+
+
+def store_new_bars(price_store: "OhlcvStore", ticker_symbol: str, interval: str, new_bars: pd.DataFrame) -> bool:
+    """
+    Appends the bars to the stored series.
+    Returns False, without storing anything, when there was a split or dividend after the last stored bar.
+    """
+    new_bars = price_store.in_timezone(
+        new_bars, price_store.timezone(ticker_symbol, interval))
+    after_stored = new_bars[new_bars.index >
+                            price_store.last_timestamp(ticker_symbol, interval)]
+    corporate_actions = [name for name in ["Dividends", "Stock Splits"]
+                         if name in after_stored.columns and (after_stored[name] != 0).any()]
+    if corporate_actions:
+        return False
+    price_store.append(ticker_symbol, interval, new_bars)
+    return True
+
+
+def refetch_stored_history(yf_ticker_data, price_store: "OhlcvStore", interval: str) -> None:
+    # yfinance adjusts earlier prices for splits and dividends, so the stored bars are out of date
+    ticker_symbol = yf_ticker_data.ticker
+    first_stored = price_store.first_timestamp(ticker_symbol, interval)
+    price_store.write(ticker_symbol, interval, yf_ticker_data.history(
+        start=first_stored.strftime("%Y-%m-%d"), interval=interval))
+
+
+def read_stock_history(price_store: "OhlcvStore", ticker_symbol: str, window: FetchWindow) -> pd.DataFrame:
+    # Only the bars of the window are copied out of the store
+    df = price_store.read(ticker_symbol, window.interval, window.start(
+        price_store.timezone(ticker_symbol, window.interval)))
+    return df.tail(window.bars()) if df is not None else df
+
+
+def download_stock_histories(ticker_symbols: list[str], interval: str, period: Optional[str] = None, start: Optional[str] = None, batch_size: int = 100) -> dict[str, pd.DataFrame]:
+    """
+    Downloads the price history of many tickers with a few bulk requests, and splits it into a frame per ticker.
+    The frames have the same columns as yf.Ticker.history(). Tickers yfinance had nothing for are left out.
+    Timestamps keep their timezone (UTC when a batch has exchanges in more than one), so intraday bars aren't shifted.
+    """
+    period_or_start = {"start": start} if start is not None else {"period": period}
+    histories = {}
+    for i in range(0, len(ticker_symbols), batch_size):
+        batch = ticker_symbols[i:i + batch_size]
+        df = yf.download(batch, interval=interval, group_by='ticker', auto_adjust=True, actions=True,
+                         threads=True, progress=False, ignore_tz=False, **period_or_start)
+        if df is None or df.empty:
+            continue
+        for ticker_symbol in batch:
+            if ticker_symbol not in df.columns.get_level_values(0):
+                continue
+            bars = df[ticker_symbol]
+            # Tickers are aligned on the same dates, drop the ones this ticker didn't trade on
+            bars = bars.dropna(how='all', subset=[name for name in [
+                               "Open", "High", "Low", "Close"] if name in bars.columns])
+            if bars.empty:
+                continue
+            bars = bars.reindex(columns=[name for name in ["Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits"]
+                                         if name in bars.columns])
+            if "Volume" in bars.columns and not bars["Volume"].isna().any():
+                bars["Volume"] = bars["Volume"].astype("int64")
+            bars.columns.name = None
+            bars.index = pd.DatetimeIndex(bars.index, name="Date")
+            histories[ticker_symbol] = bars
+    return histories
+
+
+def fetch_stock_histories(ticker_symbols: list[str], price_store: "Optional[OhlcvStore]" = None, window: Optional[FetchWindow] = None) -> dict[str, pd.DataFrame]:
     """
-    Performs technical analysis on the stock data using pandas_ta.
+    Price history for many tickers, in the same shape as fetch_stock_history_data returns it for one.
+    With a store, tickers that are already stored share one bulk request for the bars since the oldest of their last bars.
+    """
+    window = window or fetch_window()
+    interval = window.interval
+    start = window.start().strftime("%Y-%m-%d")
+
+    if price_store is None:
+        return {ticker_symbol: bars.tail(window.bars())
+                for ticker_symbol, bars in download_stock_histories(ticker_symbols, interval, start=start).items()}
+
+    last_stored = {ticker_symbol: price_store.last_timestamp(ticker_symbol, interval)
+                   for ticker_symbol in ticker_symbols}
+    offline = yf_cache().prefer_cache
+    new_tickers = [ticker_symbol for ticker_symbol, last in last_stored.items()
+                   if last is None or (not offline and needs_backfill(price_store, ticker_symbol, window))]
+    stored_tickers = [ticker_symbol for ticker_symbol, last in last_stored.items()
+                      if last is not None and ticker_symbol not in new_tickers]
+
+    for ticker_symbol, bars in download_stock_histories(new_tickers, interval, start=start).items():
+        price_store.write(ticker_symbol, interval, bars)
+
+    # In offline mode, the stored bars are used as they are
+    if stored_tickers and not offline:
+        start = min(last_stored[ticker_symbol].date()
+                    for ticker_symbol in stored_tickers)
+        downloaded = download_stock_histories(
+            stored_tickers, interval, start=start.strftime("%Y-%m-%d"))
+        for ticker_symbol, new_bars in downloaded.items():
+            if not store_new_bars(price_store, ticker_symbol, interval, new_bars):
+                refetch_stored_history(get_yf_data(
+                    ticker_symbol), price_store, interval)
+
+    return {ticker_symbol: read_stock_history(price_store, ticker_symbol, window)
+            for ticker_symbol in ticker_symbols if price_store.last_timestamp(ticker_symbol, interval) is not None}
+
+
+def techical_analysis(df: pd.DataFrame, ticker_symbol: str = "", indicator_states: Optional[IndicatorStateStore] = None,
+                      window: Optional[FetchWindow] = None):
+    """
+    Performs technical analysis on the stock data.
 
     :param df: DataFrame with stock data.
+    :param ticker_symbol: Ticker the data is for, needed with indicator_states.
+    :param indicator_states: Saved indicator state. Only the bars after the state are computed.
+    :param window: Indicators and number of rows to keep. The configured window when None.
     :return: DataFrame with analysis results.
     """
-    # Calculate Simple Moving Averages
-    sma_short = ta.sma(df['Close'], length=10)
-    df['SMA_10'] = sma_short
-    sma_long = ta.sma(df['Close'], length=50)
-    df['SMA_50'] = sma_long
-    df['Golden Cross'] = (
-        sma_short > sma_long) if sma_short is not None and sma_long is not None else pd.NA
-
-    # Calculate MACD
-    macd = ta.macd(df['Close'])
-    if macd is not None and 'MACD_12_26_9' in macd.columns:
-        df = df.join(macd)  # Join the MACD result with the main DataFrame
-    else:
-        # Initialize MACD columns to NaN if the calculation fails
-        df['MACD'] = pd.NA
-        df['MACDh'] = pd.NA
-        df['MACDs'] = pd.NA
-
-    # Calculate ADX
-    adx = ta.adx(df['High'], df['Low'], df['Close'])
-    if adx is not None:
-        df = df.join(adx)
-
-    # Calculate RSI
-    df['RSI'] = ta.rsi(df['Close'])
-
-    # Drop unnecessary columns
-    df = df.drop(columns=["Open", "High", "Low",
-                 "Dividends", "Stock Splits"], axis=1)
-    # Drop data from early dates since calculations are not setteled on those (i.e. avg)
-    df = df.tail(25)
-    return df
+    return techical_analysis_many({ticker_symbol: df}, indicator_states, window)[ticker_symbol]
 
 
-def process_analysis_results(df):
+def techical_analysis_many(frames: dict[str, pd.DataFrame], indicator_states: Optional[IndicatorStateStore] = None,
+                           window: Optional[FetchWindow] = None) -> dict[str, pd.DataFrame]:
     """
-    Processes analysis results to generate buy or sell recommendations.
+    Performs technical analysis on the stock data of many tickers at once.
+    The indicators of the window (SMA 10/50, golden cross, MACD, ADX and RSI by default) are computed for all tickers in one pass.
 
-    :param df: DataFrame with analysis results.
-    :return: Recommendations as a list of tuples (date, recommendation).
+    :param frames: DataFrame with stock data, by ticker.
+    :param indicator_states: Saved indicator state. Only the bars after the state are computed.
+    :param window: Indicators and number of rows to keep. The configured window when None.
+    :return: DataFrame with analysis results, by ticker.
     """
-    # Initialize an empty list for recommendations
-    recommendations = []
-
-    # Example logic to generate recommendations based on SMA crossover
-    for index, row in df.iterrows():
-        if pd.notnull(row['SMA_50']) and pd.notnull(row['SMA_200']):
-            if row['SMA_50'] > row['SMA_200']:
-                recommendations.append((index, 'Buy'))
-            elif row['SMA_50'] < row['SMA_200']:
-                recommendations.append((index, 'Sell'))
-        else:
-            # Handle cases where SMA values are NaN
-            recommendations.append((index, 'Hold/No Recommendation'))
+    window = window or fetch_window()
+    rows = window.output_rows
+    if indicator_states is not None:
+        analysed = incremental_indicators(
+            frames, indicator_states, rows, window.spec)
+    else:
+        analysed = compute_indicators(frames, window.spec)
 
-    return recommendations
+    results = {}
+    for ticker_symbol, df in analysed.items():
+        # Drop unnecessary columns
+        df = df.drop(columns=["Open", "High", "Low",
+                     "Dividends", "Stock Splits"], errors='ignore')
+        # Drop data from early dates since calculations are not setteled on those (i.e. avg), the window was fetched for that
+        results[ticker_symbol] = df.tail(rows)
+    return results
 
 
-def hum_stock_analyzer_tool(ticker_symbol: str) -> tuple[dict, list[pd.DataFrame]]:
-    """Returns human readable dataframe, with the results of the techical indicators."""
-    yf_ticker_data: yf.Ticker = get_yf_data(ticker_symbol)
-    price_history: pd.DataFrame = fetch_stock_history_data(yf_ticker_data)
+def hum_stock_analyzer_tool(ticker_symbol: str, price_store: "Optional[OhlcvStore]" = None, price_history: Optional[pd.DataFrame] = None, sessions: "Optional[TickerSessionRegistry]" = None, history_with_ta: Optional[pd.DataFrame] = None, indicator_states: Optional[IndicatorStateStore] = None, events: Optional[pd.DataFrame] = None) -> tuple[dict, list[pd.DataFrame]]:
+    """
+    Returns human readable dataframe, with the results of the techical indicators, and the signal events on them.
+    The price history is downloaded, unless it is given (i.e. from fetch_stock_histories),
+    the indicators are computed, unless they are given (i.e. from techical_analysis_many),
+    and so are the signal events (i.e. from signal_events for all tickers).
+    """
+    yf_ticker_data: TickerSession = get_yf_data(ticker_symbol, sessions)
+    if history_with_ta is None:
+        if price_history is None:
+            price_history = fetch_stock_history_data(
+                yf_ticker_data, price_store)
+        history_with_ta = techical_analysis(
+            price_history, ticker_symbol, indicator_states)
 
     analyst_recommendations = yf_ticker_data.get_recommendations_summary()
     if isinstance(analyst_recommendations, dict):
         analyst_recommendations = pd.DataFrame([analyst_recommendations])
 
-    history_with_ta: pd.DataFrame = techical_analysis(price_history)
-
     # data.balance_sheet.loc[['Total Assets',
     #                         'Current Assets',
     #                         'Working Capital',
@@ -174,6 +321,12 @@ def hum_stock_analyzer_tool(ticker_symbol: str) -> tuple[dict, list[pd.DataFrame
         remove_dataframe_nan(history_with_ta))
     arr = [trimmed_history, analyst_recommendations]
 
+    if events is None:
+        events = ticker_events(signal_events(
+            {ticker_symbol: history_with_ta})).get(ticker_symbol)
+    if events is not None and len(events):
+        arr.append(round_dataframe_to_3dec(events))
+
     return (info, arr)
 
 
@@ -194,76 +347,35 @@ def hum_stock_analyzer_tool(ticker_symbol: str) -> tuple[dict, list[pd.DataFrame
 """
 
 
-def get_financial_numbers(ticker_symbol: str) -> tuple[dict, list[pd.DataFrame]]:
-    """Returns dict with company info and tables with financial numbers."""
-    data = yf.Ticker(ticker_symbol)
+# Numbers in the financial tables, in the order they are shown
+BALANCE_SHEET_METRICS = ['Total Assets', 'Current Assets', 'Working Capital', 'Total Debt',
+                         'Total Non Current Liabilities Net Minority Interest']
+CASH_FLOW_METRICS = ['Free Cash Flow', 'Capital Expenditure', 'Operating Gains Losses',
+                     'Operating Cash Flow', 'Beginning Cash Position', 'End Cash Position']
+INCOME_METRICS = ["Total Revenue", "Gross Profit",
+                  "Operating Income", "Net Income"]
+FINANCIAL_METRICS = BALANCE_SHEET_METRICS + CASH_FLOW_METRICS + INCOME_METRICS
+
+
+def get_financial_numbers(ticker_symbol: str, sessions: "Optional[TickerSessionRegistry]" = None, fundamentals: "Optional[FundamentalsStore]" = None) -> tuple[dict, list[pd.DataFrame]]:
+    """
+    Returns dict with company info and tables with financial numbers: 5 years and 4 quarters.
+    With a fundamentals store, statements are only read when a new period can be out, and the tables come from the store.
+    """
+    data = get_yf_data(ticker_symbol, sessions)
     info = get_essential_info(data)
 
-    # 5 years of balance sheets
-    five_yearbalance = data.balance_sheet.loc[['Total Assets',
-                                               'Current Assets',
-                                               'Working Capital',
-                                               'Total Debt',
-                                               'Total Non Current Liabilities Net Minority Interest']]
-
-    # 4 latest quarter's balance sheet
-    four_quater_balance = data.quarterly_balance_sheet.iloc[:, 0:4]
-    four_quater_balance = four_quater_balance.loc[['Total Assets',
-                                                   'Current Assets',
-                                                   'Working Capital',
-                                                   'Total Debt',
-                                                   'Total Non Current Liabilities Net Minority Interest']]
-
-    # Cash Flow
-    columns_to_include = ['Free Cash Flow', 'Capital Expenditure', 'Operating Gains Losses',
-                          'Operating Cash Flow', 'Beginning Cash Position', 'End Cash Position']
-    # Skip columns that are not found
-    existing_columns = data.cash_flow.index.intersection(columns_to_include)
-    five_year_cash_flow = data.cash_flow.loc[existing_columns]
-
-    four_quater_cash_flow = data.quarterly_cash_flow.iloc[:, 0:4]
-
-    columns_to_include = [
-        'Free Cash Flow',
-        'Capital Expenditure',
-        'Operating Gains Losses',
-        'Operating Cash Flow',
-        'Beginning Cash Position',
-        'End Cash Position'
-    ]
-
-    existing_columns = four_quater_cash_flow.index.intersection(
-        columns_to_include)
-    four_quater_cash_flow = four_quater_cash_flow.loc[existing_columns]
-
-    # Income Statement
-    columns_to_include = [
-        "Total Revenue",
-        "Gross Profit",
-        "Operating Income",
-        "Net Income"
-    ]
-
-    existing_columns = data.income_stmt.index.intersection(columns_to_include)
-    five_year_income = data.income_stmt.loc[existing_columns]
-
-    columns_to_include = [
-        "Total Revenue",
-        "Gross Profit",
-        "Operating Income",
-        "Net Income"
-    ]
-    four_quater_income: pd.DataFrame = data.quarterly_income_stmt.iloc[:, 0:4]
-    existing_columns = four_quater_income.index.intersection(
-        columns_to_include)
-
-    four_quater_income = data.quarterly_income_stmt.loc[existing_columns]
-
-    yearly_metrics_df = pd.concat(
-        [five_yearbalance, five_year_cash_flow, five_year_income], axis=1)
-
-    quater_metrics_df = pd.concat(
-        [four_quater_balance, four_quater_cash_flow, four_quater_income], axis=1)
+    if fundamentals is not None:
+        fundamentals.update(ticker_symbol, data)
+        yearly_metrics_df = fundamentals.query(
+            ticker_symbol, FINANCIAL_METRICS, 5, "yearly")
+        quater_metrics_df = fundamentals.query(
+            ticker_symbol, FINANCIAL_METRICS, 4, "quarterly")
+    else:
+        yearly_metrics_df = pivot_metrics(statement_rows(
+            [getattr(data, name) for name in STATEMENTS["yearly"]], "yearly"), FINANCIAL_METRICS, 5)
+        quater_metrics_df = pivot_metrics(statement_rows(
+            [getattr(data, name) for name in STATEMENTS["quarterly"]], "quarterly"), FINANCIAL_METRICS, 4)
 
     return (info, [round_dataframe_to_3dec(remove_dataframe_nan(yearly_metrics_df)),
                    round_dataframe_to_3dec(remove_dataframe_nan(quater_metrics_df))])
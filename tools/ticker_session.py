@@ -0,0 +1,133 @@
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+from tools.disk_cache import DiskCache, yf_cache
+
+# yfinance is slow to import, so it is loaded when the first session is made
+
+# fast_info fields used by the fetchers. Each one can be a request of its own, so they are read once into a snapshot.
+FAST_INFO_FIELDS = ["previous_close", "day_high", "day_low", "last_volume", "fifty_day_average",
+                    "two_hundred_day_average", "year_high", "year_low", "year_change"]
+
+# Class of each payload in the disk cache, which decides how long it is kept
+PAYLOAD_KINDS = {"info": "info", "fast_info": "quote", "recommendations_summary": "info",
+                 "balance_sheet": "statements", "quarterly_balance_sheet": "statements",
+                 "cash_flow": "statements", "quarterly_cash_flow": "statements",
+                 "income_stmt": "statements", "quarterly_income_stmt": "statements"}
+
+
+class TickerSession:
+    """
+    One yf.Ticker per symbol, where info, fast_info, statements and recommendations are downloaded once, on first use.
+    The technical and financial fetchers run at the same time and share the session, so the second one gets the payloads the first one downloaded.
+    """
+
+    def __init__(self, ticker_symbol: str, registry: "Optional[TickerSessionRegistry]" = None, cache: Optional[DiskCache] = None) -> None:
+        import yfinance as yf
+
+        self.ticker = ticker_symbol
+        self.yf_ticker = yf.Ticker(ticker_symbol)
+        self.registry = registry
+        # Payloads come from the disk cache while they are fresh
+        self.cache = cache if cache is not None else yf_cache()
+        self.created = time.monotonic()
+        self.lock = threading.Lock()
+        self.field_locks: Dict[str, threading.Lock] = {}
+        self.values: Dict[str, Any] = {}
+
+    def once(self, name: str, load: Callable[[], Any]) -> Any:
+        # One lock per field, so a slow statement download doesn't hold up the quote
+        with self.lock:
+            field_lock = self.field_locks.setdefault(name, threading.Lock())
+        with field_lock:
+            if name in self.values:
+                if self.registry is not None:
+                    self.registry.count("hits")
+                return self.values[name]
+            downloaded = []
+
+            def download():
+                downloaded.append(name)
+                return load()
+
+            self.values[name] = self.cache.get_or_load(
+                PAYLOAD_KINDS[name], f"{self.ticker}/{name}", download)
+            if self.registry is not None:
+                self.registry.count("misses" if downloaded else "disk_hits")
+            return self.values[name]
+
+    @property
+    def info(self) -> dict:
+        return self.once("info", lambda: self.yf_ticker.info)
+
+    @property
+    def fast_info(self) -> SimpleNamespace:
+        return self.once("fast_info", lambda: SimpleNamespace(
+            **{field: getattr(self.yf_ticker.fast_info, field) for field in FAST_INFO_FIELDS}))
+
+    @property
+    def balance_sheet(self):
+        return self.once("balance_sheet", lambda: self.yf_ticker.balance_sheet)
+
+    @property
+    def quarterly_balance_sheet(self):
+        return self.once("quarterly_balance_sheet", lambda: self.yf_ticker.quarterly_balance_sheet)
+
+    @property
+    def cash_flow(self):
+        return self.once("cash_flow", lambda: self.yf_ticker.cash_flow)
+
+    @property
+    def quarterly_cash_flow(self):
+        return self.once("quarterly_cash_flow", lambda: self.yf_ticker.quarterly_cash_flow)
+
+    @property
+    def income_stmt(self):
+        return self.once("income_stmt", lambda: self.yf_ticker.income_stmt)
+
+    @property
+    def quarterly_income_stmt(self):
+        return self.once("quarterly_income_stmt", lambda: self.yf_ticker.quarterly_income_stmt)
+
+    def get_recommendations_summary(self):
+        return self.once("recommendations_summary", self.yf_ticker.get_recommendations_summary)
+
+    def history(self, *args, **kwargs):
+        # Not kept, the price store decides what to download
+        return self.yf_ticker.history(*args, **kwargs)
+
+
+class TickerSessionRegistry:
+    """
+    Hands out one TickerSession per symbol for a run.
+    Sessions are dropped after max_age seconds, so a long lived process (worker_server) doesn't keep serving old quotes.
+    """
+
+    def __init__(self, max_age: Optional[float] = 600) -> None:
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.sessions: Dict[str, TickerSession] = {}
+        self.counters = {"sessions": 0, "hits": 0, "disk_hits": 0, "misses": 0}
+
+    def get(self, ticker_symbol: str) -> TickerSession:
+        with self.lock:
+            session = self.sessions.get(ticker_symbol)
+            if session is None or (self.max_age is not None and time.monotonic() - session.created > self.max_age):
+                session = TickerSession(ticker_symbol, self)
+                self.sessions[ticker_symbol] = session
+                self.counters["sessions"] += 1
+            return session
+
+    def count(self, counter: str) -> None:
+        with self.lock:
+            self.counters[counter] += 1
+
+    def stats(self) -> Dict[str, int]:
+        # hits are payloads served from a session, disk_hits from the disk cache, misses are payloads that were downloaded
+        with self.lock:
+            return dict(self.counters)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.sessions.clear()
@@ -0,0 +1,180 @@
+"""
+Long lived worker for the single_advice* scripts.
+Instead of spawning a script per request (and paying for imports, config and the SEC CIK map every time),
+the host application keeps this process running and sends requests as JSON lines, on stdin or a local socket.
+
+Request:  {"id": 1, "op": "technical", "arg": "<same argument as the script takes on the command line>"}
+Response: {"id": 1, "ok": true, "output": "<same line the script prints>"}
+          {"id": 1, "ok": false, "error": "<message>"}
+
+Operations:
+    analysis  - single_stock_analysis_agent.py
+    advice    - single_advice.py
+    technical - single_advice_technical.py
+    financial - single_advice_fincancial.py
+"""
+import sys
+
+# stdout is for responses only. Everything else that is printed or logged (also while importing) goes to stderr.
+protocol_out = sys.stdout
+sys.stdout = sys.stderr
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
+import socketserver
+import threading
+from typing import Any, Callable, Dict, Optional, TextIO
+
+from infrence_provider.infrence_provider import InferenceProvider
+from infrence_provider.infrence_provider_factory import InferenceProviderFactory
+from stock_information_processor import StockInformationProcessor
+import single_advice
+import single_advice_fincancial
+import single_advice_technical
+import single_stock_analysis_agent
+from tools.app_logging import get_logger
+
+config_path = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), './config/'))
+
+# Get the logger specified in the configuration file
+log = get_logger()
+
+
+class WorkerResources:
+    # Config, provider and processor are made once, on first use, and shared by all requests
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.app_config: Optional[Dict[str, Any]] = None
+        self.api_keys: Optional[Dict[str, Any]] = None
+        self._llm_provider: Optional[InferenceProvider] = None
+        self._processor: Optional[StockInformationProcessor] = None
+
+    def load_config(self) -> None:
+        if self.app_config is None:
+            try:
+                with open(os.path.join(config_path, "api_keys.json")) as keysFile:
+                    self.api_keys = json.load(keysFile)
+            except FileNotFoundError as e:
+                log.error(e)
+            with open(os.path.join(config_path, "app_config.json")) as f:
+                self.app_config = json.load(f)
+
+    def llm_provider(self) -> InferenceProvider:
+        with self.lock:
+            if self._llm_provider is None:
+                self.load_config()
+                self._llm_provider = InferenceProviderFactory().create_provider(self.app_config)
+            return self._llm_provider
+
+    def processor(self) -> StockInformationProcessor:
+        llm_provider = self.llm_provider()
+        with self.lock:
+            if self._processor is None:
+                self._processor = StockInformationProcessor(
+                    self.api_keys, llm_provider)
+            return self._processor
+
+
+class Worker:
+    def __init__(self, resources: WorkerResources) -> None:
+        self.resources = resources
+        self.operations: Dict[str, Callable[[str], str]] = {
+            "analysis": lambda arg: single_stock_analysis_agent.run(
+                single_stock_analysis_agent.parse_arg(arg), self.resources.llm_provider(), self.resources.processor()),
+            "advice": lambda arg: single_advice.run(
+                single_advice.parse_arg(arg), self.resources.llm_provider()),
+            "technical": lambda arg: single_advice_technical.run(
+                single_advice_technical.parse_arg(arg), self.resources.processor()),
+            "financial": lambda arg: single_advice_fincancial.run(
+                single_advice_fincancial.parse_arg(arg), self.resources.processor()),
+        }
+
+    def handle(self, line: str) -> str:
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            operation = self.operations.get(request.get("op"))
+            if operation is None:
+                raise ValueError(
+                    f"Unknown op '{request.get('op')}'. Valid ops are: {list(self.operations.keys())}")
+            output = operation(request["arg"])
+            response = {"id": request_id, "ok": True, "output": output}
+        except Exception as e:
+            log.error(f"Error handling request {request_id}: {e}")
+            response = {"id": request_id, "ok": False, "error": str(e)}
+        return json.dumps(response, ensure_ascii=False)
+
+    def serve_stream(self, lines: TextIO, out: TextIO, max_workers: int) -> None:
+        # Requests are handled concurrently, responses are written as they finish and matched by id
+        write_lock = threading.Lock()
+
+        def respond(line: str) -> None:
+            response = self.handle(line)
+            with write_lock:
+                out.write(response + "\n")
+                out.flush()
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="request") as executor:
+            for line in lines:
+                if line.strip():
+                    executor.submit(respond, line)
+
+
+class _SocketWriter:
+    def __init__(self, wfile) -> None:
+        self.wfile = wfile
+
+    def write(self, text: str) -> None:
+        self.wfile.write(text.encode("utf-8"))
+
+    def flush(self) -> None:
+        self.wfile.flush()
+
+
+def serve_socket(worker: Worker, port: int, max_workers: int) -> None:
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            out = _SocketWriter(self.wfile)
+            worker.serve_stream(
+                (line.decode("utf-8") for line in self.rfile), out, max_workers)
+
+    with socketserver.ThreadingTCPServer(("127.0.0.1", port), Handler) as server:
+        server.daemon_threads = True
+        log.info(f"Worker listening on 127.0.0.1:{port}")
+        server.serve_forever()
+
+
+def warm_up(resources: WorkerResources) -> None:
+    try:
+        resources.processor()
+    except Exception as e:
+        log.error(f"Error warming up worker: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve the single_advice* operations from one long lived process.")
+    parser.add_argument("--port", type=int, default=None,
+                        help="Listen on this local port instead of stdin/stdout")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Number of requests handled at the same time")
+    args = parser.parse_args()
+
+    resources = WorkerResources()
+    worker = Worker(resources)
+    # Build the provider, fetchers and the SEC CIK map in the background, so the first request doesn't pay for it
+    threading.Thread(target=warm_up, args=(resources,),
+                     name="warm-up", daemon=True).start()
+
+    if args.port is not None:
+        serve_socket(worker, args.port, args.workers)
+    else:
+        worker.serve_stream(sys.stdin, protocol_out, args.workers)
+
+
+if __name__ == "__main__":
+    main()